@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Estatísticas de aplicação (as-applied) por operação de campo
+A partir dos pontos decodificados por operation_decoder, calcula para cada
+FieldOperationId, com operações vetorizadas do NumPy (bincount/percentile, sem
+laço por ponto): desvio da taxa aplicada em relação à taxa alvo por SECTIONID,
+área coberta (SWATHWIDTH × DISTANCE), total de produto aplicado e estatísticas
+de velocidade e combustível. Os registros de /fieldOperations (produto e taxa
+prevista) complementam o relatório quando informados.
+"""
+
+import os
+import re
+import json
+import zipfile
+import sys
+import time
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+from operation_decoder import OperationData, METADATA_SUFFIX, decode_operation, decode_zip
+from operation_point_cache import get_point_cache
+
+DOWNLOAD_DIR = "downloads"
+DEVIATION_TOLERANCE = 0.10  # Desvio relativo aceito entre taxa aplicada e alvo
+
+# Fatores para as unidades de referência (m, ha, km/h, l)
+LENGTH_FACTORS = {'m': 1.0, 'cm': 0.01, 'mm': 0.001, 'km': 1000.0, 'in': 0.0254, 'ft': 0.3048, 'yd': 0.9144}
+AREA_FACTORS = {'ha': 1.0, 'm2': 1e-4, 'ac': 0.40468564224}
+SPEED_FACTORS = {'km1hr-1': 1.0, 'm1s-1': 3.6, 'mi1hr-1': 1.609344}
+VOLUME_FACTORS = {'l': 1.0, 'ml': 0.001, 'gal': 3.785411784}
+
+
+def rate_units(unit: Optional[str]):
+    """
+    Separa uma unidade de taxa no formato da exportação ('kg1ha-1', 'l1ac-1')
+    em (unidade do produto, fator da área por hectare). Sem unidade → (None, 1.0).
+    """
+    match = re.match(r'^(.+?)1(ha|m2|ac)-1$', unit or '')
+    if not match:
+        return unit, 1.0
+    return match.group(1), AREA_FACTORS[match.group(2)]
+
+
+def _column(operations: List[OperationData], name: str, factors: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Coluna numérica concatenada das exportações, convertida para a unidade de
+    referência; exportações sem a coluna contribuem com NaN
+    """
+    parts = []
+    for operation in operations:
+        if name not in operation.columns:
+            parts.append(np.full(len(operation), np.nan))
+            continue
+        values = operation.points[name].astype(np.float64, copy=False)
+        unit = operation.unit(name)
+        if factors and unit in factors:
+            values = values * factors[unit]
+        parts.append(values)
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _instant_mask(operations: List[OperationData]) -> np.ndarray:
+    """
+    Uma linha por máquina e instante. Cada ponto da exportação é um elemento
+    (SECTIONID) e as grandezas da máquina (velocidade, combustível) se repetem
+    nas seções do mesmo instante; só a primeira ocorrência é considerada.
+    """
+    machine = _column(operations, 'Machine')
+    times = []
+    for operation in operations:
+        name = next((n for n in ('IsoTime', 'Time') if n in operation.columns
+                     and np.issubdtype(operation.points[n].dtype, np.datetime64)), None)
+        if name is None:
+            return np.ones(len(machine), dtype=bool)
+        times.append(operation.points[name].astype('datetime64[ms]').astype(np.int64))
+    instant = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+    machine = np.nan_to_num(machine).astype(np.int64)
+    order = np.lexsort((instant, machine))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (np.diff(machine[order]) != 0) | (np.diff(instant[order]) != 0)
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order[first]] = True
+    return mask
+
+
+def _summary(values: np.ndarray) -> Optional[Dict[str, float]]:
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    p50, p95 = np.percentile(values, [50, 95])
+    return {'mean': float(values.mean()), 'median': float(p50), 'p95': float(p95),
+            'min': float(values.min()), 'max': float(values.max())}
+
+
+def _time_range(operations: List[OperationData]):
+    bounds = []
+    for operation in operations:
+        for name in ('IsoTime', 'Time'):
+            if name in operation.columns and np.issubdtype(operation.points[name].dtype, np.datetime64):
+                valid = operation.points[name][~np.isnat(operation.points[name])]
+                if len(valid):
+                    bounds.extend([valid.min(), valid.max()])
+                break
+    if not bounds:
+        return None, None
+    return str(min(bounds)), str(max(bounds))
+
+
+def section_stats(
+    section: np.ndarray,
+    area_ha: np.ndarray,
+    applied: np.ndarray,
+    target: np.ndarray,
+    tolerance: float = DEVIATION_TOLERANCE
+) -> List[Dict[str, Any]]:
+    """
+    Desvio aplicado × alvo por seção, ponderado pela área de cada ponto
+
+    Returns:
+        Por SECTIONID: pontos, área (ha), taxas médias, desvio médio e RMS (%)
+        e percentual da área dentro da tolerância
+    """
+    if not len(section):
+        return []
+    ids, index = np.unique(section, return_inverse=True)
+    count = len(ids)
+    compared = np.isfinite(applied) & np.isfinite(target) & (target > 0) & np.isfinite(area_ha)
+    weight = np.where(compared, area_ha, 0.0)
+    deviation = np.where(compared, (applied - target) / np.where(compared, target, 1.0), 0.0)
+
+    points = np.bincount(index, minlength=count)
+    area = np.bincount(index, weights=np.nan_to_num(area_ha), minlength=count)
+    compared_area = np.bincount(index, weights=weight, minlength=count)
+    applied_sum = np.bincount(index, weights=np.where(compared, applied, 0.0) * weight, minlength=count)
+    target_sum = np.bincount(index, weights=np.where(compared, target, 0.0) * weight, minlength=count)
+    deviation_sum = np.bincount(index, weights=deviation * weight, minlength=count)
+    squared_sum = np.bincount(index, weights=deviation ** 2 * weight, minlength=count)
+    within_sum = np.bincount(index, weights=np.where(np.abs(deviation) <= tolerance, weight, 0.0), minlength=count)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        applied_mean = applied_sum / compared_area
+        target_mean = target_sum / compared_area
+        deviation_mean = deviation_sum / compared_area * 100
+        deviation_rms = np.sqrt(squared_sum / compared_area) * 100
+        within = within_sum / compared_area * 100
+
+    def number(value):
+        return float(value) if np.isfinite(value) else None
+
+    return [{
+        'section_id': int(ids[i]),
+        'points': int(points[i]),
+        'area_ha': float(area[i]),
+        'applied_rate_mean': number(applied_mean[i]),
+        'target_rate_mean': number(target_mean[i]),
+        'deviation_pct': number(deviation_mean[i]),
+        'rms_deviation_pct': number(deviation_rms[i]),
+        'within_tolerance_pct': number(within[i]),
+    } for i in range(count)]
+
+
+def operation_stats(
+    operations: List[OperationData],
+    field_operation: Optional[Dict[str, Any]] = None,
+    tolerance: float = DEVIATION_TOLERANCE
+) -> Dict[str, Any]:
+    """
+    Estatísticas de uma operação de campo a partir das suas exportações
+
+    Args:
+        operations: Exportações decodificadas do mesmo FieldOperationId
+        field_operation: Registro de /fieldOperations correspondente (opcional)
+        tolerance: Desvio relativo aceito para o percentual dentro da tolerância
+    """
+    metadata = operations[0].metadata
+    distance = _column(operations, 'DISTANCE', LENGTH_FACTORS)
+    swath = _column(operations, 'SWATHWIDTH', LENGTH_FACTORS)
+    area_ha = swath * distance / 10000.0
+
+    # Taxas na unidade da primeira exportação (todas de uma operação vêm iguais)
+    product_unit, area_factor = rate_units(operations[0].unit('AppliedRate') or operations[0].unit('TargetRate'))
+    applied = _column(operations, 'AppliedRate')
+    target = _column(operations, 'TargetRate')
+    if np.all(np.isnan(target)) and field_operation:
+        # Sem coluna de taxa alvo: usa a taxa prevista do produto em /fieldOperations
+        rate = (field_operation.get('products') or {}).get('rate') or {}
+        if isinstance(rate.get('value'), (int, float)):
+            target = np.full(len(applied), float(rate['value']))
+    section = np.nan_to_num(_column(operations, 'SECTIONID')).astype(np.int64)
+
+    covered = np.isfinite(area_ha)
+    total_area = float(area_ha[covered].sum())
+    applied_area = np.isfinite(applied) & covered
+    # Taxa por hectare × área do ponto (convertida para a área da unidade da taxa)
+    product_total = float((applied[applied_area] * area_ha[applied_area] / area_factor).sum())
+    compared = applied_area & np.isfinite(target) & (target > 0)
+    weight = area_ha[compared]
+    weight_sum = weight.sum()
+
+    instants = _instant_mask(operations)
+    speed = _column(operations, 'VEHICLSPEED', SPEED_FACTORS)[instants]
+    fuel = _column(operations, 'FUEL', VOLUME_FACTORS)[instants]
+    fuel_total = float(np.nansum(fuel)) if np.isfinite(fuel).any() else None
+    start, end = _time_range(operations)
+
+    stats = {
+        'field_operation_id': operations[0].field_operation_id,
+        'operation': metadata.get('Operation'),
+        'crop_season': metadata.get('CropSeason'),
+        'field_id': metadata.get('FieldId'),
+        'field_name': metadata.get('FieldName'),
+        'product': (metadata.get('Product') or {}).get('ProductName'),
+        'exports': len(operations),
+        'points': int(len(area_ha)),
+        'start': start,
+        'end': end,
+        'area_ha': total_area,
+        'product_total': product_total,
+        'product_unit': product_unit,
+        'rate_unit': operations[0].unit('AppliedRate'),
+        'applied_rate_mean': float((applied[compared] * weight).sum() / weight_sum) if weight_sum else None,
+        'target_rate_mean': float((target[compared] * weight).sum() / weight_sum) if weight_sum else None,
+        'deviation_pct': float(((applied[compared] - target[compared]) / target[compared] * weight).sum()
+                               / weight_sum * 100) if weight_sum else None,
+        'sections': section_stats(section, area_ha, applied, target, tolerance),
+        'speed_kmh': _summary(speed[speed > 0]),
+        'fuel_l': fuel_total,
+        'fuel_l_per_ha': fuel_total / total_area if fuel_total is not None and total_area else None,
+    }
+    if field_operation:
+        products = field_operation.get('products') or {}
+        rate = products.get('rate') or {}
+        stats['planned'] = {
+            'operation_type': field_operation.get('fieldOperationType'),
+            'product': products.get('name'),
+            'rate': rate.get('value'),
+            'rate_unit': rate.get('unitId'),
+            'start_date': field_operation.get('startDate'),
+            'end_date': field_operation.get('endDate'),
+        }
+    return stats
+
+
+def group_by_field_operation(operations: Iterable[OperationData]) -> Dict[str, List[OperationData]]:
+    """
+    Agrupa exportações pelo FieldOperationId dos metadados (uma operação pode
+    vir em vários arquivos, ex: um por dia)
+    """
+    groups: Dict[str, List[OperationData]] = {}
+    for operation in operations:
+        groups.setdefault(operation.field_operation_id or operation.source or '', []).append(operation)
+    return groups
+
+
+def season_report(
+    operations: Iterable[OperationData],
+    field_operations: Optional[List[Dict[str, Any]]] = None,
+    tolerance: float = DEVIATION_TOLERANCE
+) -> List[Dict[str, Any]]:
+    """
+    Estatísticas de todas as operações de campo presentes nas exportações
+
+    Args:
+        operations: Exportações decodificadas
+        field_operations: Registros de /fieldOperations (casados pelo id)
+        tolerance: Desvio relativo aceito
+    """
+    by_id = {op.get('id'): op for op in field_operations or [] if op.get('id')}
+    return [operation_stats(group, by_id.get(op_id), tolerance)
+            for op_id, group in group_by_field_operation(operations).items()]
+
+
+def _export_operation_ids(path: str) -> set:
+    """
+    FieldOperationIds de uma exportação (ZIP ou -Deere-Metadata.json), lendo só os metadados
+    """
+    if not path.endswith(METADATA_SUFFIX):
+        with zipfile.ZipFile(path) as zf:
+            return {json.loads(zf.read(name).decode('utf-8-sig')).get('FieldOperationId')
+                    for name in zf.namelist() if name.endswith(METADATA_SUFFIX)}
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return {json.load(f).get('FieldOperationId')}
+
+
+def load_exports(directory: str = DOWNLOAD_DIR, use_cache: bool = True,
+                 field_operation_ids: Optional[Iterable[str]] = None) -> List[OperationData]:
+    """
+    Decodifica as exportações de um diretório: ZIPs e pares
+    -Deere-Metadata.json + pontos soltos. Os ZIPs passam pelo cache de pontos
+    (colunas mapeadas em memória), a menos que use_cache seja False. Com
+    field_operation_ids, as exportações de outras operações são descartadas
+    pelos metadados, antes de decodificar os pontos.
+    """
+    wanted = set(field_operation_ids) if field_operation_ids is not None else None
+    operations = []
+    if not os.path.isdir(directory):
+        return operations
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        try:
+            is_export = (name.lower().endswith('.zip') and zipfile.is_zipfile(path)) or name.endswith(METADATA_SUFFIX)
+            if wanted is not None and is_export and not (_export_operation_ids(path) & wanted):
+                continue
+            if name.lower().endswith('.zip') and zipfile.is_zipfile(path):
+                operations.extend(get_point_cache().operations_for_zip(path) if use_cache else decode_zip(path))
+            elif name.endswith(METADATA_SUFFIX):
+                operations.append(decode_operation(path))
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"⚠️ {path}: {e}")
+    if wanted is not None:
+        operations = [operation for operation in operations if operation.field_operation_id in wanted]
+    return operations
+
+
+def _format(value, digits: int = 2) -> str:
+    return f"{value:,.{digits}f}" if isinstance(value, (int, float)) else 'N/A'
+
+
+def print_operation_stats(stats: Dict[str, Any]) -> None:
+    """
+    Exibe as estatísticas de uma operação no formato de analyze_field_operations
+    """
+    print(f"\n📊 Estatísticas da Aplicação ({stats['points']:,} pontos, {stats['exports']} exportação(ões)):")
+    print(f"   • Período: {stats['start'] or 'N/A'} → {stats['end'] or 'N/A'}")
+    print(f"   • Área coberta: {_format(stats['area_ha'])} ha")
+    print(f"   • Produto aplicado: {_format(stats['product_total'])} {stats['product_unit'] or ''} "
+          f"({stats['product'] or 'N/A'})")
+    print(f"   • Taxa média: {_format(stats['applied_rate_mean'])} aplicada × "
+          f"{_format(stats['target_rate_mean'])} alvo {stats['rate_unit'] or ''} "
+          f"(desvio {_format(stats['deviation_pct'], 1)}%)")
+    speed = stats['speed_kmh']
+    if speed:
+        print(f"   • Velocidade: média {_format(speed['mean'], 1)} km/h, mediana {_format(speed['median'], 1)}, "
+              f"p95 {_format(speed['p95'], 1)}, máx {_format(speed['max'], 1)}")
+    if stats['fuel_l'] is not None:
+        print(f"   • Combustível: {_format(stats['fuel_l'])} l ({_format(stats['fuel_l_per_ha'])} l/ha)")
+    if stats['sections']:
+        print(f"   • Por seção:")
+        for section in stats['sections']:
+            print(f"     - Seção {section['section_id']}: {_format(section['area_ha'])} ha, "
+                  f"desvio {_format(section['deviation_pct'], 1)}% "
+                  f"(RMS {_format(section['rms_deviation_pct'], 1)}%, "
+                  f"{_format(section['within_tolerance_pct'], 1)}% da área na tolerância)")
+
+
+def main():
+    """
+    Calcula as estatísticas das exportações em ./downloads (ou no diretório
+    passado na linha de comando) e salva em as_applied_stats.json
+    """
+    directory = sys.argv[1] if len(sys.argv) > 1 else DOWNLOAD_DIR
+    started = time.time()
+    operations = load_exports(directory)
+    if not operations:
+        print(f"❌ Nenhuma exportação de operação encontrada em {directory}")
+        return
+    report = season_report(operations)
+    elapsed = time.time() - started
+    for stats in report:
+        print(f"\n🌾 Operação {stats['field_operation_id']} - {stats['operation']} - {stats['field_name']}")
+        print_operation_stats(stats)
+
+    summary_file = "as_applied_stats.json"
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 {len(report)} operações ({sum(s['points'] for s in report):,} pontos) em {elapsed:.1f}s; "
+          f"salvo em {summary_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Cliente asyncio para a API John Deere
+Espelha as funções de endpoint dos scripts síncronos (campos, operações,
+boundaries, map layers, guidance lines, file transfers e arquivos) para que um
+único event loop mantenha centenas de requisições em voo. Usa o mesmo provedor
+de tokens, os mesmos limitadores de taxa por host e a mesma política de
+retentativa do cliente síncrono (deere_client).
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, Awaitable, Iterable, TypeVar
+from urllib.parse import urlparse
+
+import aiohttp
+
+from deere_client import get_client, DEFAULT_ACCEPT, AUTHORIZED_HOSTS, DEFAULT_POOL_SIZES
+from token_provider import get_token_provider
+from retry_policy import RetryPolicy, NO_RETRY, RETRYABLE, classify_status
+from pagination import ITEM_LIMIT, get_link
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Exceções de transporte do aiohttp tratadas como retentáveis
+RETRYABLE_ASYNC_EXCEPTIONS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+
+def _query_params(params: Optional[Dict[str, Any]]) -> List[tuple]:
+    """
+    Converte params no formato do requests (valores str/int/bool/lista) para a
+    lista de pares aceita pelo aiohttp
+    """
+    pairs = []
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if isinstance(item, bool):
+                item = str(item).lower()
+            pairs.append((key, str(item)))
+    return pairs
+
+
+class CollectionTruncated(Exception):
+    """
+    Uma página da coleção falhou: os registros já entregues não são a coleção inteira
+    """
+
+
+class AsyncDeereClient:
+    """
+    Cliente aiohttp com pool de conexões por host, autenticação, limite de
+    taxa e retentativas compartilhados com o cliente síncrono
+
+    Use como context manager:
+
+        async with AsyncDeereClient() as client:
+            data = await get_field_boundaries(client, org_id, field_id)
+
+    Args:
+        max_connections: Conexões simultâneas no total
+        limit_per_host: Conexões simultâneas por host (padrão: maior pool de DEFAULT_POOL_SIZES)
+        retry_policy: Política de retentativa (padrão: a do cliente síncrono)
+        timeout: Timeout total por tentativa, em segundos
+        verify: Verificação de certificado TLS
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 200,
+        limit_per_host: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        timeout: float = 120.0,
+        verify: bool = True
+    ):
+        sync_client = get_client()
+        self.rate_limiters = sync_client.rate_limiters
+        self.retry_policy = retry_policy or sync_client.retry_policy
+        self.token_provider = get_token_provider()
+        self._connector_args = {
+            'limit': max_connections,
+            'limit_per_host': limit_per_host or max(DEFAULT_POOL_SIZES.values()),
+        }
+        if not verify:
+            self._connector_args['ssl'] = False
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'AsyncDeereClient':
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(**self._connector_args),
+            timeout=self._timeout
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _access_token(self) -> Optional[str]:
+        provider = self.token_provider
+        if not provider.is_expired_or_expiring():
+            tokens = provider.get_tokens()
+            return tokens.get('access_token') if tokens else None
+        # A renovação é síncrona (e única entre threads); roda fora do event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, provider.get_access_token)
+
+    async def build_headers(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        host = urlparse(url).hostname or ''
+        merged = {}
+        accept = DEFAULT_ACCEPT.get(host)
+        if accept:
+            merged['Accept'] = accept
+        if host in AUTHORIZED_HOSTS:
+            access_token = await self._access_token()
+            if access_token:
+                merged['Authorization'] = f'Bearer {access_token}'
+        if headers:
+            merged.update(headers)
+        return merged
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        retry: Optional[RetryPolicy] = None,
+        **kwargs
+    ):
+        """
+        Executa a requisição e devolve (status, headers, corpo JSON ou None)
+
+        Segue as mesmas regras do DeereClient.request: limite de taxa por host,
+        retentativas apenas para erros retentáveis de métodos idempotentes.
+        """
+        if self.session is None:
+            raise RuntimeError("AsyncDeereClient precisa ser usado com 'async with'")
+
+        policy = retry if retry is not None else self.retry_policy
+        if not policy.applies_to(method):
+            policy = NO_RETRY
+        limiter = self.rate_limiters.get(urlparse(url).hostname or '')
+        query = _query_params(params)
+
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if limiter is not None:
+                await limiter.acquire_async()
+            try:
+                request_headers = await self.build_headers(url, headers)
+                async with self.session.request(method, url, headers=request_headers, params=query, **kwargs) as response:
+                    if limiter is not None:
+                        limiter.on_response(response.status, response.headers.get('Retry-After'))
+                    body = await response.read()
+            except RETRYABLE_ASYNC_EXCEPTIONS as e:
+                delay = policy.next_delay(attempt, started_at)
+                if delay is None:
+                    raise
+                print(f"🔁 {method} {url}: {e.__class__.__name__}, nova tentativa em {delay:.1f}s ({attempt}/{policy.max_attempts})")
+                await asyncio.sleep(delay)
+                continue
+
+            if classify_status(response.status) == RETRYABLE:
+                delay = policy.next_delay(attempt, started_at, response)
+                if delay is not None:
+                    print(f"🔁 {method} {url}: status {response.status}, nova tentativa em {delay:.1f}s ({attempt}/{policy.max_attempts})")
+                    await asyncio.sleep(delay)
+                    continue
+            return response.status, response.headers, body
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        GET que devolve o JSON da resposta, ou None (com log) se o status não for 200
+        """
+        try:
+            status, _, body = await self.request('GET', url, headers=headers, params=params)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Erro na requisição para {url}: {e}")
+            return None
+        if status != 200:
+            print(f"❌ Erro {status} em {url}: {body[:500].decode('utf-8', 'replace')}")
+            return None
+        return json.loads(body)
+
+    async def iter_collection(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        item_limit: int = ITEM_LIMIT,
+        headers: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versão assíncrona de pagination.iter_collection: segue nextPage e entrega os registros.
+        Lança CollectionTruncated se alguma página falhar (como o HTTPError da versão síncrona).
+        """
+        first_params = dict(params or {})
+        if item_limit:
+            first_params['itemLimit'] = item_limit
+        page = await self.get_json(url, params=first_params, headers=headers)
+        delivered = 0
+        while True:
+            if page is None:
+                raise CollectionTruncated(f"{url}: página falhou após {delivered} registros")
+            for record in page.get('values', []):
+                delivered += 1
+                yield record
+            next_url = get_link(page, 'nextPage')
+            if not next_url:
+                return
+            page = await self.get_json(next_url, headers=headers)
+
+
+async def gather_bounded(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int = 100
+) -> List[R]:
+    """
+    Executa func(item) para todos os itens com no máximo `concurrency`
+    corrotinas ativas, devolvendo os resultados na ordem de entrada
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+# --- Endpoints (espelham as funções síncronas dos scripts) ---
+
+async def get_organization_fields(
+    client: AsyncDeereClient,
+    organization_id: str,
+    client_name: Optional[str] = None,
+    farm_name: Optional[str] = None,
+    field_name: Optional[str] = None,
+    embed: Optional[str] = None,
+    record_filter: Optional[str] = None,
+    uom_system: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca os campos de uma organização (ver get_fields_and_operations.get_organization_fields)
+    """
+    headers = {}
+    if uom_system:
+        headers['Accept-UOM-System'] = uom_system
+    params = {
+        'clientName': client_name,
+        'farmName': farm_name,
+        'fieldName': field_name,
+        'embed': embed,
+        'recordFilter': record_filter,
+    }
+    url = f"{API_BASE_URL}/organizations/{organization_id}/fields"
+    return await client.get_json(url, params=params, headers=headers)
+
+
+async def get_field_operations_by_field(
+    client: AsyncDeereClient,
+    organization_id: str,
+    field_id: str,
+    crop_season: Optional[int] = None,
+    field_operation_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    embed: Optional[str] = None,
+    work_plan_ids: Optional[list] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca operações de campo de um campo (ver get_field_operations_by_field.py)
+    """
+    params = {
+        'cropSeason': crop_season,
+        'fieldOperationType': field_operation_type,
+        'startDate': start_date,
+        'endDate': end_date,
+        'embed': embed,
+        'workPlanIds': work_plan_ids,
+    }
+    url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/fieldOperations"
+    return await client.get_json(url, params=params)
+
+
+async def get_field_boundaries(
+    client: AsyncDeereClient,
+    organization_id: str,
+    field_id: str,
+    simple: bool = False,
+    accuracy_data: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca boundaries de um campo (ver get_field_boundaries.py)
+    """
+    params = {}
+    if simple:
+        params['simple'] = 'true'
+    if accuracy_data:
+        params['accuracyData'] = 'true'
+    url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/boundaries"
+    return await client.get_json(url, params=params)
+
+
+async def get_map_layer_summaries(
+    client: AsyncDeereClient,
+    organization_id: str,
+    field_id: str,
+    include_partial_summaries: bool = False,
+    embed: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca Map Layer Summaries de um campo (ver get_map_layer_summaries.py)
+    """
+    params = {'embed': embed}
+    if include_partial_summaries:
+        params['includePartialSummaries'] = 'true'
+    url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/mapLayerSummaries"
+    return await client.get_json(url, params=params)
+
+
+async def get_guidance_lines(
+    client: AsyncDeereClient,
+    org_id: str,
+    field_id: str,
+    status: str = "available",
+    embed: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca guidance lines de um campo (ver get_all_fields_guidance_lines.py)
+    """
+    params = {'status': status, 'embed': embed}
+    url = f"{API_BASE_URL}/organizations/{org_id}/fields/{field_id}/guidanceLines"
+    return await client.get_json(url, params=params)
+
+
+async def get_file_transfers(
+    client: AsyncDeereClient,
+    org_id: str,
+    source: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Busca TODOS os file transfers (todas as páginas) no mesmo formato
+    {"values": [...], "total": N} gravado por get_file_transfers.py. Lança
+    CollectionTruncated se alguma página falhar, em vez de devolver um resultado parcial.
+    """
+    url = f"{API_BASE_URL}/organizations/{org_id}/fileTransfers"
+    values = [record async for record in client.iter_collection(url, params={'source': source})]
+    return {'values': values, 'total': len(values)}
+
+
+async def get_files(
+    client: AsyncDeereClient,
+    filter_type: str = "ALL",
+    file_type: Optional[str] = None,
+    transferable: Optional[bool] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Primeira página do endpoint /files (ver test_files_endpoint.test_files_endpoint)
+    """
+    params = {'filter': filter_type, 'fileType': file_type, 'transferable': transferable}
+    return await client.get_json(f"{API_BASE_URL}/files", params=params)
+
+
+def iter_files(
+    client: AsyncDeereClient,
+    filter_type: str = "ALL",
+    file_type: Optional[str] = None,
+    transferable: Optional[bool] = None,
+    item_limit: int = ITEM_LIMIT
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Todos os arquivos de /files (todas as páginas), sob demanda
+    """
+    params = {'filter': filter_type, 'fileType': file_type, 'transferable': transferable}
+    return client.iter_collection(f"{API_BASE_URL}/files", params=params, item_limit=item_limit)
+
+
+async def get_file_details(client: AsyncDeereClient, file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Metadados de um arquivo: /files/{fileId}
+    """
+    return await client.get_json(f"{API_BASE_URL}/files/{file_id}")
+
+
+async def get_file_activities(client: AsyncDeereClient, file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Atividades de um arquivo: /files/{fileId}/fileActivities
+    """
+    return await client.get_json(f"{API_BASE_URL}/files/{file_id}/fileActivities")
+
+
+async def get_file_partnerships(client: AsyncDeereClient, file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Parcerias de um arquivo: /files/{fileId}/partnerships
+    """
+    return await client.get_json(f"{API_BASE_URL}/files/{file_id}/partnerships")
+
+
+async def get_presigned_download(client: AsyncDeereClient, file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    URL pré-assinada de download: /files/{fileId}/presignedDownload
+    """
+    return await client.get_json(f"{API_BASE_URL}/files/{file_id}/presignedDownload")
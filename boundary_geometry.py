@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Geometria local dos limites (boundaries) dos campos
+Projeta as coordenadas lon/lat de todos os boundaries em UTM (WGS 84, zona do
+próprio campo) de uma vez e calcula, com NumPy e sem laço por vértice, área,
+perímetro, centróide e retângulo envolvente de cada boundary. Permite conferir
+e recalcular offline os valores de `area` e `perimeter` da API sem novas
+chamadas nem os pedidos de accuracyData por campo.
+"""
+
+import json
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from spatial_index import boundary_polygons, select_active_boundaries, load_cached_boundaries
+from token_provider import get_valid_tokens
+
+# Elipsóide WGS 84 e parâmetros UTM
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+UTM_K0 = 0.9996
+UTM_FALSE_EASTING = 500000.0
+UTM_FALSE_NORTHING_SOUTH = 10000000.0
+EARTH_RADIUS = 6371008.8  # Raio médio, usado só na correção de escala
+
+AREA_UNITS = {'m2': 1.0, 'ha': 10000.0, 'ac': 4046.8564224, 'km2': 1e6}
+LENGTH_UNITS = {'m': 1.0, 'km': 1000.0, 'ft': 0.3048, 'mi': 1609.344, 'yd': 0.9144}
+
+# Séries de Krüger (ordem n³) para a projeção transversa de Mercator
+_N = WGS84_F / (2 - WGS84_F)
+_A = WGS84_A / (1 + _N) * (1 + _N ** 2 / 4 + _N ** 4 / 64)
+_ALPHA = (_N / 2 - 2 * _N ** 2 / 3 + 5 * _N ** 3 / 16, 13 * _N ** 2 / 48 - 3 * _N ** 3 / 5, 61 * _N ** 3 / 240)
+_BETA = (_N / 2 - 2 * _N ** 2 / 3 + 37 * _N ** 3 / 96, _N ** 2 / 48 + _N ** 3 / 15, 17 * _N ** 3 / 480)
+_DELTA = (2 * _N - 2 * _N ** 2 / 3 - 2 * _N ** 3, 7 * _N ** 2 / 3 - 8 * _N ** 3 / 5, 56 * _N ** 3 / 15)
+_E = 2 * np.sqrt(_N) / (1 + _N)
+
+
+def utm_zone(lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Zona UTM (1-60) e hemisfério sul (bool) de cada coordenada
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    zone = (np.floor((lon + 180) / 6).astype(np.int64) % 60) + 1
+    return zone, np.asarray(lat, dtype=np.float64) < 0
+
+
+def epsg_code(zone: int, south: bool) -> int:
+    return (32700 if south else 32600) + int(zone)
+
+
+def to_utm(lon, lat, zone, south) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    lon/lat (graus) → (E, N) em metros na zona informada (por coordenada ou única)
+    """
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    lam = np.radians(np.asarray(lon, dtype=np.float64) - (np.asarray(zone) * 6 - 183))
+    t = np.sinh(np.arctanh(np.sin(phi)) - _E * np.arctanh(_E * np.sin(phi)))
+    xi = np.arctan2(t, np.cos(lam))
+    eta = np.arctanh(np.sin(lam) / np.sqrt(1 + t ** 2))
+    easting, northing = eta.copy(), xi.copy()
+    for j, alpha in enumerate(_ALPHA, 1):
+        easting += alpha * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+        northing += alpha * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+    easting = UTM_FALSE_EASTING + UTM_K0 * _A * easting
+    northing = UTM_K0 * _A * northing + np.where(south, UTM_FALSE_NORTHING_SOUTH, 0.0)
+    return easting, northing
+
+
+def from_utm(easting, northing, zone, south) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (E, N) em metros na zona informada → lon/lat (graus)
+    """
+    northing = np.asarray(northing, dtype=np.float64) - np.where(south, UTM_FALSE_NORTHING_SOUTH, 0.0)
+    xi = northing / (UTM_K0 * _A)
+    eta = (np.asarray(easting, dtype=np.float64) - UTM_FALSE_EASTING) / (UTM_K0 * _A)
+    xi_p, eta_p = xi.copy(), eta.copy()
+    for j, beta in enumerate(_BETA, 1):
+        xi_p -= beta * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+        eta_p -= beta * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+    chi = np.arcsin(np.sin(xi_p) / np.cosh(eta_p))
+    phi = chi.copy()
+    for j, delta in enumerate(_DELTA, 1):
+        phi += delta * np.sin(2 * j * chi)
+    lam = np.arctan2(np.sinh(eta_p), np.cos(xi_p))
+    return np.degrees(lam) + (np.asarray(zone) * 6 - 183), np.degrees(phi)
+
+
+def flatten_rings(items: List[List[List[np.ndarray]]]):
+    """
+    Anéis de todos os itens (cada item = lista de polígonos [exterior, buracos...])
+    em arrays contínuos: coordenadas, início de cada anel, item e sinal do anel
+    """
+    rings, ring_item, ring_sign = [], [], []
+    for item, polygons in enumerate(items):
+        for polygon in polygons:
+            for position, ring in enumerate(polygon):
+                if np.array_equal(ring[0], ring[-1]):
+                    ring = ring[:-1]
+                if len(ring) < 3:
+                    continue
+                rings.append(ring)
+                ring_item.append(item)
+                ring_sign.append(1.0 if position == 0 else -1.0)
+    sizes = np.array([len(r) for r in rings], dtype=np.int64)
+    coordinates = np.vstack(rings) if rings else np.empty((0, 2))
+    ring_start = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64) if rings else np.empty(0, np.int64)
+    return coordinates, ring_start, sizes, np.array(ring_item, dtype=np.int64), np.array(ring_sign)
+
+
+def polygon_metrics(items: List[List[List[np.ndarray]]]) -> Dict[str, np.ndarray]:
+    """
+    Área, perímetro, centróide e retângulo envolvente de vários itens de uma vez
+
+    Cada item é uma lista de polígonos [anel exterior, buracos...] em lon/lat.
+    A área desconta os buracos; o perímetro soma todos os anéis. Área e
+    perímetro são corrigidos pelo fator de escala UTM no centróide do item.
+
+    Returns:
+        Arrays com um valor por item: area_m2, perimeter_m, centroid_lon,
+        centroid_lat, min_lon, min_lat, max_lon, max_lat, zone, south, vertices
+    """
+    count = len(items)
+    coordinates, ring_start, sizes, ring_item, ring_sign = flatten_rings(items)
+    metrics = {name: np.full(count, np.nan) for name in (
+        'area_m2', 'perimeter_m', 'centroid_lon', 'centroid_lat', 'min_lon', 'min_lat', 'max_lon', 'max_lat')}
+    metrics['zone'] = np.zeros(count, dtype=np.int64)
+    metrics['south'] = np.zeros(count, dtype=bool)
+    metrics['vertices'] = np.bincount(ring_item, weights=sizes, minlength=count).astype(np.int64)
+    if not len(coordinates):
+        return metrics
+
+    vertex_ring = np.repeat(np.arange(len(sizes)), sizes)
+    vertex_item = ring_item[vertex_ring]
+    lon, lat = coordinates[:, 0], coordinates[:, 1]
+
+    # Zona de cada item pela média das longitudes (o campo inteiro fica numa zona)
+    vertex_count = np.bincount(vertex_item, minlength=count)
+    has_vertices = vertex_count > 0
+    mean_lon = np.bincount(vertex_item, weights=lon, minlength=count) / np.maximum(vertex_count, 1)
+    mean_lat = np.bincount(vertex_item, weights=lat, minlength=count) / np.maximum(vertex_count, 1)
+    zone, south = utm_zone(mean_lon, mean_lat)
+    metrics['zone'], metrics['south'] = np.where(has_vertices, zone, 0), south & has_vertices
+
+    x, y = to_utm(lon, lat, zone[vertex_item], south[vertex_item])
+    # Coordenadas relativas ao primeiro vértice do item, para não perder precisão no shoelace
+    first = np.searchsorted(vertex_item, np.arange(count)).clip(0, len(x) - 1)
+    origin_x, origin_y = x[first], y[first]
+    x, y = x - origin_x[vertex_item], y - origin_y[vertex_item]
+
+    following = np.arange(1, len(x) + 1)
+    ring_end = ring_start + sizes
+    following[ring_end - 1] = ring_start
+    cross = x * y[following] - x[following] * y
+    ring_area = np.add.reduceat(cross, ring_start) / 2
+    ring_cx = np.add.reduceat((x + x[following]) * cross, ring_start) / 6
+    ring_cy = np.add.reduceat((y + y[following]) * cross, ring_start) / 6
+    # Orientação de cada anel normalizada: exteriores somam, buracos subtraem
+    orientation = ring_sign * np.sign(ring_area)
+    area = np.bincount(ring_item, weights=np.abs(ring_area) * ring_sign, minlength=count)
+    moment_x = np.bincount(ring_item, weights=ring_cx * orientation, minlength=count)
+    moment_y = np.bincount(ring_item, weights=ring_cy * orientation, minlength=count)
+    segment = np.hypot(x[following] - x, y[following] - y)
+    perimeter = np.bincount(ring_item, weights=np.add.reduceat(segment, ring_start), minlength=count)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centroid_x = moment_x / area + origin_x
+        centroid_y = moment_y / area + origin_y
+    centroid_lon, centroid_lat = from_utm(centroid_x, centroid_y, zone, south)
+
+    # Fator de escala da projeção no centróide: k ≈ k0 (1 + x² / 2R²)
+    scale = UTM_K0 * (1 + (centroid_x - UTM_FALSE_EASTING) ** 2 / (2 * EARTH_RADIUS ** 2))
+    metrics['area_m2'] = np.where(has_vertices, area / scale ** 2, np.nan)
+    metrics['perimeter_m'] = np.where(has_vertices, perimeter / scale, np.nan)
+    metrics['centroid_lon'] = np.where(has_vertices, centroid_lon, np.nan)
+    metrics['centroid_lat'] = np.where(has_vertices, centroid_lat, np.nan)
+
+    # Os vértices já estão agrupados por item, na ordem dos itens
+    starts = np.searchsorted(vertex_item, np.flatnonzero(has_vertices))
+    for name, values, reduce in (('min_lon', lon, np.minimum), ('min_lat', lat, np.minimum),
+                                 ('max_lon', lon, np.maximum), ('max_lat', lat, np.maximum)):
+        metrics[name][has_vertices] = reduce.reduceat(values, starts)
+    return metrics
+
+
+def _api_value(measure: Optional[Dict[str, Any]], units: Dict[str, float]) -> Optional[float]:
+    """
+    Valor {'value', 'unitId'} da API convertido para m² ou m (None se desconhecido)
+    """
+    if not isinstance(measure, dict) or not isinstance(measure.get('value'), (int, float)):
+        return None
+    factor = units.get(str(measure.get('unitId', '')).lower())
+    return float(measure['value']) * factor if factor else None
+
+
+def boundary_metrics(boundaries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Métricas locais de uma lista de boundaries da API, comparadas com os
+    valores de `area` e `perimeter` que a própria API informa
+
+    Returns:
+        Um dicionário por boundary: id, área (m² e ha), perímetro (m), centróide,
+        bbox [min_lon, min_lat, max_lon, max_lat], EPSG usado e diferenças (%)
+        em relação à API
+    """
+    metrics = polygon_metrics([boundary_polygons(boundary) for boundary in boundaries])
+    results = []
+    for i, boundary in enumerate(boundaries):
+        area, perimeter = float(metrics['area_m2'][i]), float(metrics['perimeter_m'][i])
+        api_area = _api_value(boundary.get('area'), AREA_UNITS)
+        api_perimeter = _api_value(boundary.get('perimeter'), LENGTH_UNITS)
+        valid = bool(np.isfinite(area))
+        zone, south = int(metrics['zone'][i]), bool(metrics['south'][i])
+        results.append({
+            'id': boundary.get('id'),
+            'name': boundary.get('name'),
+            'vertices': int(metrics['vertices'][i]),
+            'area_m2': area if valid else None,
+            'area_ha': area / 10000 if valid else None,
+            'perimeter_m': perimeter if valid else None,
+            'centroid': [float(metrics['centroid_lon'][i]), float(metrics['centroid_lat'][i])] if valid else None,
+            'bbox': [float(metrics[k][i]) for k in ('min_lon', 'min_lat', 'max_lon', 'max_lat')] if valid else None,
+            'epsg': epsg_code(zone, south) if valid else None,
+            'api_area_m2': api_area,
+            'api_perimeter_m': api_perimeter,
+            'area_diff_pct': (area - api_area) / api_area * 100 if valid and api_area else None,
+            'perimeter_diff_pct': (perimeter - api_perimeter) / api_perimeter * 100 if valid and api_perimeter else None,
+        })
+    return results
+
+
+def field_geometry(org_id, refresh: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Métricas dos boundaries ativos de todos os campos com boundary em cache,
+    calculadas num único lote. Retorna {field_id: [métricas por boundary]}.
+    """
+    by_field = load_cached_boundaries(org_id, refresh=refresh)
+    owners, boundaries = [], []
+    for field_id, field_boundaries in by_field.items():
+        for boundary in select_active_boundaries(field_boundaries):
+            owners.append(field_id)
+            boundaries.append(boundary)
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for field_id, metrics in zip(owners, boundary_metrics(boundaries)):
+        results.setdefault(field_id, []).append(metrics)
+    return results
+
+
+def main():
+    """
+    Recalcula área e perímetro de todos os boundaries em cache da organização,
+    mostra as maiores divergências em relação à API e salva o resultado
+    """
+    org_id = 5881930  # Substitua pelo seu orgId
+    if not get_valid_tokens():
+        return
+    started = time.time()
+    results = field_geometry(org_id)
+    flat = [m for metrics in results.values() for m in metrics]
+    print(f"📏 {len(flat)} boundaries de {len(results)} campos calculados em {time.time() - started:.2f}s")
+    print(f"   • Área total: {sum(m['area_ha'] or 0 for m in flat):,.2f} ha")
+
+    compared = [m for m in flat if m['area_diff_pct'] is not None]
+    if compared:
+        diffs = np.abs([m['area_diff_pct'] for m in compared])
+        print(f"   • Diferença de área em relação à API: mediana {np.median(diffs):.3f}%, máx {diffs.max():.3f}%")
+        for m in sorted(compared, key=lambda m: -abs(m['area_diff_pct']))[:5]:
+            print(f"     - {m['name'] or m['id']}: {m['area_ha']:.2f} ha local × "
+                  f"{m['api_area_m2'] / 10000:.2f} ha API ({m['area_diff_pct']:+.2f}%)")
+
+    summary_file = f"boundary_geometry_{org_id}.json"
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado salvo em {summary_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Boundaries da organização inteira em formato compacto
+Empacota os anéis ativos da cópia sincronizada da coleção /boundaries
+(incremental_sync) em arrays contínuos, sem listas de dicts: um buffer float32
+de coordenadas, os offsets de cada anel nesse buffer e os offsets dos anéis de
+cada campo. float32 puro perde precisão em lon/lat (~1 m perto de 100°), então
+as coordenadas de cada campo são gravadas relativas a uma origem float64 do
+campo (canto sudoeste), o que mantém a precisão abaixo de 1 mm. Milhares de
+campos cabem em dezenas de MB e alimentam FieldIndex, polygon_metrics e os
+níveis de precisão de boundary_simplify. O arquivo <SYNC_DIR>/boundaries_packed_<orgId>.npz
+guarda o synced_at da cópia sincronizada e é refeito quando ela muda.
+"""
+
+import os
+import time
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+import requests
+
+from boundary_geometry import flatten_rings, polygon_metrics
+from collection_planner import collection_unavailable, fetch_by_field
+from incremental_sync import SYNC_DIR, boundaries_sync
+from spatial_index import FieldIndex, boundary_polygons, select_active_boundaries, group_by_field
+from token_provider import get_valid_tokens
+
+
+class PackedBoundaries:
+    """
+    Anéis de vários campos em arrays contínuos
+
+    Args:
+        field_ids: Campos, na ordem dos offsets
+        field_origin: Origem (lon, lat) float64 de cada campo, shape (F, 2)
+        field_offsets: Anéis do campo i em [field_offsets[i], field_offsets[i + 1])
+        ring_offsets: Vértices do anel j em [ring_offsets[j], ring_offsets[j + 1])
+        ring_exterior: Se o anel abre um novo polígono (exterior) ou é buraco
+        coordinates: Vértices (V, 2) float32 relativos à origem do campo, sem o
+                     vértice de fechamento repetido
+        significance: Significância Douglas–Peucker de cada vértice em metros
+                      (opcional, calculada por boundary_simplify)
+        synced_at: Horário da sincronização dos boundaries de origem
+    """
+
+    def __init__(self, field_ids: List[str], field_origin: np.ndarray, field_offsets: np.ndarray,
+                 ring_offsets: np.ndarray, ring_exterior: np.ndarray, coordinates: np.ndarray,
+                 significance: Optional[np.ndarray] = None, synced_at: Optional[float] = None):
+        self.field_ids = list(field_ids)
+        self.field_origin = field_origin
+        self.field_offsets = field_offsets
+        self.ring_offsets = ring_offsets
+        self.ring_exterior = ring_exterior
+        self.coordinates = coordinates
+        self.significance = significance
+        self.synced_at = synced_at
+        self._positions = {field_id: index for index, field_id in enumerate(self.field_ids)}
+
+    @classmethod
+    def from_polygons(cls, polygons_by_field: Dict[str, List[List[np.ndarray]]]) -> 'PackedBoundaries':
+        """
+        Empacota {field_id: [[anel exterior, buracos...], ...]} (lon/lat)
+        """
+        builder = _PackBuilder()
+        for field_id, polygons in polygons_by_field.items():
+            builder.add(field_id, polygons)
+        return builder.build()
+
+    @classmethod
+    def from_boundaries(cls, boundaries_by_field: Dict[str, List[Dict[str, Any]]]) -> 'PackedBoundaries':
+        """
+        Empacota os boundaries ativos de cada campo ({field_id: [boundaries da API]})
+        """
+        builder = _PackBuilder()
+        for field_id, boundaries in boundaries_by_field.items():
+            builder.add(field_id, [polygon for boundary in select_active_boundaries(boundaries)
+                                   for polygon in boundary_polygons(boundary)])
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.field_ids)
+
+    @property
+    def ring_count(self) -> int:
+        return len(self.ring_exterior)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.coordinates)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.field_origin, self.field_offsets, self.ring_offsets, self.ring_exterior, self.coordinates]
+        if self.significance is not None:
+            arrays.append(self.significance)
+        return sum(array.nbytes for array in arrays)
+
+    def ring_field(self) -> np.ndarray:
+        """
+        Índice do campo de cada anel
+        """
+        return np.repeat(np.arange(len(self.field_ids)), np.diff(self.field_offsets))
+
+    def vertex_field(self) -> np.ndarray:
+        """
+        Índice do campo de cada vértice
+        """
+        return np.repeat(self.ring_field(), np.diff(self.ring_offsets))
+
+    def lonlat(self) -> np.ndarray:
+        """
+        Todos os vértices em lon/lat absolutos (float64)
+        """
+        return self.coordinates.astype(np.float64) + self.field_origin[self.vertex_field()]
+
+    def polygons(self, field) -> List[List[np.ndarray]]:
+        """
+        Polígonos [[anel exterior, buracos...], ...] de um campo (id ou índice), em lon/lat float64
+        """
+        index = self._positions[field] if isinstance(field, str) else int(field)
+        first, last = self.field_offsets[index], self.field_offsets[index + 1]
+        start, end = self.ring_offsets[first], self.ring_offsets[last]
+        vertices = self.coordinates[start:end].astype(np.float64) + self.field_origin[index]
+        polygons: List[List[np.ndarray]] = []
+        for ring in range(first, last):
+            coordinates = vertices[self.ring_offsets[ring] - start:self.ring_offsets[ring + 1] - start]
+            if self.ring_exterior[ring] or not polygons:
+                polygons.append([coordinates])
+            else:
+                polygons[-1].append(coordinates)
+        return polygons
+
+    def polygons_by_field(self) -> Dict[str, List[List[np.ndarray]]]:
+        """
+        {field_id: polígonos}, no formato aceito por FieldIndex
+        """
+        return {field_id: self.polygons(index) for index, field_id in enumerate(self.field_ids)}
+
+    def bounds(self) -> np.ndarray:
+        """
+        Retângulo (min_lon, min_lat, max_lon, max_lat) de cada campo; NaN para campos sem anéis
+        """
+        result = np.full((len(self.field_ids), 4), np.nan)
+        has_vertices = np.diff(self.ring_offsets[self.field_offsets]) > 0
+        if not has_vertices.any():
+            return result
+        starts = self.ring_offsets[self.field_offsets[:-1][has_vertices]]
+        origin = self.field_origin[has_vertices]
+        result[has_vertices, :2] = np.minimum.reduceat(self.coordinates, starts).astype(np.float64) + origin
+        result[has_vertices, 2:] = np.maximum.reduceat(self.coordinates, starts).astype(np.float64) + origin
+        return result
+
+    def field_index(self, cell_size: Optional[float] = None) -> FieldIndex:
+        """
+        Índice espacial (spatial_index) sobre os campos empacotados
+        """
+        return FieldIndex(self.polygons_by_field(), cell_size=cell_size)
+
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """
+        polygon_metrics com um item por campo (todos os boundaries ativos juntos)
+        """
+        return polygon_metrics([self.polygons(index) for index in range(len(self.field_ids))])
+
+    def subset(self, keep: np.ndarray) -> 'PackedBoundaries':
+        """
+        Cópia só com os vértices marcados em keep (mesmos campos e anéis)
+        """
+        kept_before = np.concatenate([[0], np.cumsum(keep)])
+        significance = self.significance[keep] if self.significance is not None else None
+        return PackedBoundaries(self.field_ids, self.field_origin, self.field_offsets,
+                                kept_before[self.ring_offsets], self.ring_exterior,
+                                self.coordinates[keep], significance, self.synced_at)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_file = f"{path}.tmp.npz"
+        arrays = {
+            'field_ids': np.array(self.field_ids, dtype=str),
+            'field_origin': self.field_origin,
+            'field_offsets': self.field_offsets,
+            'ring_offsets': self.ring_offsets,
+            'ring_exterior': self.ring_exterior,
+            'coordinates': self.coordinates,
+            'synced_at': np.array(self.synced_at if self.synced_at is not None else np.nan),
+        }
+        if self.significance is not None:
+            arrays['significance'] = self.significance
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PackedBoundaries':
+        with np.load(path) as data:
+            synced_at = float(data['synced_at'])
+            return cls([str(f) for f in data['field_ids']], data['field_origin'], data['field_offsets'],
+                       data['ring_offsets'], data['ring_exterior'], data['coordinates'],
+                       data['significance'] if 'significance' in data else None,
+                       None if np.isnan(synced_at) else synced_at)
+
+
+class _PackBuilder:
+    """
+    Acumula os anéis campo a campo e monta o PackedBoundaries no final
+    """
+
+    def __init__(self):
+        self.field_ids: List[str] = []
+        self.origins: List[np.ndarray] = []
+        self.field_rings: List[int] = []
+        self.sizes: List[np.ndarray] = []
+        self.exterior: List[np.ndarray] = []
+        self.chunks: List[np.ndarray] = []
+
+    def add(self, field_id: str, polygons: List[List[np.ndarray]]) -> None:
+        coordinates, _, sizes, _, ring_sign = flatten_rings([polygons])
+        origin = coordinates.min(axis=0) if len(coordinates) else np.zeros(2)
+        self.field_ids.append(field_id)
+        self.origins.append(origin)
+        self.field_rings.append(len(sizes))
+        self.sizes.append(sizes)
+        self.exterior.append(ring_sign > 0)
+        self.chunks.append((coordinates - origin).astype(np.float32))
+
+    def build(self) -> PackedBoundaries:
+        sizes = np.concatenate(self.sizes) if self.sizes else np.empty(0, np.int64)
+        return PackedBoundaries(
+            self.field_ids,
+            np.array(self.origins, dtype=np.float64).reshape(-1, 2),
+            np.concatenate([[0], np.cumsum(self.field_rings, dtype=np.int64)]).astype(np.int64),
+            np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            np.concatenate(self.exterior) if self.exterior else np.empty(0, bool),
+            np.concatenate(self.chunks) if self.chunks else np.empty((0, 2), np.float32),
+        )
+
+
+def packed_path(org_id, state_dir: str = SYNC_DIR) -> str:
+    return os.path.join(state_dir, f"boundaries_packed_{org_id}.npz")
+
+
+def load_org_boundaries(org_id, refresh: bool = False, state_dir: str = SYNC_DIR) -> PackedBoundaries:
+    """
+    Boundaries empacotados da organização. Sincroniza a cópia local se ainda
+    não houver (ou se refresh=True) e só reempacota quando o arquivo salvo é de
+    outra sincronização (synced_at diferente). Sem a coleção /boundaries da
+    organização (403/404), busca os boundaries de todos os campos em paralelo
+    (collection_planner.fetch_by_field); esse resultado não é salvo, pois não
+    há sincronização à qual associá-lo.
+    """
+    sync = boundaries_sync(org_id, state_dir)
+    if refresh or sync.synced_at is None:
+        try:
+            sync.sync()
+        except requests.exceptions.HTTPError as e:
+            if not collection_unavailable(e):
+                raise
+            print(f"⚠️ Coleção de boundaries da organização indisponível ({e.response.status_code}); "
+                  f"buscando campo a campo")
+            return PackedBoundaries.from_boundaries(fetch_by_field(org_id, 'boundaries'))
+    path = packed_path(org_id, state_dir)
+    if os.path.exists(path):
+        try:
+            packed = PackedBoundaries.load(path)
+            if packed.synced_at is not None and packed.synced_at == sync.synced_at:
+                return packed
+        except (OSError, ValueError, KeyError):
+            print(f"⚠️ {path} ilegível; empacotando os boundaries de novo")
+    packed = PackedBoundaries.from_boundaries(group_by_field(sync.values()))
+    packed.synced_at = sync.synced_at
+    packed.save(path)
+    return packed
+
+
+def build_field_index(org_id, refresh: bool = False, state_dir: str = SYNC_DIR) -> FieldIndex:
+    """
+    Índice espacial de todos os campos da organização com boundary em cache
+    """
+    return load_org_boundaries(org_id, refresh=refresh, state_dir=state_dir).field_index()
+
+
+def print_packed_summary(packed: PackedBoundaries) -> None:
+    """
+    Resumo dos boundaries empacotados: campos, anéis, vértices, memória e áreas
+    """
+    with_rings = int(np.count_nonzero(np.diff(packed.field_offsets)))
+    print(f"📦 {len(packed)} campos ({with_rings} com boundary), {packed.ring_count:,} anéis, "
+          f"{packed.vertex_count:,} vértices em {packed.nbytes / 1024 / 1024:.1f} MB")
+    if not packed.vertex_count:
+        return
+    metrics = packed.metrics()
+    area_ha = metrics['area_m2'] / 10000
+    print(f"   • Área total: {np.nansum(area_ha):,.2f} ha")
+    for index in np.argsort(-np.nan_to_num(area_ha))[:5]:
+        print(f"   • {packed.field_ids[index]}: {area_ha[index]:,.2f} ha, "
+              f"{metrics['vertices'][index]:,} vértices")
+
+
+def main():
+    """
+    Sincroniza os boundaries da organização, salva o formato compacto e monta
+    o índice espacial a partir dele
+    """
+    org_id = 5881930  # Substitua pelo seu orgId
+    if not get_valid_tokens():
+        return
+    started = time.time()
+    packed = load_org_boundaries(org_id, refresh=True)
+    print(f"🗺️ Boundaries sincronizados e empacotados em {time.time() - started:.1f}s")
+    print_packed_summary(packed)
+
+    started = time.time()
+    index = packed.field_index()
+    print(f"🗺️ Índice com {len(index)} campos em {time.time() - started:.1f}s")
+    print(f"💾 Boundaries salvos em {packed_path(org_id)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Simplificação local dos boundaries em vários níveis de precisão
+Em vez de pedir `simple=true` à API (outra requisição, sem controle da
+precisão), roda Douglas–Peucker localmente, em metros (UTM), sobre todos os
+anéis de uma vez. O resultado não é um polígono por tolerância: cada vértice
+recebe a sua significância, a maior tolerância em que o Douglas–Peucker ainda
+o manteria. Qualquer nível sai então de um filtro `significância > tolerância`
+sobre o anel em resolução total, que continua guardado. As significâncias
+ficam junto dos boundaries empacotados (boundary_harvester), em
+<SYNC_DIR>/boundaries_packed_<orgId>.npz, e são recalculadas quando a cópia
+sincronizada dos boundaries muda.
+"""
+
+import time
+from typing import Optional, Dict, List
+
+import numpy as np
+
+from boundary_geometry import to_utm, utm_zone
+from boundary_harvester import PackedBoundaries, load_org_boundaries, packed_path
+from incremental_sync import SYNC_DIR
+from spatial_index import FieldIndex, expand_ranges
+from token_provider import get_valid_tokens
+
+# Níveis nomeados (tolerância em metros); 'full' é a resolução original
+LEVELS = {'full': 0.0, 'fine': 0.5, 'medium': 2.0, 'coarse': 10.0, 'overview': 50.0}
+
+
+def _segment_distance(px, py, ax, ay, bx, by) -> np.ndarray:
+    """
+    Distância de cada ponto ao segmento AB correspondente
+    """
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(length2 > 0, ((px - ax) * dx + (py - ay) * dy) / length2, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def douglas_peucker_significance(x: np.ndarray, y: np.ndarray, ring_start: np.ndarray,
+                                 sizes: np.ndarray) -> np.ndarray:
+    """
+    Significância de cada vértice de vários anéis fechados (coordenadas métricas)
+
+    Cada anel é dividido no primeiro vértice e no vértice mais distante dele
+    (ambos mantidos sempre). O Douglas–Peucker avança por níveis da recursão,
+    com todos os segmentos pendentes de todos os anéis tratados juntos. A
+    significância de um vértice é a distância que o escolheu, limitada pela do
+    segmento pai. Assim o conjunto mantido em qualquer tolerância é exatamente
+    o do Douglas–Peucker nessa tolerância. O vértice mais significativo
+    restante também é mantido sempre, para que nenhum anel fique com menos de
+    3 vértices.
+    """
+    significance = np.zeros(len(x), dtype=np.float64)
+    if not len(sizes):
+        return significance.astype(np.float32)
+
+    # Anel fechado: os vértices do anel seguidos do primeiro de novo
+    closed_sizes = sizes + 1
+    ring, offset = expand_ranges(np.zeros(len(sizes), dtype=np.int64), closed_sizes)
+    source = ring_start[ring] + offset % sizes[ring]
+    closed_start = np.concatenate([[0], np.cumsum(closed_sizes)[:-1]])
+    cx, cy = x[source], y[source]
+    closed_significance = np.zeros(len(source))
+
+    first = closed_start
+    distance = np.hypot(cx - cx[first[ring]], cy - cy[first[ring]])
+    farthest_distance = np.maximum.reduceat(distance, closed_start)
+    candidates = np.flatnonzero(distance == farthest_distance[ring])
+    farthest = candidates[np.concatenate([[True], ring[candidates][1:] != ring[candidates][:-1]])]
+    closed_significance[first] = np.inf
+    closed_significance[farthest] = np.inf
+
+    last = closed_start + closed_sizes - 1
+    starts = np.concatenate([first, farthest])
+    ends = np.concatenate([farthest, last])
+    caps = np.full(len(starts), np.inf)
+    while len(starts):
+        inner = ends - starts - 1
+        active = inner > 0
+        starts, ends, caps, inner = starts[active], ends[active], caps[active], inner[active]
+        if not len(starts):
+            break
+        owner, vertex = expand_ranges(starts + 1, inner)
+        distance = _segment_distance(cx[vertex], cy[vertex], cx[starts[owner]], cy[starts[owner]],
+                                     cx[ends[owner]], cy[ends[owner]])
+        block_start = np.concatenate([[0], np.cumsum(inner)[:-1]])
+        segment_max = np.maximum.reduceat(distance, block_start)
+        candidates = np.flatnonzero(distance == segment_max[owner])
+        chosen = candidates[np.concatenate([[True], owner[candidates][1:] != owner[candidates][:-1]])]
+        split = vertex[chosen]
+        value = np.minimum(segment_max, caps)
+        closed_significance[split] = value
+
+        # Segmentos colineares (distância zero) não precisam continuar
+        useful = segment_max > 0
+        starts = np.concatenate([starts[useful], split[useful]])
+        ends = np.concatenate([split[useful], ends[useful]])
+        caps = np.concatenate([value[useful], value[useful]])
+
+    # Volta para os vértices originais (sem o fechamento repetido)
+    original = offset < sizes[ring]
+    significance[source[original]] = closed_significance[original]
+
+    # Terceiro vértice garantido: o mais significativo fora das âncoras
+    candidate = np.where(np.isinf(significance), -1.0, significance)
+    vertex_ring = np.repeat(np.arange(len(sizes)), sizes)
+    best = np.maximum.reduceat(candidate, ring_start)
+    hits = np.flatnonzero((candidate == best[vertex_ring]) & (best[vertex_ring] >= 0))
+    keep = hits[np.concatenate([[True], vertex_ring[hits][1:] != vertex_ring[hits][:-1]])] if len(hits) else hits
+    significance[keep] = np.inf
+    return significance.astype(np.float32)
+
+
+class SimplifiedBoundaries:
+    """
+    Boundaries empacotados em resolução total + significância de cada vértice
+
+    Args:
+        packed: PackedBoundaries (boundary_harvester) em resolução total
+        significance: Significância de cada vértice em metros (None = a guardada
+                      em packed ou, sem ela, calcular e guardar em packed)
+    """
+
+    def __init__(self, packed: PackedBoundaries, significance: Optional[np.ndarray] = None):
+        self.packed = packed
+        if significance is None:
+            significance = packed.significance
+        if significance is None:
+            significance = self._compute_significance()
+        self.significance = significance
+        packed.significance = significance
+
+    @classmethod
+    def from_polygons(cls, polygons_by_field: Dict[str, List[List[np.ndarray]]]) -> 'SimplifiedBoundaries':
+        return cls(PackedBoundaries.from_polygons(polygons_by_field))
+
+    @property
+    def field_ids(self) -> List[str]:
+        return self.packed.field_ids
+
+    def _compute_significance(self) -> np.ndarray:
+        if not self.packed.vertex_count:
+            return np.zeros(0, dtype=np.float32)
+        lonlat = self.packed.lonlat()
+        lon, lat = lonlat[:, 0], lonlat[:, 1]
+        ring_start, ring_size = self.packed.ring_offsets[:-1], np.diff(self.packed.ring_offsets)
+        vertex_ring = np.repeat(np.arange(len(ring_size)), ring_size)
+        # Zona UTM de cada anel pela média das longitudes
+        mean_lon = np.add.reduceat(lon, ring_start) / ring_size
+        mean_lat = np.add.reduceat(lat, ring_start) / ring_size
+        zone, south = utm_zone(mean_lon, mean_lat)
+        x, y = to_utm(lon, lat, zone[vertex_ring], south[vertex_ring])
+        return douglas_peucker_significance(x, y, ring_start, ring_size)
+
+    def vertex_count(self, tolerance: float = 0.0) -> int:
+        return int(np.count_nonzero(self.significance > tolerance)) if tolerance > 0 else len(self.significance)
+
+    def packed_level(self, tolerance: float) -> PackedBoundaries:
+        """
+        Boundaries empacotados só com os vértices de significância acima da
+        tolerância (metros; 0 = resolução total)
+        """
+        if tolerance <= 0:
+            return self.packed
+        return self.packed.subset(self.significance > tolerance)
+
+    def level(self, tolerance: float) -> Dict[str, List[List[np.ndarray]]]:
+        """
+        Polígonos de cada campo com a tolerância pedida (metros; 0 = resolução
+        total), no formato aceito por FieldIndex e polygon_metrics
+        """
+        return self.packed_level(tolerance).polygons_by_field()
+
+
+def get_boundary_levels(org_id, refresh: bool = False, state_dir: str = SYNC_DIR) -> SimplifiedBoundaries:
+    """
+    Níveis de precisão dos boundaries ativos da organização. A significância é
+    calculada uma vez por sincronização e guardada no mesmo arquivo dos
+    boundaries empacotados (boundary_harvester.load_org_boundaries).
+    """
+    packed = load_org_boundaries(org_id, refresh=refresh, state_dir=state_dir)
+    computed = packed.significance is None
+    levels = SimplifiedBoundaries(packed)
+    if computed:
+        packed.save(packed_path(org_id, state_dir))
+    return levels
+
+
+def build_simplified_index(org_id, tolerance: float = LEVELS['medium'], refresh: bool = False) -> FieldIndex:
+    """
+    Índice espacial sobre os boundaries simplificados (menos arestas por teste)
+    """
+    return FieldIndex(get_boundary_levels(org_id, refresh=refresh).level(tolerance))
+
+
+def main():
+    """
+    Calcula os níveis de precisão dos boundaries em cache e mostra quantos
+    vértices sobram em cada nível
+    """
+    org_id = 5881930  # Substitua pelo seu orgId
+    if not get_valid_tokens():
+        return
+    started = time.time()
+    levels = get_boundary_levels(org_id)
+    print(f"✂️ {len(levels.field_ids)} campos, {levels.packed.ring_count} anéis em {time.time() - started:.2f}s")
+    full = max(levels.vertex_count(), 1)
+    for name, tolerance in LEVELS.items():
+        count = levels.vertex_count(tolerance)
+        print(f"   • {name} ({tolerance} m): {count:,} vértices ({count / full * 100:.1f}%)")
+    print(f"💾 Níveis salvos em {packed_path(org_id)}")
+
+
+if __name__ == "__main__":
+    main()
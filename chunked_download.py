@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Download de arquivos em partes paralelas, com retomada
+Divide o arquivo em faixas de bytes (parâmetros offset/size de /files/{fileId}),
+baixa as faixas concorrentemente e grava cada uma na posição certa de um
+arquivo .part. O progresso (partes concluídas) fica em disco, então um download
+interrompido continua da última parte concluída.
+
+Cada resposta é conferida pelo Content-Range; sem ele, o início de cada parte é
+comparado com o início do arquivo (um servidor que ignora o offset devolveria
+os primeiros bytes em todas as partes). No fim, a soma dos bytes recebidos é
+conferida com o nativeSize (os metadados de /files não trazem hash).
+"""
+
+import os
+import json
+import threading
+from typing import Optional, Dict, Any, List
+
+import requests
+
+from deere_client import get_client
+from download_cache import replace_file
+from fanout import iter_concurrently
+from retry_policy import RETRYABLE_EXCEPTIONS
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+DOWNLOAD_DIR = "downloads"
+CHUNK_SIZE = 8 * 1024 * 1024  # Bytes por parte
+MAX_WORKERS = 4  # Partes baixadas simultaneamente por arquivo
+CHUNK_ATTEMPTS = 3  # Tentativas por parte (falhas no meio do corpo não passam pelo RetryPolicy)
+READ_SIZE = 64 * 1024
+PROBE_SIZE = 4096  # Bytes do início de cada parte comparados com o início do arquivo
+
+
+class RangeNotSupported(Exception):
+    """
+    A API não respeitou offset/size (Content-Range diferente da faixa pedida,
+    bytes a mais ou parte igual ao início do arquivo)
+    """
+
+
+def check_content_range(response, offset: int, size: int, total: Optional[int] = None) -> bool:
+    """
+    Confere o Content-Range da resposta com a faixa pedida (e com o tamanho
+    total, se conhecido). Retorna False se a resposta não tem Content-Range;
+    levanta RangeNotSupported se não confere.
+    """
+    content_range = response.headers.get('Content-Range')
+    if not content_range:
+        return False
+    try:
+        unit, spec = content_range.split(' ', 1)
+        byte_range, length = spec.split('/', 1)
+        start, end = (int(value) for value in byte_range.split('-', 1))
+    except ValueError:
+        raise RangeNotSupported(f"Content-Range inválido: {content_range}")
+    if (unit != 'bytes' or start != offset or end != offset + size - 1
+            or (total is not None and length != '*' and int(length) != total)):
+        raise RangeNotSupported(
+            f"Content-Range {content_range} para a faixa {offset}-{offset + size - 1}/{total}")
+    return True
+
+
+def get_native_size(file_id: str) -> Optional[int]:
+    """
+    Tamanho do arquivo (nativeSize) a partir dos metadados de /files/{fileId}
+    """
+    response = get_client().get(f"{API_BASE_URL}/files/{file_id}")
+    if response.status_code != 200:
+        print(f"❌ Erro {response.status_code} ao buscar metadados do arquivo {file_id}")
+        return None
+    size = response.json().get('nativeSize')
+    return int(size) if size is not None else None
+
+
+class ChunkedDownload:
+    """
+    Estado de um download em partes
+
+    Arquivos usados (ao lado de file_path):
+        <file_path>.part           conteúdo parcial, já com o tamanho final
+        <file_path>.progress.json  partes concluídas e bytes recebidos em cada uma
+
+    Args:
+        file_id: ID do arquivo
+        file_path: Caminho final do arquivo
+        native_size: Tamanho esperado em bytes
+        chunk_size: Tamanho de cada parte
+        accept: Header Accept da requisição de conteúdo
+    """
+
+    def __init__(
+        self,
+        file_id: str,
+        file_path: str,
+        native_size: int,
+        chunk_size: int = CHUNK_SIZE,
+        accept: str = 'application/octet-stream'
+    ):
+        self.file_id = file_id
+        self.file_path = file_path
+        self.native_size = native_size
+        self.chunk_size = chunk_size
+        self.accept = accept
+        self.part_path = f"{file_path}.part"
+        self.progress_path = f"{file_path}.progress.json"
+        self.done: Dict[int, int] = {}  # parte → bytes recebidos
+        self._file_head: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.native_size // self.chunk_size))
+
+    def _chunk_range(self, index: int):
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, self.native_size - offset)
+
+    def load_progress(self) -> None:
+        """
+        Recupera as partes já concluídas, se o progresso for do mesmo arquivo e
+        com a mesma divisão; caso contrário começa do zero
+        """
+        self.done = {}
+        if not (os.path.exists(self.progress_path) and os.path.exists(self.part_path)):
+            return
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (progress.get('file_id') == self.file_id and progress.get('native_size') == self.native_size
+                and progress.get('chunk_size') == self.chunk_size and isinstance(progress.get('done'), dict)):
+            self.done = {int(index): received for index, received in progress['done'].items()}
+
+    def _save_progress(self) -> None:
+        progress = {
+            'file_id': self.file_id,
+            'native_size': self.native_size,
+            'chunk_size': self.chunk_size,
+            'done': {str(index): self.done[index] for index in sorted(self.done)},
+        }
+        tmp_file = f"{self.progress_path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(progress, f)
+        os.replace(tmp_file, self.progress_path)
+
+    def _prepare_part_file(self) -> None:
+        if not self.done or not os.path.exists(self.part_path):
+            with open(self.part_path, 'wb') as f:
+                f.truncate(self.native_size)
+
+    def _read_file_head(self) -> None:
+        with open(self.part_path, 'rb') as f:
+            self._file_head = f.read(min(PROBE_SIZE, self._chunk_range(0)[1]))
+
+    def _fetch_chunk(self, index: int) -> int:
+        offset, size = self._chunk_range(index)
+        url = f"{API_BASE_URL}/files/{self.file_id}"
+        params = {'offset': offset, 'size': size}
+        client = get_client()
+
+        for attempt in range(1, CHUNK_ATTEMPTS + 1):
+            try:
+                response = client.get(url, headers={'Accept': self.accept}, params=params, stream=True)
+                if response.status_code not in (200, 206):
+                    response.close()
+                    raise requests.exceptions.HTTPError(
+                        f"{response.status_code} na parte {index} (offset={offset}, size={size})", response=response)
+                try:
+                    has_range = check_content_range(response, offset, size, self.native_size)
+                except RangeNotSupported:
+                    response.close()
+                    raise
+                # Sem Content-Range, só a comparação com o início do arquivo detecta offset ignorado
+                probe = index > 0 and not has_range
+                written = 0
+                head = b''
+                with open(self.part_path, 'r+b') as f:
+                    f.seek(offset)
+                    for block in response.iter_content(chunk_size=READ_SIZE):
+                        if not block:
+                            continue
+                        if written + len(block) > size:
+                            response.close()
+                            raise RangeNotSupported(f"parte {index}: recebidos mais de {size} bytes")
+                        if probe and len(head) < PROBE_SIZE:
+                            head += block[:PROBE_SIZE - len(head)]
+                            if len(head) >= len(self._file_head) and head.startswith(self._file_head):
+                                response.close()
+                                raise RangeNotSupported(f"parte {index}: conteúdo igual ao início do arquivo")
+                        f.write(block)
+                        written += len(block)
+                if written != size:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"parte {index}: {written} de {size} bytes recebidos")
+                break
+            except RETRYABLE_EXCEPTIONS as e:
+                if attempt == CHUNK_ATTEMPTS:
+                    raise
+                print(f"🔁 Parte {index} do arquivo {self.file_id}: {e.__class__.__name__}, nova tentativa ({attempt}/{CHUNK_ATTEMPTS})")
+
+        with self._lock:
+            self.done[index] = written
+            self._save_progress()
+        return written
+
+    def run(self, max_workers: int = MAX_WORKERS) -> Dict[str, Any]:
+        """
+        Baixa as partes que faltam e finaliza o arquivo. Retorna um resumo no
+        formato dos scripts de download ({'success', 'file_path', 'file_size', ...}).
+        """
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        self.load_progress()
+        resumed = len(self.done)
+        self._prepare_part_file()
+        pending = [i for i in range(self.chunk_count) if i not in self.done]
+        if resumed:
+            print(f"⏯️ Retomando {self.file_id}: {resumed}/{self.chunk_count} partes já baixadas")
+
+        errors: List[str] = []
+
+        def on_error(index, error):
+            if isinstance(error, RangeNotSupported):
+                raise error
+            errors.append(f"parte {index}: {error}")
+            return 0
+
+        with self._lock:
+            self._save_progress()
+        if pending and pending[0] == 0:
+            # A primeira parte vem antes das outras: seu início é a referência da comparação
+            try:
+                self._fetch_chunk(0)
+            except Exception as e:
+                on_error(0, e)
+            pending = pending[1:]
+        if 0 in self.done:
+            self._read_file_head()
+            for _ in iter_concurrently(self._fetch_chunk, pending, max_workers=max_workers, on_error=on_error):
+                pass
+
+        if errors:
+            print(f"❌ {len(errors)} partes falharam; o progresso foi mantido para retomar")
+            return {'success': False, 'error': errors[0], 'file_path': self.part_path,
+                    'chunks_done': len(self.done), 'chunks_total': self.chunk_count}
+
+        received = sum(self.done.values())
+        if len(self.done) != self.chunk_count or received != self.native_size:
+            return {'success': False, 'error': f"{received} bytes recebidos != nativeSize {self.native_size}",
+                    'file_path': self.part_path}
+        file_size = received
+        replace_file(self.part_path, self.file_path)
+        os.remove(self.progress_path)
+        return {
+            'success': True,
+            'file_path': self.file_path,
+            'file_size': file_size,
+            'chunks_total': self.chunk_count,
+            'chunks_resumed': resumed,
+        }
+
+
+def _download_single_stream(file_id: str, file_path: str, accept: str) -> Dict[str, Any]:
+    """
+    Download em uma única requisição (quando offset/size não são suportados)
+    """
+    response = get_client().get(f"{API_BASE_URL}/files/{file_id}", headers={'Accept': accept}, stream=True)
+    try:
+        if response.status_code != 200:
+            return {'success': False, 'error': response.status_code}
+        tmp_path = f"{file_path}.part"
+        with open(tmp_path, 'wb') as f:
+            for block in response.iter_content(chunk_size=READ_SIZE):
+                if block:
+                    f.write(block)
+    finally:
+        response.close()
+    replace_file(tmp_path, file_path)
+    return {'success': True, 'file_path': file_path, 'file_size': os.path.getsize(file_path),
+            'content_type': response.headers.get('Content-Type')}
+
+
+def download_file(
+    file_id: str,
+    file_path: str,
+    native_size: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_workers: int = MAX_WORKERS,
+    accept: str = 'application/octet-stream'
+) -> Dict[str, Any]:
+    """
+    Baixa um arquivo de /files/{fileId} em partes paralelas, retomando um
+    download anterior interrompido e conferindo o tamanho com o nativeSize
+
+    Args:
+        file_id: ID do arquivo
+        file_path: Caminho de destino
+        native_size: Tamanho esperado (se None, busca nos metadados do arquivo)
+        chunk_size: Tamanho de cada parte
+        max_workers: Partes baixadas simultaneamente
+        accept: Header Accept do conteúdo
+    """
+    try:
+        if native_size is None:
+            native_size = get_native_size(file_id)
+        if not native_size:
+            # Sem tamanho conhecido não há como dividir em faixas
+            return _download_single_stream(file_id, file_path, accept)
+
+        download = ChunkedDownload(file_id, file_path, native_size, chunk_size=chunk_size, accept=accept)
+        try:
+            return download.run(max_workers=max_workers)
+        except RangeNotSupported as e:
+            print(f"⚠️ {e}; baixando o arquivo {file_id} em uma única requisição")
+            for path in (download.part_path, download.progress_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            result = _download_single_stream(file_id, file_path, accept)
+            if result['success'] and result['file_size'] != native_size:
+                result = {'success': False,
+                          'error': f"tamanho {result['file_size']} != nativeSize {native_size}"}
+            return result
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro no download do arquivo {file_id}: {e}")
+        return {'success': False, 'error': str(e)}
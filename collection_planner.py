@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Planejador de coleções: organização inteira vs. campo a campo
+Para recursos que a organização expõe como coleção paginada (rels `boundaries`,
+`fieldOperation`, `fields` em /organizations/{orgId}), uma única coleção da
+organização substitui milhares de chamadas por campo; os registros são
+separados por campo localmente. Recursos sem coleção da organização (guidance
+lines, map layer summaries) ou consultas de poucos campos continuam campo a campo.
+"""
+
+from typing import Optional, Dict, Any, List, Iterable
+
+import requests
+
+from deere_client import get_client
+from fanout import iter_concurrently
+from pagination import iter_collection
+from hierarchy_store import id_from_uri
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+MAX_WORKERS = 16
+
+# Até este número de campos, chamar campo a campo custa menos que paginar a organização
+PER_FIELD_THRESHOLD = 3
+
+# Recurso → (rel do link da organização, caminho da coleção da organização, caminho por campo)
+RESOURCES = {
+    'boundaries': ('boundaries', 'boundaries', 'boundaries'),
+    'fieldOperations': ('fieldOperation', 'fieldOperations', 'fieldOperations'),
+    'guidanceLines': (None, None, 'guidanceLines'),
+    'mapLayerSummaries': (None, None, 'mapLayerSummaries'),
+}
+
+ORG_LEVEL = 'org'
+PER_FIELD = 'per_field'
+
+# Status da coleção da organização que indicam que ela não está disponível (usar chamadas por campo)
+UNAVAILABLE_STATUSES = (403, 404)
+
+_org_links_cache: Dict[str, set] = {}
+
+
+class FieldFetchFailed(requests.exceptions.RequestException):
+    """
+    Chamadas por campo que falharam. `failed` tem o erro de cada campo e
+    `results` os campos que deram certo, para o chamador distinguir "falhou"
+    de "sem registros".
+    """
+
+    def __init__(self, resource: str, failed: Dict[str, Exception], results: Dict[str, List]):
+        super().__init__(f"{resource}: {len(failed)} campo(s) falharam ({', '.join(list(failed)[:5])})")
+        self.failed = failed
+        self.results = results
+
+
+def get_org_link_rels(org_id) -> set:
+    """
+    Rels dos links de /organizations/{orgId} (consultado uma vez por processo)
+    """
+    org_id = str(org_id)
+    if org_id not in _org_links_cache:
+        response = get_client().get(f"{API_BASE_URL}/organizations/{org_id}")
+        response.raise_for_status()
+        _org_links_cache[org_id] = {link.get('rel') for link in response.json().get('links', [])}
+    return _org_links_cache[org_id]
+
+
+def record_field_id(record: Dict[str, Any]) -> Optional[str]:
+    """
+    Campo ao qual um registro de coleção da organização pertence (link `field`,
+    fieldId ou URI contendo /fields/{fieldId})
+    """
+    for key in ('fieldId', 'field_id'):
+        if record.get(key):
+            return str(record[key])
+    field = record.get('field')
+    if isinstance(field, dict) and field.get('id'):
+        return str(field['id'])
+    for link in record.get('links', []):
+        if link.get('rel') in ('field', 'owningField'):
+            return id_from_uri(link.get('uri'))
+    for link in record.get('links', []):
+        uri = link.get('uri') or ''
+        if '/fields/' in uri:
+            return uri.split('/fields/', 1)[1].split('/', 1)[0].split('?', 1)[0]
+    return None
+
+
+def collection_unavailable(error: Exception) -> bool:
+    """
+    Se o erro indica que a coleção da organização não está disponível (403/404)
+    """
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in UNAVAILABLE_STATUSES
+
+
+class CollectionPlan:
+    """
+    Estratégia escolhida para buscar um recurso
+
+    Args:
+        resource: Chave de RESOURCES
+        mode: ORG_LEVEL ou PER_FIELD
+        reason: Motivo da escolha (para log)
+    """
+
+    def __init__(self, resource: str, mode: str, reason: str):
+        self.resource = resource
+        self.mode = mode
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return f"CollectionPlan({self.resource!r}, {self.mode!r}: {self.reason})"
+
+
+def plan(org_id, resource: str, field_ids: Optional[List[str]] = None) -> CollectionPlan:
+    """
+    Escolhe entre a coleção da organização e as chamadas por campo
+
+    Args:
+        org_id: ID da organização
+        resource: Chave de RESOURCES
+        field_ids: Campos de interesse (None = todos os campos da organização)
+    """
+    if resource not in RESOURCES:
+        raise ValueError(f"Recurso desconhecido: {resource}")
+    rel, org_path, _ = RESOURCES[resource]
+    if not org_path:
+        return CollectionPlan(resource, PER_FIELD, "sem coleção da organização")
+    if field_ids is not None and len(field_ids) <= PER_FIELD_THRESHOLD:
+        return CollectionPlan(resource, PER_FIELD, f"apenas {len(field_ids)} campo(s)")
+    if rel not in get_org_link_rels(org_id):
+        return CollectionPlan(resource, PER_FIELD, f"organização sem o link '{rel}'")
+    return CollectionPlan(resource, ORG_LEVEL, "coleção da organização disponível")
+
+
+def _fetch_org_level(org_id, resource: str, params, wanted: Optional[set]) -> Optional[Dict[str, List]]:
+    _, org_path, _ = RESOURCES[resource]
+    url = f"{API_BASE_URL}/organizations/{org_id}/{org_path}"
+    by_field: Dict[str, List[Dict[str, Any]]] = {}
+    unresolved = 0
+    for record in iter_collection(url, params=params, parallel=True):
+        field_id = record_field_id(record)
+        if field_id is None:
+            unresolved += 1
+            continue
+        if wanted is None or field_id in wanted:
+            by_field.setdefault(field_id, []).append(record)
+    if unresolved:
+        # Registros sem campo identificável poderiam ser de qualquer campo: separar
+        # só os demais deixaria resultados incompletos, então tudo vai campo a campo
+        print(f"⚠️ {unresolved} registros de {resource} sem campo identificável; usando chamadas por campo")
+        return None
+    return by_field
+
+
+def _fetch_per_field(org_id, resource: str, field_ids: Iterable[str], params,
+                     max_workers: int) -> Dict[str, List]:
+    _, _, field_path = RESOURCES[resource]
+
+    def fetch(field_id):
+        url = f"{API_BASE_URL}/organizations/{org_id}/fields/{field_id}/{field_path}"
+        return list(iter_collection(url, params=params))
+
+    failed: Dict[str, Exception] = {}
+
+    def on_error(field_id, error):
+        print(f"❌ Erro ao buscar {resource} do campo {field_id}: {error}")
+        failed[field_id] = error
+        return None
+
+    field_ids = list(field_ids)
+    results = iter_concurrently(fetch, field_ids, max_workers=max_workers, on_error=on_error)
+    by_field = {field_id: records for field_id, records in zip(field_ids, results) if records is not None}
+    if failed:
+        raise FieldFetchFailed(resource, failed, by_field)
+    return by_field
+
+
+def fetch_by_field(
+    org_id,
+    resource: str,
+    field_ids: Optional[List[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    max_workers: int = MAX_WORKERS
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Busca um recurso para vários campos e devolve {field_id: [registros]}
+
+    Usa a coleção da organização quando existe (e separa por campo localmente);
+    caso contrário, ou se algum registro não identifica o campo, busca campo a campo.
+    Sem field_ids, a estratégia por campo usa todos os campos da organização.
+    Se alguma chamada por campo falhar, lança FieldFetchFailed (com os
+    resultados dos demais campos) em vez de devolver o campo vazio.
+    """
+    chosen = plan(org_id, resource, field_ids)
+    print(f"🧭 {resource}: {chosen.mode} ({chosen.reason})")
+    wanted = set(field_ids) if field_ids is not None else None
+
+    if chosen.mode == ORG_LEVEL:
+        try:
+            by_field = _fetch_org_level(org_id, resource, params, wanted)
+        except requests.exceptions.HTTPError as e:
+            if not collection_unavailable(e):
+                raise
+            print(f"⚠️ Coleção de {resource} da organização indisponível ({e.response.status_code}); "
+                  f"usando chamadas por campo")
+            by_field = None
+        if by_field is not None:
+            for field_id in field_ids or []:
+                by_field.setdefault(field_id, [])
+            return by_field
+
+    if field_ids is None:
+        field_ids = [field['id'] for field in iter_collection(
+            f"{API_BASE_URL}/organizations/{org_id}/fields", parallel=True) if field.get('id')]
+    return _fetch_per_field(org_id, resource, field_ids, params, max_workers)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP compartilhado para a API John Deere
+Mantém um pool de conexões keep-alive por host (sandboxapi, equipmentapi, signin)
+para que as requisições reaproveitem a conexão TCP/TLS em vez de abrir uma nova
+a cada chamada. As requisições às APIs passam por um limitador de taxa
+adaptativo por host (rate_limiter.AdaptiveRateLimiter), e requisições
+idempotentes são repetidas com backoff exponencial (retry_policy.RetryPolicy).
+GETs às APIs podem ser servidos/revalidados por um cache em disco (http_cache.HttpCache).
+"""
+
+import time
+import threading
+from typing import Optional, Dict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, NO_RETRY, RETRYABLE, classify_status, classify_exception
+
+# Tamanho do pool de conexões por host (número máximo de conexões keep-alive simultâneas)
+DEFAULT_POOL_SIZES = {
+    'sandboxapi.deere.com': 32,
+    'equipmentapi.deere.com': 8,
+    'signin.johndeere.com': 2,
+}
+
+# Pool usado para hosts não listados acima (ex: URLs pré-assinadas de storage)
+DEFAULT_POOL_MAXSIZE = 10
+
+# Header Accept padrão por host
+DEFAULT_ACCEPT = {
+    'sandboxapi.deere.com': 'application/vnd.deere.axiom.v3+json',
+    'equipmentapi.deere.com': 'application/json',
+    'signin.johndeere.com': 'application/json',
+}
+
+# Taxa inicial (requisições por segundo) do limitador adaptativo por host
+DEFAULT_RATE_LIMITS = {
+    'sandboxapi.deere.com': 10.0,
+    'equipmentapi.deere.com': 5.0,
+}
+
+# Timeout padrão (conexão, leitura) em segundos, para que conexões travadas
+# virem erros retentáveis em vez de bloquear para sempre
+DEFAULT_TIMEOUT = (10, 120)
+
+# Hosts que recebem o header Authorization. URLs pré-assinadas e o endpoint de
+# token não podem receber o Bearer token.
+AUTHORIZED_HOSTS = {
+    'sandboxapi.deere.com',
+    'equipmentapi.deere.com',
+}
+
+
+class DeereClient:
+    """
+    Cliente reutilizável com pool de conexões por host
+
+    Args:
+        access_token: Access token usado no header Authorization
+        pool_sizes: Tamanho do pool por host (sobrescreve DEFAULT_POOL_SIZES)
+        default_pool_maxsize: Tamanho do pool para hosts não configurados
+        verify: Verificação de certificado TLS (mesmo significado do requests)
+        rate_limits: Taxa inicial por host (sobrescreve DEFAULT_RATE_LIMITS)
+        retry_policy: Política de retentativa padrão das requisições idempotentes
+        timeout: Timeout padrão usado quando a chamada não informa um
+        cache: Cache de respostas GET das APIs (None desativa o cache)
+    """
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        pool_sizes: Optional[Dict[str, int]] = None,
+        default_pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        verify: bool = True,
+        rate_limits: Optional[Dict[str, float]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        timeout=DEFAULT_TIMEOUT,
+        cache: Optional[HttpCache] = None
+    ):
+        self.access_token = access_token
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout
+        self.cache = cache
+        self.token_provider = None
+        self.pool_sizes = dict(DEFAULT_POOL_SIZES)
+        if pool_sizes:
+            self.pool_sizes.update(pool_sizes)
+
+        self.session = requests.Session()
+        self.session.verify = verify
+
+        # Adapter padrão para qualquer host https/http não configurado
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=default_pool_maxsize))
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=default_pool_maxsize))
+
+        # Um adapter dedicado por host, com o pool configurado
+        for host, size in self.pool_sizes.items():
+            self.session.mount(f"https://{host}/", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+
+        # Um limitador de taxa por host de API
+        limits = dict(DEFAULT_RATE_LIMITS)
+        if rate_limits:
+            limits.update(rate_limits)
+        self.rate_limiters = {host: AdaptiveRateLimiter(rate=rate) for host, rate in limits.items()}
+
+    def set_access_token(self, access_token: Optional[str]) -> None:
+        """
+        Atualiza o access token usado nas próximas requisições
+        """
+        self.access_token = access_token
+
+    def set_token_provider(self, token_provider) -> None:
+        """
+        Usa um provedor de tokens (ex: token_provider.TokenProvider) como fonte
+        do access token. Tem prioridade sobre o token fixo de set_access_token.
+        """
+        self.token_provider = token_provider
+
+    def current_access_token(self) -> Optional[str]:
+        if self.token_provider is not None:
+            return self.token_provider.get_access_token()
+        return self.access_token
+
+    def build_headers(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Monta os headers da requisição: Accept padrão do host, Authorization
+        (somente para hosts da API) e os headers extras informados
+        """
+        host = urlparse(url).hostname or ''
+        merged = {}
+
+        accept = DEFAULT_ACCEPT.get(host)
+        if accept:
+            merged['Accept'] = accept
+
+        if host in AUTHORIZED_HOSTS:
+            access_token = self.current_access_token()
+            if access_token:
+                merged['Authorization'] = f'Bearer {access_token}'
+
+        if headers:
+            merged.update(headers)
+        return merged
+
+    def _send(self, method: str, url: str, headers: Optional[Dict[str, str]], **kwargs) -> requests.Response:
+        limiter = self.rate_limiters.get(urlparse(url).hostname or '')
+        if limiter is not None:
+            limiter.acquire()
+        response = self.session.request(method, url, headers=self.build_headers(url, headers), **kwargs)
+        if limiter is not None:
+            limiter.on_response(response.status_code, response.headers.get('Retry-After'))
+        return response
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        retry: Optional[RetryPolicy] = None,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Executa uma requisição usando o pool de conexões compartilhado,
+        respeitando o limitador de taxa do host
+
+        Erros retentáveis (conexão, timeout, 5xx, 429) de métodos idempotentes
+        são repetidos conforme a política (`retry` ou a padrão do cliente).
+        Erros fatais (401/403/404, ...) retornam na primeira tentativa. Quando as
+        tentativas acabam, a última resposta é devolvida ou a última exceção é lançada.
+        """
+        policy = retry if retry is not None else self.retry_policy
+        if not policy.applies_to(method):
+            policy = NO_RETRY
+        kwargs.setdefault('timeout', self.timeout)
+
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self._send(method, url, headers, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if classify_exception(e) != RETRYABLE:
+                    raise
+                delay = policy.next_delay(attempt, started_at)
+                if delay is None:
+                    raise
+                print(f"🔁 {method} {url}: {e.__class__.__name__}, nova tentativa em {delay:.1f}s ({attempt}/{policy.max_attempts})")
+                time.sleep(delay)
+                continue
+
+            if classify_status(response.status_code) != RETRYABLE:
+                return response
+            delay = policy.next_delay(attempt, started_at, response)
+            if delay is None:
+                return response
+            print(f"🔁 {method} {url}: status {response.status_code}, nova tentativa em {delay:.1f}s ({attempt}/{policy.max_attempts})")
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url: str, use_cache: bool = True, **kwargs) -> requests.Response:
+        """
+        GET pelo pool compartilhado. Com cache configurado, GETs às APIs (sem
+        stream) são servidos do cache dentro do TTL do endpoint e, depois dele,
+        revalidados com If-None-Match/If-Modified-Since.
+        """
+        host = urlparse(url).hostname or ''
+        if self.cache is None or not use_cache or kwargs.get('stream') or host not in AUTHORIZED_HOSTS:
+            return self.request('GET', url, **kwargs)
+        return self._cached_get(url, host, **kwargs)
+
+    def _cached_get(
+        self,
+        url: str,
+        host: str,
+        headers: Optional[Dict[str, str]] = None,
+        params=None,
+        **kwargs
+    ) -> requests.Response:
+        vary_headers = {'Accept': DEFAULT_ACCEPT.get(host, '')}
+        vary_headers.update(headers or {})
+        key = self.cache.make_key(url, params, vary_headers)
+
+        entry = self.cache.lookup(key)
+        if entry is not None and entry.is_fresh():
+            return entry.to_response()
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        response = self.request('GET', url, headers=request_headers, params=params, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            return self.cache.revalidated(entry, response)
+        self.cache.store(key, response, self.cache.ttl_for(url))
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[DeereClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client(access_token: Optional[str] = None) -> DeereClient:
+    """
+    Retorna o cliente compartilhado do processo, criando-o na primeira chamada.
+    Se access_token for informado, atualiza o token usado pelo cliente.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DeereClient(cache=HttpCache())
+    if access_token:
+        _client.set_access_token(access_token)
+    return _client
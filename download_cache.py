@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Cache de downloads endereçado por conteúdo
+Cada arquivo baixado é guardado uma única vez em .download_cache/objects/<sha256>
+e indexado pela chave id + modifiedTime + nativeSize dos metadados de /files.
+Se a chave já está no índice, o arquivo é materializado no destino por hardlink
+(ou cópia, se o sistema de arquivos não suportar) sem nenhum acesso à rede.
+Conteúdos idênticos de arquivos diferentes compartilham o mesmo objeto.
+
+Os objetos ficam somente leitura: um arquivo materializado é o próprio objeto,
+então quem grava nesses caminhos deve gravar em um arquivo temporário e trocá-lo
+com replace_file (que troca o link sem tocar no conteúdo do objeto), nunca
+abrir com 'wb'.
+"""
+
+import os
+import json
+import time
+import stat
+import shutil
+import hashlib
+import threading
+from typing import Optional, Dict, Any
+
+DOWNLOAD_CACHE_DIR = '.download_cache'
+HASH_BLOCK_SIZE = 1024 * 1024
+OBJECT_MODE = 0o444  # Objetos (e seus hardlinks) somente leitura
+
+
+def cache_key(file_info: Dict[str, Any]) -> Optional[str]:
+    """
+    Chave do arquivo: id + modifiedTime + nativeSize (None se não houver id)
+    """
+    file_id = file_info.get('id')
+    if not file_id:
+        return None
+    return f"{file_id}|{file_info.get('modifiedTime', '')}|{file_info.get('nativeSize', '')}"
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _make_removable(path: str) -> None:
+    """
+    No Windows, arquivos somente leitura não podem ser apagados nem
+    substituídos: libera o bit de escrita antes. Como o bit é do arquivo (e
+    não do link), o objeto do cache volta a ficar somente leitura no próximo
+    materialize/add. Em POSIX o modo do arquivo não impede a troca.
+    """
+    if os.name == 'nt' and os.path.exists(path) and not os.access(path, os.W_OK):
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+
+
+def replace_file(source: str, dest: str) -> None:
+    """
+    os.replace que também substitui um destino materializado do cache (somente leitura)
+    """
+    _make_removable(dest)
+    os.replace(source, dest)
+
+
+def _link_or_copy(source: str, dest: str) -> None:
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    if os.path.exists(dest):
+        if os.path.samefile(source, dest):
+            return
+        _make_removable(dest)
+        os.remove(dest)
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+class DownloadCache:
+    """
+    Índice (chave → sha256) e objetos endereçados por conteúdo
+
+    Args:
+        cache_dir: Diretório do cache (índice em index.json, objetos em objects/)
+    """
+
+    def __init__(self, cache_dir: str = DOWNLOAD_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️ Índice {self.index_file} ilegível; o cache de downloads começa vazio")
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def _save_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_file, self.index_file)
+
+    def lookup(self, file_info: Dict[str, Any]) -> Optional[str]:
+        """
+        Caminho do objeto em cache para o arquivo, ou None. Não acessa a rede.
+        """
+        key = cache_key(file_info)
+        with self._lock:
+            entry = self._index.get(key) if key else None
+        if not entry:
+            return None
+        path = self._object_path(entry['sha256'])
+        if not os.path.exists(path) or os.path.getsize(path) != entry['size']:
+            return None
+        return path
+
+    def has(self, file_info: Dict[str, Any]) -> bool:
+        return self.lookup(file_info) is not None
+
+    def materialize(self, file_info: Dict[str, Any], dest_path: str) -> bool:
+        """
+        Coloca o arquivo em cache em dest_path (hardlink ou cópia). Retorna
+        False se o arquivo não está no cache.
+        """
+        path = self.lookup(file_info)
+        if path is None:
+            return False
+        os.chmod(path, OBJECT_MODE)
+        _link_or_copy(path, dest_path)
+        return True
+
+    def add(self, file_info: Dict[str, Any], path: str) -> Optional[str]:
+        """
+        Guarda um arquivo recém-baixado e o substitui por um hardlink para o
+        objeto (conteúdo já existente não é duplicado). Retorna o sha256.
+        """
+        key = cache_key(file_info)
+        if not key or not os.path.exists(path):
+            return None
+        sha256 = sha256_file(path)
+        object_path = self._object_path(sha256)
+        with self._lock:
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                try:
+                    os.link(path, object_path)
+                except OSError:
+                    tmp_path = f"{object_path}.tmp"
+                    shutil.copyfile(path, tmp_path)
+                    os.replace(tmp_path, object_path)
+            os.chmod(object_path, OBJECT_MODE)
+            self._index[key] = {
+                'sha256': sha256,
+                'size': os.path.getsize(object_path),
+                'name': file_info.get('name'),
+                'stored_at': time.time(),
+            }
+            self._save_index()
+        _link_or_copy(object_path, path)
+        return sha256
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Entradas no índice, objetos distintos e bytes ocupados pelos objetos
+        """
+        with self._lock:
+            hashes = {entry['sha256']: entry['size'] for entry in self._index.values()}
+        return {'entries': len(self._index), 'objects': len(hashes), 'bytes': sum(hashes.values())}
+
+
+_cache: Optional[DownloadCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_download_cache() -> DownloadCache:
+    """
+    Retorna o cache de downloads compartilhado do processo
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DownloadCache()
+    return _cache
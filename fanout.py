@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Execução concorrente (fan-out) de chamadas à API
+Despacha uma função para cada item de uma lista com número limitado de workers
+e devolve os resultados na mesma ordem dos itens de entrada.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar, Any
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+MAX_WORKERS = 16  # Requisições simultâneas por padrão
+
+_SENTINEL = object()
+
+
+def iter_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int = MAX_WORKERS,
+    on_error: Optional[Callable[[T, Exception], Any]] = None
+) -> Iterator[R]:
+    """
+    Aplica func a cada item com até max_workers chamadas simultâneas e entrega
+    os resultados na ordem de entrada, à medida que ficam prontos
+
+    Apenas max_workers * 2 tarefas ficam enfileiradas por vez, então a entrada
+    pode ser um iterador de milhares de itens sem criar milhares de futures.
+
+    Args:
+        func: Função chamada com cada item
+        items: Itens de entrada (lista ou iterador)
+        max_workers: Número máximo de chamadas simultâneas
+        on_error: Se informado, chamado com (item, exceção) quando func falha;
+                  o valor retornado entra no lugar do resultado. Sem on_error a
+                  exceção é propagada.
+    """
+    items_iter = iter(items)
+    window = max(max_workers * 2, 1)
+
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            if on_error is None:
+                raise
+            return on_error(item, e)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items_iter:
+            pending.append(executor.submit(call, item))
+            if len(pending) >= window:
+                break
+        while pending:
+            result = pending.popleft().result()
+            item = next(items_iter, _SENTINEL)
+            if item is not _SENTINEL:
+                pending.append(executor.submit(call, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def run_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int = MAX_WORKERS,
+    on_error: Optional[Callable[[T, Exception], Any]] = None
+) -> List[R]:
+    """
+    Igual a iter_concurrently, mas devolve a lista completa de resultados
+    """
+    return list(iter_concurrently(func, items, max_workers=max_workers, on_error=on_error))
+
@@ -4,91 +4,19 @@ Script para buscar TODAS as fazendas da organização
 Endpoint: /organizations/{orgId}/farms
 """
 
-import os
 import json
 import requests
-import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from pagination import iter_pages
+from hierarchy_store import get_store
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 org1 eq1 offline_access"
 
 ORG_ID = "5881930"
 ITEM_LIMIT = 100  # Máximo permitido pela API
 
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
-
 def fetch_all_farms():
     """
     Busca TODAS as fazendas da organização (paginado)
@@ -97,56 +25,27 @@ def fetch_all_farms():
     if not tokens:
         return
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     all_farms: List[Dict[str, Any]] = []
-    page_offset = 0
-    total = None
+    url = f"{API_BASE_URL}/organizations/{ORG_ID}/farms"
     
     print(f"🔄 Buscando TODAS as fazendas da organização {ORG_ID}...")
     
-    while True:
-        url = f"{API_BASE_URL}/organizations/{ORG_ID}/farms?pageOffset={page_offset}&itemLimit={ITEM_LIMIT}"
-        print(f"📡 Requisitando: {url}")
-        
-        response = requests.get(url, headers=headers)
-        print(f"📊 Status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"❌ Erro ao buscar fazendas: {response.status_code} - {response.text}")
-            break
-        
-        data = response.json()
-        
-        if total is None:
-            total = data.get('total', None)
-            print(f"📈 Total de fazendas: {total}")
-        
-        values = data.get('values', [])
-        print(f"➕ Adicionando {len(values)} fazendas (página offset {page_offset})")
-        all_farms.extend(values)
-        
-        # Verifica se há próxima página
-        links = data.get('links', [])
-        next_page_link = next((l for l in links if l.get('rel') == 'nextPage'), None)
-        
-        if next_page_link:
-            # Extrai o próximo pageOffset da URL
-            next_url = next_page_link['uri']
-            from urllib.parse import urlparse, parse_qs
-            qs = parse_qs(urlparse(next_url).query)
-            page_offset = int(qs.get('pageOffset', [page_offset + ITEM_LIMIT])[0])
-        else:
-            print("✅ Todas as páginas baixadas.")
-            break
+    try:
+        for page_number, data in enumerate(iter_pages(url, item_limit=ITEM_LIMIT, parallel=True), 1):
+            if page_number == 1:
+                print(f"📈 Total de fazendas: {data.get('total')}")
+            
+            values = data.get('values', [])
+            print(f"➕ Adicionando {len(values)} fazendas (página {page_number})")
+            all_farms.extend(values)
+        print("✅ Todas as páginas baixadas.")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao buscar fazendas: {e}")
     
     print(f"💾 Salvando {len(all_farms)} fazendas em farms_organization_{ORG_ID}.json...")
     with open(f"farms_organization_{ORG_ID}.json", "w", encoding="utf-8") as f:
         json.dump(all_farms, f, ensure_ascii=False, indent=2)
+    get_store().upsert_farms(ORG_ID, all_farms)
     
     print("🎉 Download completo!")
     return all_farms
@@ -199,16 +98,12 @@ def get_farm_details(farm_id: str) -> Optional[Dict[str, Any]]:
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     
     farm_url = f"{API_BASE_URL}/organizations/{ORG_ID}/farms/{farm_id}"
     
     try:
-        response = requests.get(farm_url, headers=headers)
+        response = client.get(farm_url)
         if response.status_code == 200:
             return response.json()
         else:
@@ -226,16 +121,12 @@ def get_farm_fields(farm_id: str) -> Optional[Dict[str, Any]]:
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     
     fields_url = f"{API_BASE_URL}/organizations/{ORG_ID}/farms/{farm_id}/fields"
     
     try:
-        response = requests.get(fields_url, headers=headers)
+        response = client.get(fields_url)
         if response.status_code == 200:
             return response.json()
         else:
@@ -259,6 +150,13 @@ def analyze_farm_with_fields(farm_data: Dict[str, Any], fields_data: Optional[Di
     print(f"📋 ID: {farm_id}")
     print(f"📦 Status: {'Arquivada' if archived else 'Ativa'}")
     
+    if not fields_data:
+        # Sem resposta da API: campos da fazenda gravados no banco local
+        stored_fields = get_store().fields_of_farm(farm_id)
+        if stored_fields:
+            print("💾 Campos obtidos do banco local (hierarchy_store)")
+            fields_data = {'values': stored_fields, 'total': len(stored_fields)}
+    
     if fields_data:
         total_fields = fields_data.get('total', 0)
         fields = fields_data.get('values', [])
@@ -2,93 +2,36 @@
 """
 Script para buscar guidance lines de TODOS os campos da organização John Deere
 Endpoint: /organizations/{orgId}/fields/{fieldId}/guidanceLines
+
+Os campos são consultados concorrentemente e cada resultado é anexado a
+all_fields_guidance_lines.jsonl assim que chega. Esse arquivo também é o
+checkpoint: ao reexecutar (após erro ou Ctrl-C), os campos já gravados são pulados
+e os registrados com erro são consultados de novo. Quando todos os campos foram
+processados e o JSON final foi gravado, o checkpoint é apagado; --fresh descarta
+um checkpoint existente e começa do zero.
 """
 
 import os
+import sys
 import json
-import requests
-import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from fanout import iter_concurrently
+from hierarchy_store import get_store
+from retry_policy import RETRYABLE, classify_status, classify_exception
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"
 ORG_ID = "5881930"
-
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
+MAX_WORKERS = 16  # Campos consultados simultaneamente
+RESULTS_FILE = 'all_fields_guidance_lines.jsonl'  # Resultados incrementais + checkpoint
+OUTPUT_FILE = 'all_fields_guidance_lines.json'
 
 def get_all_field_ids():
+    # Só usa o banco local com uma coleta completa da organização (campos ativos)
+    fields = get_store().crawled_fields(ORG_ID)
+    if fields:
+        return [(f.get('id'), f.get('name', '')) for f in fields]
     if not os.path.exists('fields_organization_5881930.json'):
         print("❌ Arquivo fields_organization_5881930.json não encontrado.")
         return []
@@ -99,53 +42,140 @@ def get_all_field_ids():
     return []
 
 def get_guidance_lines(org_id: str, field_id: str, status: str = "available", embed: Optional[str] = None):
+    """
+    Guidance lines de um campo. Erros retentáveis (429, 5xx, conexão) retornam
+    None; erros permanentes (403, 404...) retornam {'values': [], 'error': status}.
+    """
     tokens = get_valid_tokens()
     if not tokens:
         return None
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     params = {"status": status}
     if embed:
         params["embed"] = embed
     url = f"{API_BASE_URL}/organizations/{org_id}/fields/{field_id}/guidanceLines"
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = client.get(url, params=params)
         if response.status_code == 200:
             return response.json()
-        else:
+        if classify_status(response.status_code) == RETRYABLE:
             return None
+        return {'values': [], 'error': response.status_code}
     except Exception as e:
         print(f"❌ Erro na requisição para field {field_id}: {e}")
-        return None
+        if classify_exception(e) == RETRYABLE:
+            return None
+        return {'values': [], 'error': str(e)}
+
+def load_finished_field_ids(results_file: str = RESULTS_FILE) -> set:
+    """
+    Lê o checkpoint (JSONL) e retorna os IDs dos campos já processados.
+    Campos cuja última linha tem 'error' não contam: são consultados de novo.
+    Uma última linha incompleta (interrupção no meio da escrita) é ignorada.
+    """
+    finished = set()
+    if not os.path.exists(results_file):
+        return finished
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                field_id = record['field_id']
+            except (ValueError, KeyError):
+                continue
+            if record.get('error') is None:
+                finished.add(field_id)
+            else:
+                finished.discard(field_id)
+    return finished
 
-def main():
+def export_results_json(results_file: str = RESULTS_FILE, output_file: str = OUTPUT_FILE) -> int:
+    """
+    Converte o JSONL de resultados na lista JSON final, linha a linha. Um campo
+    refeito após erro aparece mais de uma vez no JSONL; vale a última linha.
+    """
+    last_line = {}
+    with open(results_file, 'r', encoding='utf-8') as src:
+        for number, line in enumerate(src):
+            try:
+                last_line[json.loads(line)['field_id']] = number
+            except (ValueError, KeyError):
+                continue
+    keep = set(last_line.values())
+    count = 0
+    with open(results_file, 'r', encoding='utf-8') as src, open(output_file, 'w', encoding='utf-8') as dst:
+        dst.write('[\n')
+        for number, line in enumerate(src):
+            if number not in keep:
+                continue
+            record = json.loads(line)
+            if count:
+                dst.write(',\n')
+            json.dump(record, dst, ensure_ascii=False)
+            count += 1
+        dst.write('\n]\n')
+    return count
+
+def main(fresh: bool = False):
     print("🚀 Buscando guidance lines de todos os campos...")
     all_fields = get_all_field_ids()
     print(f"Total de campos: {len(all_fields)}")
-    results = []
+    
+    if fresh and os.path.exists(RESULTS_FILE):
+        print(f"🗑️  Descartando o checkpoint {RESULTS_FILE}.")
+        os.remove(RESULTS_FILE)
+    finished = load_finished_field_ids()
+    pending = [(field_id, field_name) for field_id, field_name in all_fields if field_id not in finished]
+    if finished:
+        print(f"♻️  Retomando: {len(finished)} campos já processados, {len(pending)} restantes.")
+    
+    def fetch(field):
+        return get_guidance_lines(ORG_ID, field[0])
+    
     found_count = 0
-    for idx, (field_id, field_name) in enumerate(all_fields, 1):
-        print(f"[{idx}/{len(all_fields)}] Field: {field_name} ({field_id}) ...", end=' ')
-        data = get_guidance_lines(ORG_ID, field_id)
-        values = data.get('values', []) if data else []
-        if values:
-            found_count += 1
-            print(f"✅ {len(values)} guidance lines encontradas!")
-        else:
-            print("- Nenhuma guidance line.")
-        results.append({
-            'field_id': field_id,
-            'field_name': field_name,
-            'guidance_lines': values
-        })
-        time.sleep(0.2)  # Pequena pausa para evitar rate limit
-    with open('all_fields_guidance_lines.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    print(f"\nResumo: {found_count} campos com guidance lines de {len(all_fields)} no total.")
-    print("🔗 Dados salvos em all_fields_guidance_lines.json")
+    failed_count = 0
+    error_count = 0
+    try:
+        with open(RESULTS_FILE, 'a', encoding='utf-8') as out:
+            results = iter_concurrently(fetch, pending, max_workers=MAX_WORKERS)
+            for idx, ((field_id, field_name), data) in enumerate(zip(pending, results), 1):
+                print(f"[{idx}/{len(pending)}] Field: {field_name} ({field_id}) ...", end=' ')
+                if data is None:
+                    # Erro retentável: não entra no checkpoint e será refeito na próxima execução
+                    failed_count += 1
+                    print("❌ Falha, será refeito na próxima execução.")
+                    continue
+                values = data.get('values', [])
+                record = {
+                    'field_id': field_id,
+                    'field_name': field_name,
+                    'guidance_lines': values
+                }
+                if data.get('error') is not None:
+                    # Erro permanente: registrado sem guidance lines; a próxima retomada consulta de novo
+                    record['error'] = data['error']
+                    error_count += 1
+                    print(f"⚠️ Erro {data['error']}, registrado sem guidance lines.")
+                elif values:
+                    found_count += 1
+                    print(f"✅ {len(values)} guidance lines encontradas!")
+                else:
+                    print("- Nenhuma guidance line.")
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Interrompido. Progresso salvo em {RESULTS_FILE}; execute novamente para continuar.")
+        return
+    
+    total_saved = export_results_json()
+    print(f"\nResumo: {found_count} campos com guidance lines nesta execução, {error_count} com erro "
+          f"permanente, {failed_count} falhas a refazer.")
+    print(f"🔗 {total_saved} campos salvos em {OUTPUT_FILE}")
+    if failed_count:
+        print(f"♻️  Checkpoint mantido em {RESULTS_FILE}; execute novamente para refazer as falhas.")
+    else:
+        # Execução completa: a próxima começa do zero em vez de pular todos os campos
+        os.remove(RESULTS_FILE)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(fresh='--fresh' in sys.argv[1:]) 
\ No newline at end of file
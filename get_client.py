@@ -1,22 +1,17 @@
-import requests
 import json
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from hierarchy_store import get_store
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
 
-def load_tokens():
-    with open('tokens.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
-
 def get_clients(org_id, record_filter="ACTIVE"):
-    tokens = load_tokens()
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    if not get_valid_tokens():
+        return None
+    client = get_client()
     params = {'recordFilter': record_filter}
     url = f"{API_BASE_URL}/organizations/{org_id}/clients"
-    response = requests.get(url, headers=headers, params=params, verify=False)
+    response = client.get(url, params=params, verify=False)
     print(f"Status: {response.status_code}")
     if response.status_code == 200:
         data = response.json()
@@ -27,15 +22,14 @@ def get_clients(org_id, record_filter="ACTIVE"):
         return None
 
 def get_client_fields(org_id, client_id, x_deere_signature=""):
-    tokens = load_tokens()
-    access_token = tokens.get('access_token')
+    if not get_valid_tokens():
+        return None, None
+    client = get_client()
     headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json',
         'x-deere-signature': x_deere_signature
     }
     url = f"{API_BASE_URL}/organizations/{org_id}/clients/{client_id}/fields"
-    response = requests.get(url, headers=headers, verify=False)
+    response = client.get(url, headers=headers, verify=False)
     print(f"Status: {response.status_code}")
     if response.status_code == 200:
         data = response.json()
@@ -53,11 +47,15 @@ if __name__ == "__main__":
     org_id = 5881930  # Substitua pelo seu orgId
     clients_data = get_clients(org_id)
     all_client_fields = []
+    store = get_store()
     if clients_data and 'values' in clients_data:
+        store.upsert_clients(org_id, clients_data['values'])
         for client in clients_data['values']:
             client_id = client['id']
             print(f"\nBuscando campos do cliente {client_id}...")
             fields_data, signature = get_client_fields(org_id, client_id)
+            if fields_data:
+                store.upsert_fields(org_id, fields_data.get('values', []), client_id=client_id)
             all_client_fields.append({
                 'client_id': client_id,
                 'client_name': client.get('name'),
@@ -1,19 +1,13 @@
 import json
-import requests
+from deere_client import get_client
+from token_provider import get_valid_tokens
 
 API_EQUIPMENT_URL = "https://equipmentapi.deere.com/isg/equipment"
 
-def load_tokens():
-    with open('tokens.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
-
 def get_equipment(organization_ids=None, serial_numbers=None, categories=None, item_limit=100):
-    tokens = load_tokens()
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/json'
-    }
+    if not get_valid_tokens():
+        return
+    client = get_client()
     params = {}
     if organization_ids:
         params['organizationIds'] = ','.join(str(org) for org in organization_ids)
@@ -24,7 +18,7 @@ def get_equipment(organization_ids=None, serial_numbers=None, categories=None, i
     if item_limit:
         params['itemLimit'] = item_limit
 
-    response = requests.get(API_EQUIPMENT_URL, headers=headers, params=params, verify=False)
+    response = client.get(API_EQUIPMENT_URL, params=params, verify=False)
     print(f"Status: {response.status_code}")
     if response.status_code == 200:
         data = response.json()
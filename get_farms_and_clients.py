@@ -4,89 +4,19 @@ Script para buscar Farms e Clients dos campos
 Endpoints: 
 - /organizations/{orgId}/fields/{fieldId}/farms
 - /organizations/{orgId}/fields/{fieldId}/clients
+
+Para vários campos, test_field_farms_and_clients monta a hierarquia inteira em
+uma passada (hierarchy_crawl.build_hierarchy) em vez de 2 requisições por campo.
 """
 
-import os
-import json
 import requests
-import time
 from typing import Optional, Dict, Any
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from hierarchy_crawl import build_hierarchy, as_collection
+from hierarchy_store import get_store
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 org1 eq1 offline_access"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
 
 def get_field_farms(
     organization_id: str,
@@ -99,24 +29,19 @@ def get_field_farms(
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
+    client = get_client()
     
     print(f"🏡 Buscando Farms do campo...")
     print(f"   • Organização: {organization_id}")
     print(f"   • Campo: {field_id}")
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     # URL do endpoint
     farms_url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/farms"
     
     try:
         print(f"📡 Fazendo requisição para: {farms_url}")
         
-        response = requests.get(farms_url, headers=headers)
+        response = client.get(farms_url)
         
         print(f"📊 Status da resposta: {response.status_code}")
         print(f"📋 Headers da resposta: {dict(response.headers)}")
@@ -147,24 +72,19 @@ def get_field_clients(
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
+    client = get_client()
     
     print(f"👥 Buscando Clients do campo...")
     print(f"   • Organização: {organization_id}")
     print(f"   • Campo: {field_id}")
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     # URL do endpoint
     clients_url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/clients"
     
     try:
         print(f"📡 Fazendo requisição para: {clients_url}")
         
-        response = requests.get(clients_url, headers=headers)
+        response = client.get(clients_url)
         
         print(f"📊 Status da resposta: {response.status_code}")
         print(f"📋 Headers da resposta: {dict(response.headers)}")
@@ -184,9 +104,12 @@ def get_field_clients(
             print(f"📄 Resposta de erro: {e.response.text}")
         return None
 
-def analyze_farms(farms_data: Dict[str, Any], organization_id: str) -> None:
+def analyze_farms(farms_data: Dict[str, Any], organization_id: str, fetch_details: bool = True) -> None:
     """
     Analisa e exibe informações das fazendas
+
+    Args:
+        fetch_details: Se False, não busca /farms/{farmId} (os registros já estão completos)
     """
     print("\n" + "="*80)
     print("🏡 ANÁLISE DAS FAZENDAS")
@@ -233,6 +156,14 @@ def analyze_farms(farms_data: Dict[str, Any], organization_id: str) -> None:
         print(f"   • Nome: {name}")
         print(f"   • Descrição: {description}")
         
+        # Vínculos gravados no banco local (hierarchy_store)
+        store = get_store()
+        farm_client = store.client_of_farm(farm_id)
+        farm_fields = store.fields_of_farm(farm_id)
+        print(f"\n🔗 Vínculos (banco local):")
+        print(f"   • Cliente: {farm_client.get('name', 'N/A') if farm_client else 'N/A'}")
+        print(f"   • Campos: {len(farm_fields)}")
+        
         # Informações de data/hora
         created_time = farm.get('createdTime', 'N/A')
         modified_time = farm.get('modifiedTime', 'N/A')
@@ -266,20 +197,20 @@ def analyze_farms(farms_data: Dict[str, Any], organization_id: str) -> None:
                 uri = link.get('uri', 'N/A')
                 print(f"   • {rel}: {uri}")
         
+        if not fetch_details:
+            print(f"   • Arquivado: {'✅ Sim' if farm.get('archived', False) else '❌ Não'}")
+            continue
+        
         # Buscar informações detalhadas da fazenda
         print(f"\n🔍 Buscando informações detalhadas da fazenda...")
         farm_url = f"{API_BASE_URL}/organizations/{organization_id}/farms/{farm_id}"
         
         tokens = get_valid_tokens()
         if tokens:
-            access_token = tokens.get('access_token')
-            headers = {
-                'Authorization': f'Bearer {access_token}',
-                'Accept': 'application/vnd.deere.axiom.v3+json'
-            }
+            client = get_client()
             
             try:
-                response = requests.get(farm_url, headers=headers)
+                response = client.get(farm_url)
                 if response.status_code == 200:
                     farm_details = response.json()
                     print(f"✅ Informações detalhadas obtidas!")
@@ -357,6 +288,12 @@ def analyze_clients(clients_data: Dict[str, Any], organization_id: str) -> None:
         print(f"   • Nome: {name}")
         print(f"   • Descrição: {description}")
         
+        # Vínculos gravados no banco local (hierarchy_store)
+        store = get_store()
+        print(f"\n🔗 Vínculos (banco local):")
+        print(f"   • Fazendas: {len(store.farms_of_client(client_id))}")
+        print(f"   • Campos: {len(store.fields_of_client(client_id))}")
+        
         # Informações de data/hora
         created_time = client.get('createdTime', 'N/A')
         modified_time = client.get('modifiedTime', 'N/A')
@@ -427,6 +364,11 @@ def test_field_farms_and_clients():
     
     print("🧪 Testando Farms e Clients em múltiplos campos...")
     
+    # Uma passada pelas coleções da organização em vez de 2 requisições por campo
+    graph = build_hierarchy(organization_id)
+    if not graph:
+        return
+    
     for field in test_fields:
         print(f"\n{'='*80}")
         print(f"🌾 TESTANDO CAMPO: {field['name']} (ID: {field['id']})")
@@ -434,24 +376,18 @@ def test_field_farms_and_clients():
         
         # Teste 1: Farms
         print(f"\n🏡 TESTE 1: Farms do campo")
-        farms_data = get_field_farms(
-            organization_id=organization_id,
-            field_id=field['id']
-        )
+        farms_data = as_collection(graph.farms_of_field(field['id']))
         
-        if farms_data:
-            analyze_farms(farms_data, organization_id)
+        if farms_data['values']:
+            analyze_farms(farms_data, organization_id, fetch_details=False)
         else:
             print("❌ Nenhuma fazenda encontrada para este campo.")
         
         # Teste 2: Clients
         print(f"\n👥 TESTE 2: Clients do campo")
-        clients_data = get_field_clients(
-            organization_id=organization_id,
-            field_id=field['id']
-        )
+        clients_data = as_collection(graph.clients_of_field(field['id']))
         
-        if clients_data:
+        if clients_data['values']:
             analyze_clients(clients_data, organization_id)
         else:
             print("❌ Nenhum cliente encontrado para este campo.")
@@ -6,99 +6,37 @@ e salvar em JSON com estatísticas
 
 import os
 import json
-import requests
 import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from fanout import iter_concurrently
+from hierarchy_store import get_store
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 org1 eq1 offline_access"
 
 ORG_ID = "5881930"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
+MAX_WORKERS = 16  # Fazendas consultadas simultaneamente
 
 def load_farms_data():
     """
-    Carrega os dados das fazendas do arquivo JSON
+    Carrega as fazendas do banco local (hierarchy_store), importando o arquivo
+    JSON na primeira vez
     """
+    store = get_store()
+    farms = store.farms(ORG_ID)
+    if farms:
+        return farms
+    
     farms_file = f"farms_organization_{ORG_ID}.json"
     if not os.path.exists(farms_file):
         print(f"❌ Arquivo {farms_file} não encontrado. Execute get_all_farms.py primeiro.")
         return None
     
     with open(farms_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        farms = json.load(f)
+    store.upsert_farms(ORG_ID, farms)
+    return farms
 
 def get_farm_fields_count(farm_id: str, farm_name: str) -> Optional[Dict[str, Any]]:
     """
@@ -108,16 +46,12 @@ def get_farm_fields_count(farm_id: str, farm_name: str) -> Optional[Dict[str, An
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     
     fields_url = f"{API_BASE_URL}/organizations/{ORG_ID}/farms/{farm_id}/fields"
     
     try:
-        response = requests.get(fields_url, headers=headers)
+        response = client.get(fields_url)
         if response.status_code == 200:
             data = response.json()
             total_fields = data.get('total', 0)
@@ -145,10 +79,15 @@ def get_farm_fields_count(farm_id: str, farm_name: str) -> Optional[Dict[str, An
             'status': f'error_{str(e)}'
         }
 
-def analyze_farms_fields_distribution(farms_fields_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+def analyze_farms_fields_distribution(farms_fields_data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     """
     Analisa a distribuição de campos por fazenda
+
+    Args:
+        farms_fields_data: Contagens por fazenda (padrão: as gravadas no banco local)
     """
+    if farms_fields_data is None:
+        farms_fields_data = get_store().farm_field_counts(ORG_ID)
     successful_farms = [f for f in farms_fields_data if f.get('status') == 'success']
     error_farms = [f for f in farms_fields_data if f.get('status') != 'success']
     
@@ -225,15 +164,16 @@ def main():
     # Lista para armazenar resultados
     farms_fields_data = []
     
-    # Processar cada fazenda
-    for i, farm in enumerate(farms_data, 1):
-        farm_id = farm.get('id')
+    def fetch_farm(farm):
+        return get_farm_fields_count(farm.get('id'), farm.get('name', 'N/A'))
+    
+    # Processar as fazendas concorrentemente; resultados chegam na ordem de entrada
+    results = iter_concurrently(fetch_farm, farms_data, max_workers=MAX_WORKERS)
+    for i, (farm, result) in enumerate(zip(farms_data, results), 1):
         farm_name = farm.get('name', 'N/A')
         
-        print(f"🔍 [{i:3d}/{len(farms_data)}] Processando: {farm_name}")
+        print(f"🔍 [{i:3d}/{len(farms_data)}] {farm_name}")
         
-        # Buscar quantidade de campos
-        result = get_farm_fields_count(farm_id, farm_name)
         if result:
             farms_fields_data.append(result)
             
@@ -242,9 +182,11 @@ def main():
                 print(f"   ✅ {result['total_fields']} campos")
             else:
                 print(f"   ❌ Erro: {result['status']}")
-        
-        # Pequena pausa para não sobrecarregar a API
-        time.sleep(0.1)
+    
+    get_store().set_farm_field_counts({
+        farm['farm_id']: farm['total_fields']
+        for farm in farms_fields_data if farm['status'] == 'success'
+    })
     
     # Salvar dados brutos
     output_file = f"farms_fields_count_{ORG_ID}.json"
@@ -257,8 +199,11 @@ def main():
             'farms_data': farms_fields_data
         }, f, ensure_ascii=False, indent=2)
     
-    # Analisar distribuição
+    # Analisar distribuição (sem nenhuma contagem da API, usa as do banco local)
     print("\n📊 Analisando distribuição...")
+    if not any(farm['status'] == 'success' for farm in farms_fields_data):
+        print("⚠️ Nenhuma fazenda consultada com sucesso; usando as contagens do banco local")
+        farms_fields_data = None
     analysis = analyze_farms_fields_distribution(farms_fields_data)
     
     # Salvar análise
@@ -4,87 +4,15 @@ Script para buscar Boundaries (limites) dos campos
 Endpoint: /organizations/{orgId}/fields/{fieldId}/boundaries
 """
 
-import os
-import json
 import requests
-import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from collection_planner import fetch_by_field
+from boundary_geometry import boundary_metrics
+from boundary_harvester import load_org_boundaries, print_packed_summary
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 org1 eq1 offline_access"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
 
 def get_field_boundaries(
     organization_id: str,
@@ -105,17 +33,12 @@ def get_field_boundaries(
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
+    client = get_client()
     
     print(f"🗺️ Buscando Boundaries do campo...")
     print(f"   • Organização: {organization_id}")
     print(f"   • Campo: {field_id}")
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     # URL base do endpoint
     boundaries_url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/boundaries"
     
@@ -131,7 +54,7 @@ def get_field_boundaries(
         if params:
             print(f"📋 Parâmetros: {params}")
         
-        response = requests.get(boundaries_url, headers=headers, params=params)
+        response = client.get(boundaries_url, params=params)
         
         print(f"📊 Status da resposta: {response.status_code}")
         print(f"📋 Headers da resposta: {dict(response.headers)}")
@@ -151,6 +74,36 @@ def get_field_boundaries(
             print(f"📄 Resposta de erro: {e.response.text}")
         return None
 
+def get_boundaries_by_field(
+    organization_id: str,
+    field_ids: Optional[List[str]] = None,
+    simple: bool = False,
+    accuracy_data: bool = False
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Busca boundaries de vários campos (ou de todos, com field_ids=None)
+    
+    Usa a coleção /organizations/{orgId}/boundaries quando disponível e separa
+    os boundaries por campo localmente (ver collection_planner).
+    
+    Returns:
+        {field_id: [boundaries]}
+    """
+    if not get_valid_tokens():
+        return None
+    
+    params = {}
+    if simple:
+        params['simple'] = 'true'
+    if accuracy_data:
+        params['accuracyData'] = 'true'
+    
+    try:
+        return fetch_by_field(organization_id, 'boundaries', field_ids=field_ids, params=params)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao buscar boundaries: {e}")
+        return None
+
 def analyze_boundaries(boundaries_data: Dict[str, Any]) -> None:
     """
     Analisa e exibe informações dos boundaries
@@ -183,7 +136,10 @@ def analyze_boundaries(boundaries_data: Dict[str, Any]) -> None:
     
     print(f"\n📋 Boundaries disponíveis:")
     
-    for i, boundary in enumerate(boundaries, 1):
+    # Área, perímetro, centróide e bbox calculados localmente, num lote só
+    local_metrics = boundary_metrics(boundaries)
+    
+    for i, (boundary, local) in enumerate(zip(boundaries, local_metrics), 1):
         print(f"\n{'='*60}")
         print(f"🗺️ BOUNDARY {i}/{len(boundaries)}")
         print(f"{'='*60}")
@@ -230,6 +186,16 @@ def analyze_boundaries(boundaries_data: Dict[str, Any]) -> None:
             accuracy_unit = accuracy.get('unitId', 'N/A')
             print(f"   • Precisão: {accuracy_value} {accuracy_unit}")
         
+        if local['area_m2'] is not None:
+            print(f"\n📐 Geometria calculada localmente (EPSG:{local['epsg']}, {local['vertices']} vértices):")
+            area_diff = f" ({local['area_diff_pct']:+.2f}% da API)" if local['area_diff_pct'] is not None else ""
+            perimeter_diff = (f" ({local['perimeter_diff_pct']:+.2f}% da API)"
+                              if local['perimeter_diff_pct'] is not None else "")
+            print(f"   • Área: {local['area_ha']:.4f} ha{area_diff}")
+            print(f"   • Perímetro: {local['perimeter_m']:.1f} m{perimeter_diff}")
+            print(f"   • Centróide: {local['centroid'][1]:.6f}, {local['centroid'][0]:.6f}")
+            print(f"   • Bbox: {local['bbox']}")
+        
         # Coordenadas (se disponíveis)
         coordinates = boundary.get('coordinates')
         if coordinates:
@@ -318,42 +284,19 @@ def test_multiple_boundary_types():
 
 def test_multiple_fields():
     """
-    Testa boundaries em múltiplos campos
+    Sincroniza os boundaries de todos os campos da organização de uma vez
+    (boundary_harvester) e mostra o resumo do formato compacto
     """
     organization_id = "5881930"
     
-    # Lista de campos para testar
-    test_fields = [
-        {
-            'id': '19f73266-741a-99e1-3c04-a513c7481e3f',
-            'name': '0001 - 001'
-        },
-        {
-            'id': '5527ba3d-ea00-c761-3436-8b0e98b24a1f',
-            'name': '2439 - 001-01'
-        },
-        {
-            'id': 'a7848fbf-3402-dd49-c2d6-b98995fc0e68',
-            'name': '0001 - 002'
-        }
-    ]
-    
-    print("🧪 Testando boundaries em múltiplos campos...")
+    print("🧪 Coletando boundaries de todos os campos da organização...")
     
-    for field in test_fields:
-        print(f"\n{'='*80}")
-        print(f"🌾 TESTANDO CAMPO: {field['name']} (ID: {field['id']})")
-        print(f"{'='*80}")
-        
-        boundaries_data = get_field_boundaries(
-            organization_id=organization_id,
-            field_id=field['id']
-        )
-        
-        if boundaries_data:
-            analyze_boundaries(boundaries_data)
-        else:
-            print("❌ Nenhum boundary encontrado para este campo.")
+    try:
+        packed = load_org_boundaries(organization_id, refresh=True)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao buscar boundaries: {e}")
+        return
+    print_packed_summary(packed)
 
 def main():
     """
@@ -365,10 +308,10 @@ def main():
     test_multiple_boundary_types()
     
     print(f"\n{'='*80}")
-    print("🧪 TESTE ADICIONAL: Múltiplos campos")
+    print("🧪 TESTE ADICIONAL: Todos os campos da organização")
     print(f"{'='*80}")
     
-    # Testar em múltiplos campos
+    # Testar em todos os campos
     test_multiple_fields()
     
     print(f"\n✅ Análise completa concluída!")
@@ -6,89 +6,19 @@ Endpoint: /organizations/{orgId}/fields/{fieldId}/guidanceLines
 
 import os
 import json
-import requests
-import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from hierarchy_store import get_store
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"
 ORG_ID = "5881930"
 
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
-
 def get_first_field_id():
+    # Só usa o banco local com uma coleta completa da organização (campos ativos)
+    fields = get_store().crawled_fields(ORG_ID)
+    if fields:
+        return fields[0].get('id')
     if not os.path.exists('fields_organization_5881930.json'):
         print("❌ Arquivo fields_organization_5881930.json não encontrado.")
         return None
@@ -103,18 +33,14 @@ def get_guidance_lines(org_id: str, field_id: str, status: str = "available", em
     tokens = get_valid_tokens()
     if not tokens:
         return None
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     params = {"status": status}
     if embed:
         params["embed"] = embed
     url = f"{API_BASE_URL}/organizations/{org_id}/fields/{field_id}/guidanceLines"
     print(f"📡 Buscando guidance lines: {url}")
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = client.get(url, params=params)
         print(f"📊 Status: {response.status_code}")
         if response.status_code == 200:
             data = response.json()
@@ -3,109 +3,35 @@
 Script para buscar e exibir dados de operações de campo da John Deere
 """
 
-import os
 import json
 import requests
-import time
 from typing import Dict, List, Any
 from jd import access_token, ensure_token_valid, API_BASE_URL
+from deere_client import get_client
+import token_provider
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 org1 eq1 offline_access"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
-    else:
-        print("tokens.json não encontrado. Execute jd.py para autenticar.")
-        return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-    print("Tokens atualizados em tokens.json.")
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível. Reautentique-se pelo jd.py.")
-        return None
-    print("🔄 Renovando access token via refresh token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data, verify=False)  # 'verify=True' para garantir que a conexão é segura
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado com sucesso!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar access token: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"📄 Resposta de erro: {e.response.text}")
-        return None
 
 def get_valid_tokens():
-    tokens = load_tokens()
+    tokens = token_provider.get_valid_tokens()
     if not tokens:
         exit(1)
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Não foi possível renovar o token. Execute jd.py para reautenticar.")
-            exit(1)
     return tokens
 
 def get_field_operations(organization_id: str) -> Dict[str, Any]:
     """
     Busca operações de campo para uma organização específica
     """
-    tokens = get_valid_tokens()
-    access_token = tokens.get('access_token')
+    get_valid_tokens()
+    client = get_client()
     print(f"🔍 Buscando operações de campo para organização {organization_id}...")
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     # URL do endpoint de operações de campo
     field_ops_url = f"{API_BASE_URL}/organizations/{organization_id}/fieldOperations"
     
     try:
         print(f"📡 Fazendo requisição para: {field_ops_url}")
-        response = requests.get(field_ops_url, headers=headers, verify=False)  # 'verify=True' para garantir que a conexão é segura
+        response = client.get(field_ops_url, verify=False)  # 'verify=True' para garantir que a conexão é segura
         
         print(f"📊 Status da resposta: {response.status_code}")
         print(f"📋 Headers da resposta: {dict(response.headers)}")
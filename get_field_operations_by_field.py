@@ -4,88 +4,20 @@ Script para buscar operações de campo específicas de um campo da John Deere
 Usando o endpoint: /organizations/{orgId}/fields/{fieldId}/fieldOperations
 """
 
-import os
 import json
 import requests
-import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
+from deere_client import get_client
+from collection_planner import fetch_by_field
+import token_provider
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 org1 eq1 offline_access"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
-    else:
-        print("tokens.json não encontrado. Execute jd.py para autenticar.")
-        return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-    print("Tokens atualizados em tokens.json.")
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível. Reautentique-se pelo jd.py.")
-        return None
-    print("🔄 Renovando access token via refresh token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado com sucesso!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar access token: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"📄 Resposta de erro: {e.response.text}")
-        return None
 
 def get_valid_tokens():
-    tokens = load_tokens()
+    tokens = token_provider.get_valid_tokens()
     if not tokens:
         exit(1)
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Não foi possível renovar o token. Execute jd.py para reautenticar.")
-            exit(1)
     return tokens
 
 def get_field_operations_by_field(
@@ -111,16 +43,11 @@ def get_field_operations_by_field(
         embed: Para incluir measurementTypes
         work_plan_ids: Lista de IDs de planos de trabalho
     """
-    tokens = get_valid_tokens()
-    access_token = tokens.get('access_token')
+    get_valid_tokens()
+    client = get_client()
     
     print(f"🔍 Buscando operações de campo para organização {organization_id}, campo {field_id}...")
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     # URL base do endpoint
     field_ops_url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/fieldOperations"
     
@@ -144,7 +71,7 @@ def get_field_operations_by_field(
         if params:
             print(f"📋 Parâmetros: {params}")
         
-        response = requests.get(field_ops_url, headers=headers, params=params)
+        response = client.get(field_ops_url, params=params)
         
         print(f"📊 Status da resposta: {response.status_code}")
         print(f"📋 Headers da resposta: {dict(response.headers)}")
@@ -162,6 +89,41 @@ def get_field_operations_by_field(
             print(f"📄 Resposta de erro: {e.response.text}")
         return None
 
+def get_field_operations_for_fields(
+    organization_id: str,
+    field_ids: Optional[List[str]] = None,
+    crop_season: Optional[int] = None,
+    field_operation_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    embed: Optional[str] = None
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Busca operações de campo de vários campos (ou de todos, com field_ids=None)
+    
+    Usa a coleção /organizations/{orgId}/fieldOperations quando disponível e
+    separa as operações por campo localmente (ver collection_planner).
+    
+    Returns:
+        {field_id: [operações]}
+    """
+    get_valid_tokens()
+    
+    params = {
+        'cropSeason': crop_season,
+        'fieldOperationType': field_operation_type,
+        'startDate': start_date,
+        'endDate': end_date,
+        'embed': embed,
+    }
+    params = {key: value for key, value in params.items() if value}
+    
+    try:
+        return fetch_by_field(organization_id, 'fieldOperations', field_ids=field_ids, params=params)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao buscar operações de campo: {e}")
+        return None
+
 def analyze_field_operations_by_field(field_ops_data: Dict[str, Any]) -> None:
     """
     Analisa e exibe informações das operações de campo de forma organizada
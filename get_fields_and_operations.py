@@ -4,88 +4,22 @@ Script completo para buscar campos da organização e suas operações
 Fluxo: Organização → Campos → Operações de Campo
 """
 
-import os
 import json
 import requests
-import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
+from deere_client import get_client
+from as_applied_stats import load_exports, season_report, print_operation_stats
+from hierarchy_store import get_store
+import token_provider
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 org1 eq1 offline_access"  # Incluindo ag2 para operações de campo
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
-    else:
-        print("tokens.json não encontrado. Execute jd.py para autenticar.")
-        return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-    print("Tokens atualizados em tokens.json.")
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível. Reautentique-se pelo jd.py.")
-        return None
-    print("🔄 Renovando access token via refresh token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado com sucesso!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar access token: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"📄 Resposta de erro: {e.response.text}")
-        return None
+DOWNLOAD_DIR = "downloads"
 
 def get_valid_tokens():
-    tokens = load_tokens()
+    tokens = token_provider.get_valid_tokens()
     if not tokens:
         exit(1)
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Não foi possível renovar o token. Execute jd.py para reautenticar.")
-            exit(1)
     return tokens
 
 def get_organization_fields(
@@ -109,16 +43,12 @@ def get_organization_fields(
         record_filter: Filtro por estado (AVAILABLE, ARCHIVED, ALL)
         uom_system: Sistema de unidades (METRIC, ENGLISH)
     """
-    tokens = get_valid_tokens()
-    access_token = tokens.get('access_token')
+    get_valid_tokens()
+    client = get_client()
     
     print(f"🔍 Buscando campos da organização {organization_id}...")
-    
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
+
+    headers = {}
     if uom_system:
         headers['Accept-UOM-System'] = uom_system
     
@@ -143,7 +73,7 @@ def get_organization_fields(
         if params:
             print(f"📋 Parâmetros: {params}")
         
-        response = requests.get(fields_url, headers=headers, params=params)
+        response = client.get(fields_url, headers=headers, params=params)
         
         print(f"📊 Status da resposta: {response.status_code}")
         print(f"📋 Headers da resposta: {dict(response.headers)}")
@@ -174,16 +104,11 @@ def get_field_operations_by_field(
     """
     Busca operações de campo específicas de um campo
     """
-    tokens = get_valid_tokens()
-    access_token = tokens.get('access_token')
+    get_valid_tokens()
+    client = get_client()
     
     print(f"🔍 Buscando operações de campo para campo {field_id}...")
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    
     # URL base do endpoint
     field_ops_url = f"{API_BASE_URL}/organizations/{organization_id}/fields/{field_id}/fieldOperations"
     
@@ -207,7 +132,7 @@ def get_field_operations_by_field(
         if params:
             print(f"📋 Parâmetros: {params}")
         
-        response = requests.get(field_ops_url, headers=headers, params=params)
+        response = client.get(field_ops_url, params=params)
         
         print(f"📊 Status da resposta: {response.status_code}")
         
@@ -272,8 +197,11 @@ def analyze_fields(fields_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         print(f"   • Nome: {field_name}")
         print(f"   • Arquivado: {'✅ Sim' if archived else '❌ Não'}")
         
-        # Informações de fazendas
+        # Informações de fazendas (sem embed=farms, pela fazenda gravada no banco local)
         farms = field.get('farms', [])
+        if not farms:
+            stored_farm = get_store().farm_of_field(field_id)
+            farms = [stored_farm] if stored_farm else []
         if farms:
             print(f"\n🏡 Fazendas:")
             for farm in farms:
@@ -344,9 +272,14 @@ def select_field(fields: List[Dict[str, Any]]) -> Optional[str]:
         except ValueError:
             print("❌ Entrada inválida. Digite um número ou 'q' para sair.")
 
-def analyze_field_operations(field_ops_data: Dict[str, Any]) -> None:
+def analyze_field_operations(field_ops_data: Dict[str, Any], exports_dir: Optional[str] = None) -> None:
     """
     Analisa e exibe informações das operações de campo
+
+    Args:
+        field_ops_data: Resposta de /fieldOperations
+        exports_dir: Diretório com as exportações de pontos das operações; se
+                     informado, exibe também as estatísticas de aplicação
     """
     print("\n" + "="*80)
     print("🌾 ANÁLISE DAS OPERAÇÕES DE CAMPO")
@@ -367,6 +300,13 @@ def analyze_field_operations(field_ops_data: Dict[str, Any]) -> None:
         print("\n📭 Nenhuma operação de campo encontrada.")
         return
     
+    # Estatísticas das exportações de pontos, por id da operação
+    point_stats = {}
+    if exports_dir:
+        # Só as exportações destas operações são decodificadas
+        exports = load_exports(exports_dir, field_operation_ids=[op.get('id') for op in operations if op.get('id')])
+        point_stats = {stats['field_operation_id']: stats for stats in season_report(exports, operations)}
+    
     for i, operation in enumerate(operations, 1):
         print(f"\n{'='*60}")
         print(f"🌾 OPERAÇÃO {i}/{len(operations)}")
@@ -439,6 +379,9 @@ def analyze_field_operations(field_ops_data: Dict[str, Any]) -> None:
                         op_name = op.get('name', 'N/A')
                         op_license = op.get('license', 'N/A')
                         print(f"       - {op_name} (Licença: {op_license})")
+        
+        if op_id in point_stats:
+            print_operation_stats(point_stats[op_id])
 
 def main():
     """
@@ -490,7 +433,7 @@ def main():
     
     if field_ops_data:
         # 5. Analisar operações
-        analyze_field_operations(field_ops_data)
+        analyze_field_operations(field_ops_data, exports_dir=DOWNLOAD_DIR)
         
         # 6. Exibir dados brutos (opcional)
         print(f"\n📄 Dados brutos das operações:")
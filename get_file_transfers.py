@@ -4,130 +4,60 @@ Script para buscar a lista de file transfers da organização John Deere
 Endpoint: /organizations/{orgId}/fileTransfers
 """
 
-import os
-import json
-import requests
-import time
 from typing import Optional, Dict, Any, List
+from token_provider import get_valid_tokens
+from pagination import iter_collection, write_collection_json
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"
 ORG_ID = "5881930"
+SAMPLE_SIZE = 5  # Registros guardados em memória para o resumo
 
+def iter_file_transfers(org_id: str, source: Optional[str] = None):
+    params = {}
+    if source:
+        params['source'] = source
+    url = f"{API_BASE_URL}/organizations/{org_id}/fileTransfers"
+    return iter_collection(url, params=params, parallel=True)
 
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
+def get_file_transfers(org_id: str, source: Optional[str] = None,
+                       sample: Optional[List[Dict[str, Any]]] = None) -> Optional[int]:
+    """
+    Grava todos os file transfers em file_transfers_<orgId>.json página a página
+    e retorna o total, sem carregar a coleção em memória
 
-def get_file_transfers(org_id: str, source: Optional[str] = None):
+    Args:
+        sample: Se informada, recebe os primeiros SAMPLE_SIZE registros
+    """
     tokens = get_valid_tokens()
     if not tokens:
         return None
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
-    params = {}
-    if source:
-        params['source'] = source
     url = f"{API_BASE_URL}/organizations/{org_id}/fileTransfers"
-    print(f"📡 Buscando file transfers: {url}")
+    output_file = f"file_transfers_{org_id}.json"
+    print(f"📡 Buscando file transfers (todas as páginas): {url}")
+
+    def records():
+        for record in iter_file_transfers(org_id, source):
+            if sample is not None and len(sample) < SAMPLE_SIZE:
+                sample.append(record)
+            yield record
+
     try:
-        response = requests.get(url, headers=headers, params=params)
-        print(f"📊 Status: {response.status_code}")
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ Sucesso! {len(data.get('values', []))} file transfers encontrados.")
-            with open(f"file_transfers_{org_id}.json", 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return data
-        else:
-            print(f"❌ Erro: {response.status_code}")
-            print(f"📄 Resposta: {response.text}")
-            return None
+        total = write_collection_json(records(), output_file)
+        print(f"✅ Sucesso! {total} file transfers encontrados.")
+        return total
     except Exception as e:
         print(f"❌ Erro na requisição: {e}")
         return None
 
 def main():
     print("🚀 Buscando file transfers da organização...")
-    data = get_file_transfers(ORG_ID)
-    if data:
+    sample = []
+    total = get_file_transfers(ORG_ID, sample=sample)
+    if total:
         print(f"🔗 Dados salvos em file_transfers_{ORG_ID}.json")
         # Exibir resumo
-        values = data.get('values', [])
-        print(f"\nResumo dos primeiros 5 transfers:")
-        for t in values[:5]:
+        print(f"\nResumo dos primeiros {len(sample)} transfers:")
+        for t in sample:
             print(f"ID: {t.get('id')}, Status: {t.get('status1')}, File: {t.get('file', {}).get('name')}, Machine: {t.get('machine', {}).get('name')}")
     else:
         print("Nenhum dado retornado.")
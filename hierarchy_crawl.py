@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Montagem da hierarquia campo → fazenda → cliente em uma única passada
+Em vez de chamar /fields/{fieldId}/farms e /fields/{fieldId}/clients para cada
+campo (2 requisições por campo), lê as coleções da organização (/fields com
+embed=farms,clients, /farms e /clients) e resolve os vínculos localmente: o
+farm de cada campo vem do embed e o cliente do embed ou do clientUri da fazenda.
+"""
+
+from typing import Optional, Dict, Any, List
+
+import requests
+
+from fanout import run_concurrently
+from pagination import iter_collection
+from token_provider import get_valid_tokens
+from hierarchy_store import HierarchyStore, get_store, embedded_records, id_from_uri
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+FIELDS_EMBED = 'farms,clients'
+
+
+class HierarchyGraph:
+    """
+    Grafo da organização com clientes, fazendas, campos e seus vínculos
+    """
+
+    def __init__(self, org_id):
+        self.org_id = str(org_id)
+        self.clients: Dict[str, Dict[str, Any]] = {}
+        self.farms: Dict[str, Dict[str, Any]] = {}
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self.field_farms: Dict[str, List[str]] = {}
+        self.field_clients: Dict[str, List[str]] = {}
+        self.farm_clients: Dict[str, List[str]] = {}
+
+    def resolve(self) -> None:
+        """
+        Resolve os vínculos a partir dos embeds dos campos e do clientUri das fazendas
+        """
+        for farm_id, farm in self.farms.items():
+            client_ids = [c['id'] for c in embedded_records(farm, 'clients') if c.get('id')]
+            client_from_uri = id_from_uri(farm.get('clientUri'))
+            if client_from_uri and client_from_uri not in client_ids:
+                client_ids.append(client_from_uri)
+            self.farm_clients[farm_id] = client_ids
+
+        for field_id, field in self.fields.items():
+            farm_ids = []
+            for farm in embedded_records(field, 'farms'):
+                if not farm.get('id'):
+                    continue
+                farm_ids.append(farm['id'])
+                # Fazenda que não veio em /farms (ex: arquivada): usa o registro embutido
+                self.farms.setdefault(farm['id'], farm)
+                self.farm_clients.setdefault(farm['id'], [])
+            self.field_farms[field_id] = farm_ids
+
+            client_ids = []
+            for client in embedded_records(field, 'clients'):
+                if client.get('id'):
+                    client_ids.append(client['id'])
+                    self.clients.setdefault(client['id'], client)
+            if not client_ids:
+                for farm_id in farm_ids:
+                    client_ids.extend(c for c in self.farm_clients.get(farm_id, []) if c not in client_ids)
+            self.field_clients[field_id] = client_ids
+
+    def farms_of_field(self, field_id: str) -> List[Dict[str, Any]]:
+        return [self.farms[farm_id] for farm_id in self.field_farms.get(field_id, []) if farm_id in self.farms]
+
+    def clients_of_field(self, field_id: str) -> List[Dict[str, Any]]:
+        return [self.clients[client_id] for client_id in self.field_clients.get(field_id, [])
+                if client_id in self.clients]
+
+    def save(self, store: HierarchyStore) -> None:
+        """
+        Grava o grafo no banco local
+        """
+        store.upsert_clients(self.org_id, self.clients.values())
+        store.upsert_farms(self.org_id, self.farms.values())
+        store.upsert_fields(self.org_id, self.fields.values())
+        store.link_farm_clients(self.farm_clients)
+        store.link_field_farms(self.field_farms)
+        store.link_field_clients(self.field_clients)
+        store.mark_org_crawled(self.org_id)
+
+
+def as_collection(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Coloca registros no formato de coleção da API ({"values": [...], "total": N})
+    """
+    return {'values': records, 'total': len(records)}
+
+
+def build_hierarchy(org_id, record_filter: str = "ACTIVE", save: bool = True) -> Optional[HierarchyGraph]:
+    """
+    Busca /fields (com embed), /farms e /clients da organização concorrentemente,
+    todas as páginas, e monta o grafo. Com save=True grava no hierarchy_store.
+    """
+    if not get_valid_tokens():
+        return None
+
+    base_url = f"{API_BASE_URL}/organizations/{org_id}"
+    collections = [
+        ('fields', f"{base_url}/fields", {'embed': FIELDS_EMBED, 'recordFilter': record_filter}),
+        ('farms', f"{base_url}/farms", {'recordFilter': record_filter}),
+        ('clients', f"{base_url}/clients", {'recordFilter': record_filter}),
+    ]
+
+    def fetch(collection):
+        name, url, params = collection
+        return name, list(iter_collection(url, params=params, parallel=True))
+
+    print(f"🔄 Buscando campos, fazendas e clientes da organização {org_id}...")
+    try:
+        results = dict(run_concurrently(fetch, collections, max_workers=len(collections)))
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao buscar a hierarquia: {e}")
+        return None
+
+    graph = HierarchyGraph(org_id)
+    graph.clients = {c['id']: c for c in results['clients'] if c.get('id')}
+    graph.farms = {f['id']: f for f in results['farms'] if f.get('id')}
+    graph.fields = {f['id']: f for f in results['fields'] if f.get('id')}
+    graph.resolve()
+
+    print(f"✅ {len(graph.fields)} campos, {len(graph.farms)} fazendas, {len(graph.clients)} clientes")
+    if save:
+        graph.save(get_store())
+    return graph
+
+
+def main():
+    org_id = "5881930"  # Substitua pelo seu orgId
+    graph = build_hierarchy(org_id)
+    if not graph:
+        return
+
+    without_farm = sum(1 for farm_ids in graph.field_farms.values() if not farm_ids)
+    without_client = sum(1 for client_ids in graph.field_clients.values() if not client_ids)
+    print(f"\n📊 Campos sem fazenda: {without_farm}")
+    print(f"📊 Campos sem cliente: {without_client}")
+    print("💾 Hierarquia gravada no banco local (hierarchy_store)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Armazenamento local (SQLite) da hierarquia organização → cliente → fazenda → campo
+Os scripts de coleta gravam aqui os registros da API e as análises consultam
+por índice ("campos da fazenda X", "fazenda do campo Y") em vez de recarregar
+e varrer os dumps JSON a cada execução.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, List, Iterable
+
+DB_FILE = 'hierarchy.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS organizations (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    member INTEGER,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS clients (
+    id TEXT PRIMARY KEY,
+    org_id TEXT NOT NULL,
+    name TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS farms (
+    id TEXT PRIMARY KEY,
+    org_id TEXT NOT NULL,
+    name TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    field_count INTEGER,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS fields (
+    id TEXT PRIMARY KEY,
+    org_id TEXT NOT NULL,
+    name TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS farm_clients (
+    farm_id TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    PRIMARY KEY (farm_id, client_id)
+);
+CREATE TABLE IF NOT EXISTS field_farms (
+    field_id TEXT NOT NULL,
+    farm_id TEXT NOT NULL,
+    PRIMARY KEY (field_id, farm_id)
+);
+CREATE TABLE IF NOT EXISTS field_clients (
+    field_id TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    PRIMARY KEY (field_id, client_id)
+);
+CREATE TABLE IF NOT EXISTS org_crawls (
+    org_id TEXT PRIMARY KEY,
+    crawled_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clients_org ON clients (org_id);
+CREATE INDEX IF NOT EXISTS idx_farms_org ON farms (org_id);
+CREATE INDEX IF NOT EXISTS idx_farms_name ON farms (name);
+CREATE INDEX IF NOT EXISTS idx_fields_org ON fields (org_id);
+CREATE INDEX IF NOT EXISTS idx_fields_name ON fields (name);
+CREATE INDEX IF NOT EXISTS idx_farm_clients_client ON farm_clients (client_id);
+CREATE INDEX IF NOT EXISTS idx_field_farms_farm ON field_farms (farm_id);
+CREATE INDEX IF NOT EXISTS idx_field_clients_client ON field_clients (client_id);
+"""
+
+
+def id_from_uri(uri: Optional[str]) -> Optional[str]:
+    """
+    Último segmento de uma URI da API (ex: clientUri → id do cliente)
+    """
+    if not uri:
+        return None
+    return uri.rstrip('/').rsplit('/', 1)[-1]
+
+
+def embedded_records(record: Dict[str, Any], key: str) -> List[Dict[str, Any]]:
+    """
+    Registros embutidos via embed=... (lista, objeto único ou {"values": [...]})
+    """
+    value = record.get(key)
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict) and 'values' in value:
+        return value['values']
+    if isinstance(value, dict):
+        return [value]
+    return []
+
+
+class HierarchyStore:
+    """
+    Banco SQLite com tabelas e índices para organizações, clientes, fazendas,
+    campos e seus vínculos. Pode ser usado por várias threads.
+
+    Use como context manager:
+
+        with HierarchyStore() as store:
+            store.upsert_farms(org_id, farms)
+            fields = store.fields_of_farm(farm_id)
+
+    Args:
+        db_path: Caminho do arquivo do banco
+    """
+
+    def __init__(self, db_path: str = DB_FILE):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> 'HierarchyStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements: Iterable[tuple]) -> None:
+        """
+        Executa (sql, parâmetros) em uma única transação
+        """
+        with self._lock, self._conn:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _replace_links(table: str, child: str, parent: str, child_id: str, parent_ids: Iterable) -> List[tuple]:
+        """
+        Comandos que trocam os vínculos de child_id pelos parent_ids informados
+        (um campo que mudou de fazenda não fica com o vínculo antigo)
+        """
+        statements = [(f'DELETE FROM {table} WHERE {child} = ?', (child_id,))]
+        statements.extend((f'INSERT OR IGNORE INTO {table} ({child}, {parent}) VALUES (?, ?)',
+                           (child_id, str(parent_id))) for parent_id in parent_ids)
+        return statements
+
+    @staticmethod
+    def _records(rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        return [json.loads(row['data']) for row in rows]
+
+    # --- Gravação ---
+
+    def upsert_organizations(self, organizations: Iterable[Dict[str, Any]]) -> None:
+        self._write(
+            ('INSERT OR REPLACE INTO organizations (id, name, type, member, data) VALUES (?, ?, ?, ?, ?)',
+             (str(org['id']), org.get('name'), org.get('type'), int(bool(org.get('member'))),
+              json.dumps(org, ensure_ascii=False)))
+            for org in organizations if org.get('id') is not None
+        )
+
+    def upsert_clients(self, org_id, clients: Iterable[Dict[str, Any]]) -> None:
+        self._write(
+            ('INSERT OR REPLACE INTO clients (id, org_id, name, archived, data) VALUES (?, ?, ?, ?, ?)',
+             (str(client['id']), str(org_id), client.get('name'), int(bool(client.get('archived'))),
+              json.dumps(client, ensure_ascii=False)))
+            for client in clients if client.get('id') is not None
+        )
+
+    def upsert_farms(self, org_id, farms: Iterable[Dict[str, Any]]) -> None:
+        """
+        Grava fazendas e o vínculo fazenda → cliente (clientUri ou clients embutidos),
+        substituindo os vínculos anteriores da fazenda. O field_count já conhecido é preservado.
+        """
+        statements = []
+        for farm in farms:
+            if farm.get('id') is None:
+                continue
+            farm_id = str(farm['id'])
+            statements.append((
+                'INSERT INTO farms (id, org_id, name, archived, data) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET org_id=excluded.org_id, name=excluded.name, '
+                'archived=excluded.archived, data=excluded.data',
+                (farm_id, str(org_id), farm.get('name'), int(bool(farm.get('archived'))),
+                 json.dumps(farm, ensure_ascii=False))
+            ))
+            client_ids = {c.get('id') for c in embedded_records(farm, 'clients')}
+            client_ids.add(id_from_uri(farm.get('clientUri')))
+            client_ids.discard(None)
+            if client_ids:
+                statements.extend(self._replace_links('farm_clients', 'farm_id', 'client_id', farm_id, client_ids))
+        self._write(statements)
+
+    def upsert_fields(
+        self,
+        org_id,
+        fields: Iterable[Dict[str, Any]],
+        farm_id: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> None:
+        """
+        Grava campos e os vínculos campo → fazenda / campo → cliente
+
+        Os vínculos vêm de farm_id/client_id (campos listados a partir de uma
+        fazenda ou cliente) e dos registros embutidos (embed=farms,clients), e
+        substituem os vínculos anteriores do campo.
+        """
+        statements = []
+        for field in fields:
+            if field.get('id') is None:
+                continue
+            field_id = str(field['id'])
+            statements.append((
+                'INSERT OR REPLACE INTO fields (id, org_id, name, archived, data) VALUES (?, ?, ?, ?, ?)',
+                (field_id, str(org_id), field.get('name'), int(bool(field.get('archived'))),
+                 json.dumps(field, ensure_ascii=False))
+            ))
+            farm_ids = ({f.get('id') for f in embedded_records(field, 'farms')} | {farm_id}) - {None}
+            if farm_ids:
+                statements.extend(self._replace_links('field_farms', 'field_id', 'farm_id', field_id, farm_ids))
+            client_ids = ({c.get('id') for c in embedded_records(field, 'clients')} | {client_id}) - {None}
+            if client_ids:
+                statements.extend(self._replace_links('field_clients', 'field_id', 'client_id', field_id, client_ids))
+        self._write(statements)
+
+    def link_farm_clients(self, links: Dict[str, Iterable[str]]) -> None:
+        """
+        Substitui os vínculos de cada fazenda ({farm_id: [client_id, ...]})
+        """
+        self._write(statement for farm_id, client_ids in links.items()
+                    for statement in self._replace_links('farm_clients', 'farm_id', 'client_id',
+                                                         str(farm_id), client_ids))
+
+    def link_field_farms(self, links: Dict[str, Iterable[str]]) -> None:
+        """
+        Substitui os vínculos de cada campo com fazendas ({field_id: [farm_id, ...]})
+        """
+        self._write(statement for field_id, farm_ids in links.items()
+                    for statement in self._replace_links('field_farms', 'field_id', 'farm_id',
+                                                         str(field_id), farm_ids))
+
+    def link_field_clients(self, links: Dict[str, Iterable[str]]) -> None:
+        """
+        Substitui os vínculos de cada campo com clientes ({field_id: [client_id, ...]})
+        """
+        self._write(statement for field_id, client_ids in links.items()
+                    for statement in self._replace_links('field_clients', 'field_id', 'client_id',
+                                                         str(field_id), client_ids))
+
+    def set_farm_field_counts(self, counts: Dict[str, int]) -> None:
+        """
+        Grava o total de campos por fazenda (farm_id → total)
+        """
+        self._write(('UPDATE farms SET field_count = ? WHERE id = ?', (int(total), str(farm_id)))
+                    for farm_id, total in counts.items())
+
+    def mark_org_crawled(self, org_id) -> None:
+        """
+        Registra que a organização inteira (/fields, /farms, /clients) foi gravada
+        """
+        self._write([('INSERT OR REPLACE INTO org_crawls (org_id, crawled_at) '
+                      "VALUES (?, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))", (str(org_id),))])
+
+    # --- Consultas ---
+
+    def organizations(self) -> List[Dict[str, Any]]:
+        return self._records(self._query('SELECT data FROM organizations ORDER BY name'))
+
+    def clients(self, org_id, include_archived: bool = True) -> List[Dict[str, Any]]:
+        sql = 'SELECT data FROM clients WHERE org_id = ?'
+        if not include_archived:
+            sql += ' AND archived = 0'
+        return self._records(self._query(sql + ' ORDER BY name', (str(org_id),)))
+
+    def farms(self, org_id, include_archived: bool = True) -> List[Dict[str, Any]]:
+        sql = 'SELECT data FROM farms WHERE org_id = ?'
+        if not include_archived:
+            sql += ' AND archived = 0'
+        return self._records(self._query(sql + ' ORDER BY rowid', (str(org_id),)))
+
+    def fields(self, org_id, include_archived: bool = True) -> List[Dict[str, Any]]:
+        sql = 'SELECT data FROM fields WHERE org_id = ?'
+        if not include_archived:
+            sql += ' AND archived = 0'
+        return self._records(self._query(sql + ' ORDER BY rowid', (str(org_id),)))
+
+    def crawled_fields(self, org_id) -> Optional[List[Dict[str, Any]]]:
+        """
+        Campos ativos da organização, ou None se o banco não tem uma coleta
+        completa dela (só campos vindos de coletas por cliente, por exemplo)
+        """
+        if not self._query('SELECT 1 FROM org_crawls WHERE org_id = ?', (str(org_id),)):
+            return None
+        return self.fields(org_id, include_archived=False)
+
+    def farm(self, farm_id: str) -> Optional[Dict[str, Any]]:
+        records = self._records(self._query('SELECT data FROM farms WHERE id = ?', (str(farm_id),)))
+        return records[0] if records else None
+
+    def field(self, field_id: str) -> Optional[Dict[str, Any]]:
+        records = self._records(self._query('SELECT data FROM fields WHERE id = ?', (str(field_id),)))
+        return records[0] if records else None
+
+    def fields_of_farm(self, farm_id: str) -> List[Dict[str, Any]]:
+        return self._records(self._query(
+            'SELECT f.data FROM field_farms ff JOIN fields f ON f.id = ff.field_id '
+            'WHERE ff.farm_id = ? ORDER BY f.name', (str(farm_id),)))
+
+    def farm_of_field(self, field_id: str) -> Optional[Dict[str, Any]]:
+        records = self._records(self._query(
+            'SELECT fa.data FROM field_farms ff JOIN farms fa ON fa.id = ff.farm_id '
+            'WHERE ff.field_id = ? LIMIT 1', (str(field_id),)))
+        return records[0] if records else None
+
+    def farms_of_client(self, client_id: str) -> List[Dict[str, Any]]:
+        return self._records(self._query(
+            'SELECT fa.data FROM farm_clients fc JOIN farms fa ON fa.id = fc.farm_id '
+            'WHERE fc.client_id = ? ORDER BY fa.name', (str(client_id),)))
+
+    def client_of_farm(self, farm_id: str) -> Optional[Dict[str, Any]]:
+        records = self._records(self._query(
+            'SELECT c.data FROM farm_clients fc JOIN clients c ON c.id = fc.client_id '
+            'WHERE fc.farm_id = ? LIMIT 1', (str(farm_id),)))
+        return records[0] if records else None
+
+    def fields_of_client(self, client_id: str) -> List[Dict[str, Any]]:
+        return self._records(self._query(
+            'SELECT f.data FROM field_clients fc JOIN fields f ON f.id = fc.field_id '
+            'WHERE fc.client_id = ? ORDER BY f.name', (str(client_id),)))
+
+    def farm_field_counts(self, org_id) -> List[Dict[str, Any]]:
+        """
+        Total de campos por fazenda, no formato usado por
+        get_farms_fields_count.analyze_farms_fields_distribution. Usa o
+        field_count gravado e, na falta dele, conta os vínculos campo → fazenda.
+        """
+        rows = self._query(
+            'SELECT fa.id, fa.name, fa.field_count, '
+            '(SELECT COUNT(*) FROM field_farms ff WHERE ff.farm_id = fa.id) AS linked '
+            'FROM farms fa WHERE fa.org_id = ? ORDER BY fa.rowid', (str(org_id),))
+        return [
+            {
+                'farm_id': row['id'],
+                'farm_name': row['name'],
+                'total_fields': row['field_count'] if row['field_count'] is not None else row['linked'],
+                'status': 'success'
+            }
+            for row in rows
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Quantidade de registros por tabela
+        """
+        return {table: self._query(f'SELECT COUNT(*) FROM {table}')[0][0]
+                for table in ('organizations', 'clients', 'farms', 'fields',
+                              'farm_clients', 'field_farms', 'field_clients')}
+
+
+_store: Optional[HierarchyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> HierarchyStore:
+    """
+    Retorna o banco compartilhado do processo (DB_FILE), abrindo-o na primeira chamada
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HierarchyStore()
+    return _store
+
+
+def import_json_dumps(store: HierarchyStore, org_id) -> Dict[str, int]:
+    """
+    Importa os dumps JSON existentes (farms_organization_*, fields_organization_*,
+    farms_fields_count_* e all_client_fields.json) para o banco
+    """
+    farms_file = f"farms_organization_{org_id}.json"
+    if os.path.exists(farms_file):
+        with open(farms_file, 'r', encoding='utf-8') as f:
+            store.upsert_farms(org_id, json.load(f))
+
+    fields_file = f"fields_organization_{org_id}.json"
+    if os.path.exists(fields_file):
+        with open(fields_file, 'r', encoding='utf-8') as f:
+            fields = json.load(f)
+        store.upsert_fields(org_id, fields if isinstance(fields, list) else fields.get('values', []))
+
+    counts_file = f"farms_fields_count_{org_id}.json"
+    if os.path.exists(counts_file):
+        with open(counts_file, 'r', encoding='utf-8') as f:
+            counts = json.load(f)
+        store.set_farm_field_counts({farm['farm_id']: farm['total_fields']
+                                     for farm in counts.get('farms_data', [])
+                                     if farm.get('status') == 'success'})
+
+    if os.path.exists('all_client_fields.json'):
+        with open('all_client_fields.json', 'r', encoding='utf-8') as f:
+            client_fields = json.load(f)
+        store.upsert_clients(org_id, [{'id': c['client_id'], 'name': c.get('client_name')}
+                                      for c in client_fields if c.get('client_id')])
+        for entry in client_fields:
+            if entry.get('client_id') and entry.get('fields'):
+                store.upsert_fields(org_id, entry['fields'].get('values', []), client_id=entry['client_id'])
+
+    return store.counts()
+
+
+def main():
+    org_id = "5881930"  # Substitua pelo seu orgId
+    print(f"📥 Importando dumps JSON da organização {org_id} para {DB_FILE}...")
+    with HierarchyStore() as store:
+        counts = import_json_dumps(store, org_id)
+    print("✅ Importação concluída:")
+    for table, total in counts.items():
+        print(f"   • {table}: {total}")
+
+
+if __name__ == "__main__":
+    main()
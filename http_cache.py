@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Cache persistente em disco para respostas GET da API John Deere
+A chave é a URL com os parâmetros de query (normalizados) e os headers que
+mudam o corpo (Accept, Accept-UOM-System, x-deere-signature). Respostas com
+ETag/Last-Modified são revalidadas com If-None-Match/If-Modified-Since (um 304
+custa só os headers), cada endpoint pode ter um TTL em que a resposta é usada
+sem nenhuma requisição, e o tamanho total é limitado com descarte LRU.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_DIR = '.http_cache'
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # Tamanho máximo do cache em disco
+MAX_ENTRY_BYTES = 16 * 1024 * 1024   # Respostas maiores que isso não são guardadas
+
+# TTL (segundos) por endpoint: dentro do TTL a resposta em cache é usada sem
+# requisição; depois dele (ou com TTL 0) é revalidada com ETag/Last-Modified.
+# O primeiro padrão que casar com o caminho da URL vence.
+DEFAULT_TTLS: List[Tuple[str, float]] = [
+    (r'/\.well-known/', 24 * 3600),
+    (r'/boundaries$', 3600),
+    (r'/mapLayerSummaries$', 900),
+    (r'/guidanceLines$', 900),
+]
+DEFAULT_TTL = 0.0
+
+# Headers da requisição que alteram o corpo da resposta e entram na chave
+VARY_HEADERS = ('Accept', 'Accept-UOM-System', 'x-deere-signature')
+
+# Headers que não fazem sentido numa resposta reconstruída do cache (o corpo
+# guardado já está descomprimido)
+_DROP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class CacheEntry:
+    """
+    Resposta guardada em cache (metadados + corpo)
+    """
+
+    def __init__(self, key: str, meta: Dict[str, Any], body: bytes):
+        self.key = key
+        self.meta = meta
+        self.body = body
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.meta['headers'].get('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.meta['headers'].get('Last-Modified')
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.meta['stored_at'] < self.meta.get('ttl', 0)
+
+    def to_response(self) -> requests.Response:
+        """
+        Reconstrói um requests.Response a partir da entrada (response.from_cache = True)
+        """
+        response = requests.Response()
+        response.status_code = self.meta['status']
+        response.url = self.meta['url']
+        response.headers = CaseInsensitiveDict(self.meta['headers'])
+        response._content = self.body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = 'OK'
+        response.from_cache = True
+        return response
+
+
+class HttpCache:
+    """
+    Cache de respostas HTTP em disco com revalidação, TTL por endpoint e descarte LRU
+
+    Cada entrada ocupa dois arquivos em cache_dir: <chave>.meta (JSON) e
+    <chave>.body. O horário de modificação do .body marca o último acesso e
+    define a ordem de descarte quando o total passa de max_bytes.
+
+    Args:
+        cache_dir: Diretório do cache
+        max_bytes: Tamanho total máximo dos corpos guardados
+        max_entry_bytes: Tamanho máximo de uma resposta para ser guardada
+        ttls: Lista (regex do caminho, TTL em segundos); sobrescreve DEFAULT_TTLS
+        default_ttl: TTL dos endpoints que não casam com nenhum padrão
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = CACHE_DIR,
+        max_bytes: int = MAX_CACHE_BYTES,
+        max_entry_bytes: int = MAX_ENTRY_BYTES,
+        ttls: Optional[List[Tuple[str, float]]] = None,
+        default_ttl: float = DEFAULT_TTL
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls if ttls is not None else DEFAULT_TTLS)]
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, List[float]]] = None  # chave -> [tamanho, último acesso]
+        self._total_bytes = 0
+
+    # --- Chave e TTL ---
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> str:
+        """
+        Chave da requisição: URL com a query ordenada (incluindo params) e os VARY_HEADERS
+        """
+        prepared_url = requests.Request('GET', url, params=params).prepare().url
+        parts = urlsplit(prepared_url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+        lowered = {k.lower(): v for k, v in (headers or {}).items()}
+        vary = '\n'.join(f"{name}:{lowered.get(name.lower(), '')}" for name in VARY_HEADERS)
+        return hashlib.sha256(f"{normalized}\n{vary}".encode('utf-8')).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        path = urlsplit(url).path
+        for pattern, ttl in self.ttls:
+            if pattern.search(path):
+                return ttl
+        return self.default_ttl
+
+    # --- Armazenamento ---
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.meta", f"{base}.body"
+
+    def _load_index(self) -> None:
+        """
+        Monta o índice (tamanho e último acesso) a partir dos arquivos em disco
+        """
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.body'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            self._index[name[:-5]] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def _remove(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            self._remove(key)
+            if self._total_bytes <= self.max_bytes:
+                return
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """
+        Retorna a entrada da chave (fresca ou não), ou None, e marca o acesso para o LRU
+        """
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                return None
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                with open(body_path, 'rb') as f:
+                    body = f.read()
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            now = time.time()
+            self._index[key][1] = now
+            try:
+                os.utime(body_path, (now, now))
+            except OSError:
+                pass
+        return CacheEntry(key, meta, body)
+
+    def store(self, key: str, response: requests.Response, ttl: float) -> None:
+        """
+        Guarda uma resposta 200. Respostas sem validador (ETag/Last-Modified) só
+        são guardadas se o endpoint tiver TTL, já que não há como revalidá-las.
+        """
+        if response.status_code != 200:
+            return
+        if 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+        if ttl <= 0 and 'ETag' not in response.headers and 'Last-Modified' not in response.headers:
+            return
+        body = response.content
+        if len(body) > self.max_entry_bytes:
+            return
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+
+        meta = {
+            'url': response.url,
+            'status': response.status_code,
+            'headers': headers,
+            'stored_at': time.time(),
+            'ttl': ttl,
+        }
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            self._load_index()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if key in self._index:
+                self._remove(key)
+            tmp_body = f"{body_path}.tmp"
+            with open(tmp_body, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_body, body_path)
+            tmp_meta = f"{meta_path}.tmp"
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, meta_path)
+            self._index[key] = [len(body), time.time()]
+            self._total_bytes += len(body)
+            self._evict()
+
+    def revalidated(self, entry: CacheEntry, response: requests.Response) -> requests.Response:
+        """
+        Trata um 304: renova o prazo da entrada (e validadores novos, se vieram)
+        e devolve a resposta em cache
+        """
+        meta = dict(entry.meta)
+        meta['stored_at'] = time.time()
+        headers = dict(meta['headers'])
+        for name in ('ETag', 'Last-Modified', 'Date', 'Cache-Control', 'Expires'):
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        meta['headers'] = headers
+        meta_path, _ = self._paths(entry.key)
+        with self._lock:
+            tmp_meta = f"{meta_path}.tmp"
+            try:
+                with open(tmp_meta, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+                os.replace(tmp_meta, meta_path)
+            except OSError:
+                pass
+        return CacheEntry(entry.key, meta, entry.body).to_response()
+
+    def clear(self) -> None:
+        """
+        Remove todas as entradas do cache
+        """
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
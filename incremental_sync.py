@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Sincronização incremental de coleções da API John Deere via x-deere-signature
+Na primeira execução a coleção é baixada inteira e a assinatura devolvida no
+header x-deere-signature é guardada. Nas seguintes, a assinatura é enviada de
+volta e a API responde apenas com os registros alterados desde então, que são
+aplicados sobre a cópia local (inclusões, alterações e remoções).
+"""
+
+import os
+import json
+import time
+from typing import Optional, Dict, Any, List, Iterable
+
+import requests
+
+from deere_client import get_client
+from fanout import iter_concurrently
+from pagination import ITEM_LIMIT, get_link
+from token_provider import get_valid_tokens
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+SYNC_DIR = 'sync_state'
+MAX_WORKERS = 8
+SIGNATURE_HEADER = 'x-deere-signature'
+
+
+def is_removed(record: Dict[str, Any]) -> bool:
+    """
+    Registros de uma resposta delta que saíram da coleção (apagados ou arquivados)
+    """
+    return bool(record.get('deleted')) or bool(record.get('archived'))
+
+
+class CollectionSync:
+    """
+    Cópia local de uma coleção mantida em dia com x-deere-signature
+
+    O estado fica em <state_dir>/<name>.json: URL, parâmetros, última assinatura,
+    horário da última sincronização e os registros indexados por id.
+
+    Args:
+        name: Nome da coleção (vira o nome do arquivo de estado)
+        url: URL da coleção
+        params: Parâmetros de query (ex: recordFilter)
+        state_dir: Diretório dos arquivos de estado
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        state_dir: str = SYNC_DIR
+    ):
+        self.name = name
+        self.url = url
+        self.params = dict(params or {})
+        self.state_file = os.path.join(state_dir, f"{name}.json")
+        self.signature: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Estado de '{self.name}' ilegível ({e}); será feita sincronização completa")
+            return
+        if state.get('url') != self.url or state.get('params', {}) != self.params:
+            # A consulta mudou: a assinatura antiga não vale para ela
+            return
+        self.signature = state.get('signature')
+        self.synced_at = state.get('synced_at')
+        self.records = state.get('records', {})
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        state = {
+            'url': self.url,
+            'params': self.params,
+            'signature': self.signature,
+            'synced_at': self.synced_at,
+            'records': self.records,
+        }
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_file, self.state_file)
+
+    def _fetch(self, signature: str):
+        """
+        Busca todas as páginas enviando a assinatura. Retorna (registros, nova assinatura).
+        """
+        client = get_client()
+        headers = {SIGNATURE_HEADER: signature}
+        params = dict(self.params)
+        params['itemLimit'] = ITEM_LIMIT
+
+        records: List[Dict[str, Any]] = []
+        new_signature = None
+        url = self.url
+        while url:
+            # Com assinatura a resposta depende do estado do servidor: sem cache HTTP
+            response = client.get(url, headers=headers, params=params, use_cache=False)
+            response.raise_for_status()
+            new_signature = response.headers.get(SIGNATURE_HEADER) or new_signature
+            page = response.json()
+            records.extend(page.get('values', []))
+            url = get_link(page, 'nextPage')
+            params = None  # O nextPage já traz os parâmetros
+        return records, new_signature
+
+    def sync(self) -> Dict[str, Any]:
+        """
+        Sincroniza a coleção e grava o estado
+
+        Retorna um resumo: {'name', 'full', 'received', 'added', 'updated', 'removed', 'total'}
+        """
+        # Só é coleção completa quando nenhuma assinatura foi enviada; uma resposta
+        # delta sem assinatura nova não pode substituir a cópia local
+        full = not self.signature
+        records, new_signature = self._fetch(self.signature or "")
+
+        summary = {'name': self.name, 'full': full, 'received': len(records),
+                   'added': 0, 'updated': 0, 'removed': 0}
+        if full:
+            current = {}
+            for record in records:
+                if not is_removed(record) and record.get('id') is not None:
+                    current[str(record['id'])] = record
+            summary['added'] = len(set(current) - set(self.records))
+            summary['removed'] = len(set(self.records) - set(current))
+            summary['updated'] = sum(1 for key in current if key in self.records and current[key] != self.records[key])
+            self.records = current
+        else:
+            self.apply_delta(records, summary)
+            if not new_signature:
+                print(f"⚠️ '{self.name}': resposta delta sem {SIGNATURE_HEADER}; mantendo a assinatura anterior")
+
+        self.signature = new_signature or self.signature
+        self.synced_at = time.time()
+        self._save()
+        summary['total'] = len(self.records)
+        return summary
+
+    def apply_delta(self, records: Iterable[Dict[str, Any]], summary: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Aplica registros alterados sobre a cópia local
+        """
+        summary = summary if summary is not None else {'added': 0, 'updated': 0, 'removed': 0}
+        for record in records:
+            record_id = record.get('id')
+            if record_id is None:
+                continue
+            key = str(record_id)
+            if is_removed(record):
+                if self.records.pop(key, None) is not None:
+                    summary['removed'] += 1
+            elif key in self.records:
+                self.records[key] = record
+                summary['updated'] += 1
+            else:
+                self.records[key] = record
+                summary['added'] += 1
+
+    def values(self) -> List[Dict[str, Any]]:
+        """
+        Registros da cópia local
+        """
+        return list(self.records.values())
+
+
+# --- Coleções sincronizadas ---
+
+def org_fields_sync(org_id, state_dir: str = SYNC_DIR) -> CollectionSync:
+    return CollectionSync(f"fields_{org_id}", f"{API_BASE_URL}/organizations/{org_id}/fields",
+                          params={'recordFilter': 'ACTIVE'}, state_dir=state_dir)
+
+
+def farms_sync(org_id, state_dir: str = SYNC_DIR) -> CollectionSync:
+    return CollectionSync(f"farms_{org_id}", f"{API_BASE_URL}/organizations/{org_id}/farms",
+                          params={'recordFilter': 'ACTIVE'}, state_dir=state_dir)
+
+
+def clients_sync(org_id, state_dir: str = SYNC_DIR) -> CollectionSync:
+    return CollectionSync(f"clients_{org_id}", f"{API_BASE_URL}/organizations/{org_id}/clients",
+                          params={'recordFilter': 'ACTIVE'}, state_dir=state_dir)
+
+
+def client_fields_sync(org_id, client_id, state_dir: str = SYNC_DIR) -> CollectionSync:
+    return CollectionSync(f"client_fields_{org_id}_{client_id}",
+                          f"{API_BASE_URL}/organizations/{org_id}/clients/{client_id}/fields",
+                          state_dir=state_dir)
+
+
+def boundaries_sync(org_id, state_dir: str = SYNC_DIR) -> CollectionSync:
+    return CollectionSync(f"boundaries_{org_id}", f"{API_BASE_URL}/organizations/{org_id}/boundaries",
+                          state_dir=state_dir)
+
+
+def files_sync(state_dir: str = SYNC_DIR) -> CollectionSync:
+    return CollectionSync("files", f"{API_BASE_URL}/files", params={'filter': 'ALL'}, state_dir=state_dir)
+
+
+def _print_summary(summary: Dict[str, Any]) -> None:
+    mode = "completa" if summary['full'] else "delta"
+    print(f"✅ {summary['name']}: sincronização {mode}, {summary['received']} recebidos "
+          f"(+{summary['added']} ~{summary['updated']} -{summary['removed']}), {summary['total']} no total")
+
+
+def sync_organization(org_id, include_files: bool = True, max_workers: int = MAX_WORKERS,
+                      state_dir: str = SYNC_DIR, include_boundaries: bool = False) -> List[Dict[str, Any]]:
+    """
+    Sincroniza campos, fazendas, clientes e os campos de cada cliente de uma
+    organização (e opcionalmente /files e os boundaries). Retorna os resumos de
+    cada coleção.
+    """
+    summaries = []
+    syncs = [org_fields_sync(org_id, state_dir), farms_sync(org_id, state_dir)]
+    if include_files:
+        syncs.append(files_sync(state_dir))
+    if include_boundaries:
+        syncs.append(boundaries_sync(org_id, state_dir))
+
+    clients = clients_sync(org_id, state_dir)
+    summary = clients.sync()
+    _print_summary(summary)
+    summaries.append(summary)
+    syncs.extend(client_fields_sync(org_id, client['id'], state_dir) for client in clients.values())
+
+    def on_error(sync, error):
+        print(f"❌ Erro ao sincronizar {sync.name}: {error}")
+        return None
+
+    for summary in iter_concurrently(lambda sync: sync.sync(), syncs, max_workers=max_workers, on_error=on_error):
+        if summary:
+            _print_summary(summary)
+            summaries.append(summary)
+    return summaries
+
+
+def main():
+    org_id = 5881930  # Substitua pelo seu orgId
+    if not get_valid_tokens():
+        return
+
+    print(f"🔄 Sincronizando organização {org_id}...")
+    try:
+        summaries = sync_organization(org_id)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro na sincronização: {e}")
+        return
+
+    received = sum(s['received'] for s in summaries)
+    print(f"\n📊 {len(summaries)} coleções sincronizadas, {received} registros transferidos")
+    print(f"💾 Estado salvo em '{SYNC_DIR}/'")
+
+
+if __name__ == "__main__":
+    main()
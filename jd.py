@@ -7,6 +7,7 @@ import webbrowser
 import threading
 import time
 import os
+from deere_client import get_client
 from analyze_organizations import analyze_organizations, get_organization_summary, print_summary
 
 # --- Seus dados da Aplicação John Deere ---
@@ -77,7 +78,7 @@ def discover_oauth_endpoints():
     """Faz a requisição ao .well-known URL para obter os endpoints."""
     print("Descobrindo endpoints OAuth da John Deere...")
     try:
-        response = requests.get(WELL_KNOWN_URL)
+        response = get_client().get(WELL_KNOWN_URL)
         response.raise_for_status() # Lança exceção para status de erro (4xx ou 5xx)
         well_known_config = response.json()
         print("Endpoints descobertos com sucesso:")
@@ -142,7 +143,7 @@ def get_tokens(auth_code):
     }
 
     try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data, verify=False) # 'verify=True' para garantir que a conexão é segura
+        response = get_client().post(TOKEN_URL, headers=headers, data=data, verify=False) # 'verify=True' para garantir que a conexão é segura
         response.raise_for_status()
         token_data = response.json()
 
@@ -186,7 +187,7 @@ def refresh_access_token():
     }
 
     try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data, verify=False) # 'verify=True' para garantir que a conexão é segura
+        response = get_client().post(TOKEN_URL, headers=headers, data=data, verify=False) # 'verify=True' para garantir que a conexão é segura
         response.raise_for_status()
         token_data = response.json()
 
@@ -234,16 +235,13 @@ def get_organizations():
         return None, "Token inválido ou não foi possível renovar."
 
     print("\nBuscando organizações e verificando conexões...")
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json' # Exemplo de header para a API, verifique a documentação para o endpoint correto
-    }
+    client = get_client(access_token)
     
     try:
         # Este é um endpoint de exemplo. Confirme o endpoint real no próximo prompt.
         orgs_url = f"{API_BASE_URL}/organizations" 
         print(f"Fazendo requisição para: {orgs_url}")
-        response = requests.get(orgs_url, headers=headers, verify=False) # 'verify=True' para garantir que a conexão é segura   
+        response = client.get(orgs_url, verify=False) # 'verify=True' para garantir que a conexão é segura   
         
         print(f"Status da resposta: {response.status_code}")
         print(f"Headers da resposta: {dict(response.headers)}")
@@ -414,7 +412,7 @@ if __name__ == "__main__":
             print("   • Use os endpoints listados acima para acessar dados específicos")
             print("   • O token de acesso está disponível na variável 'access_token'")
             print("   • Para renovar o token automaticamente, use 'ensure_token_valid()'")
-            print("   • Exemplo: response = requests.get(endpoint_url, headers={'Authorization': f'Bearer {access_token}'})")
+            print("   • Exemplo: response = get_client(access_token).get(endpoint_url)")
             
             # Exemplo de como você usaria o token para uma requisição
             # Seu próximo passo seria definir uma função para usar 'access_token'
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Decodificador colunar dos dados de operação exportados
+Cada operação exportada vem com um <nome>-Deere-Metadata.json cujo DataAttributes
+descreve as colunas dos pontos (Time, DISTANCE, SWATHWIDTH, SECTIONID,
+AppliedRate, ...) com suas unidades. Os pontos (shapefile: .dbf com os atributos
+e .shp com a posição; ou CSV) são lidos de uma vez para um array estruturado do
+NumPy com uma coluna por atributo, sem passar por dicionários linha a linha. O
+índice Machine de cada ponto é resolvido contra o MachineUsage dos metadados.
+"""
+
+import io
+import os
+import csv
+import json
+import sys
+import struct
+import zipfile
+import fnmatch
+from typing import Optional, Dict, Any, List, Union
+
+import numpy as np
+
+METADATA_SUFFIX = '-Deere-Metadata.json'
+POINT_EXTENSIONS = ('.dbf', '.csv')
+
+# Atributos que não são numéricos de ponto flutuante
+INTEGER_ATTRIBUTES = ('SECTIONID', 'Machine')
+TIME_ATTRIBUTES = ('Time', 'IsoTime')
+TEXT_ATTRIBUTES = ('Product',)
+
+# Campos de MachineUsage resolvidos por ponto
+MACHINE_FIELDS = ('MachineId', 'MachineSerial', 'OperatorId', 'OperatorName')
+
+# Registros de ponto do .shp com tamanho fixo: tipo → dtype do registro inteiro
+_SHP_POINT_DTYPES = {
+    1: np.dtype([('number', '>i4'), ('length', '>i4'), ('type', '<i4'), ('x', '<f8'), ('y', '<f8')]),
+    11: np.dtype([('number', '>i4'), ('length', '>i4'), ('type', '<i4'), ('x', '<f8'), ('y', '<f8'),
+                  ('z', '<f8'), ('m', '<f8')]),
+    21: np.dtype([('number', '>i4'), ('length', '>i4'), ('type', '<i4'), ('x', '<f8'), ('y', '<f8'),
+                  ('m', '<f8')]),
+}
+
+
+class OperationData:
+    """
+    Pontos de uma operação exportada e o esquema que os descreve
+
+    Atributos:
+        metadata: Conteúdo do -Deere-Metadata.json
+        points: Array estruturado, uma coluna por atributo de DataAttributes
+                presente nos dados (+ Longitude/Latitude, se houver .shp), ou
+                {coluna: array} com os mesmos nomes (ex: colunas mapeadas em
+                memória por operation_point_cache)
+        units: {atributo: unidade} (ex: {'DISTANCE': 'm', 'AppliedRate': 'kg1ha-1'})
+        descriptions: {atributo: descrição}
+        source: Caminho ou nome do arquivo de pontos
+    """
+
+    def __init__(self, metadata: Dict[str, Any], points: Union[np.ndarray, Dict[str, np.ndarray]],
+                 source: Optional[str] = None):
+        self.metadata = metadata
+        self.points = points
+        self.source = source
+        attributes = metadata.get('DataAttributes', [])
+        self.units = {a['Name']: a['Unit'] for a in attributes if a.get('Name') and a.get('Unit')}
+        self.descriptions = {a['Name']: a.get('Description', '') for a in attributes if a.get('Name')}
+        self._machines: Optional[Dict[str, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        if isinstance(self.points, dict):
+            return len(next(iter(self.points.values()))) if self.points else 0
+        return len(self.points)
+
+    def __repr__(self) -> str:
+        return (f"OperationData({self.field_operation_id!r}, {self.metadata.get('Operation')!r}, "
+                f"{len(self)} pontos, colunas={list(self.columns)})")
+
+    @property
+    def field_operation_id(self) -> Optional[str]:
+        return self.metadata.get('FieldOperationId')
+
+    @property
+    def columns(self):
+        if isinstance(self.points, dict):
+            return tuple(self.points)
+        return self.points.dtype.names or ()
+
+    def column(self, name: str) -> np.ndarray:
+        return self.points[name]
+
+    def unit(self, name: str) -> Optional[str]:
+        return self.units.get(name)
+
+    def machines(self) -> Dict[str, np.ndarray]:
+        """
+        Máquina e operador de cada ponto, resolvidos a partir da coluna Machine
+        e do MachineUsage: {'MachineId': array, 'MachineSerial': ..., ...}.
+        Índices sem entrada no MachineUsage (ex: 0) resultam em ''.
+        """
+        if self._machines is not None:
+            return self._machines
+        usage = self.metadata.get('MachineUsage') or {}
+        if 'Machine' in self.columns:
+            index = self.points['Machine'].astype(np.int64)
+        else:
+            # Sem coluna Machine: com uma única máquina, todos os pontos são dela
+            index = np.full(len(self), 1 if len(usage) == 1 else 0, dtype=np.int64)
+        keys = [int(k) for k in usage if str(k).lstrip('-').isdigit()]
+        size = max([0] + keys) + 1
+        valid = (index >= 0) & (index < size)
+        index = np.where(valid, index, 0)
+
+        self._machines = {}
+        for field in MACHINE_FIELDS:
+            lookup = [''] * size
+            for key in keys:
+                lookup[key] = str(usage[str(key)].get(field) or '')
+            table = np.array(lookup, dtype=str)
+            resolved = table[index]
+            resolved[~valid] = ''
+            self._machines[field] = resolved
+        return self._machines
+
+
+def _load_json(source: Union[str, bytes, Dict[str, Any]]) -> Dict[str, Any]:
+    if isinstance(source, dict):
+        return source
+    if isinstance(source, bytes):
+        return json.loads(source.decode('utf-8-sig'))
+    with open(source, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+
+def _match_column(name: str, available: List[str]) -> Optional[str]:
+    """
+    Coluna dos dados correspondente a um atributo: nome exato, sem diferenciar
+    maiúsculas ou truncado em 10 caracteres (limite de nome do dBase)
+    """
+    if name in available:
+        return name
+    lowered = {column.lower(): column for column in available}
+    for candidate in (name.lower(), name[:10].lower()):
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def _char_matrix(raw: np.ndarray) -> np.ndarray:
+    width = raw.dtype.itemsize
+    return np.frombuffer(np.ascontiguousarray(raw).tobytes(), dtype=np.uint8).reshape(-1, width)
+
+
+def _to_float(raw: np.ndarray) -> np.ndarray:
+    try:
+        # Caminho rápido: o NumPy aceita espaços em volta do número
+        return raw.astype(np.float64)
+    except ValueError:
+        pass
+    # Campos vazios ou estourados (asteriscos no dBase) viram NaN
+    text = np.char.strip(raw)
+    text = np.where((text == b'') | (np.char.startswith(text, b'*')), b'nan', text)
+    return text.astype(np.float64)
+
+
+def _to_int(raw: np.ndarray) -> np.ndarray:
+    values = _to_float(raw)
+    return np.where(np.isnan(values), 0, values).astype(np.int32)
+
+
+def _by_unique(raw: np.ndarray, convert) -> np.ndarray:
+    """
+    Aplica a conversão só aos valores distintos (os pontos de cada seção
+    repetem o instante e o produto) e expande de volta para todas as linhas
+    """
+    values, index = np.unique(raw, return_inverse=True)
+    return convert(values)[index.reshape(-1)]
+
+
+def _to_text(raw: np.ndarray) -> np.ndarray:
+    return _by_unique(raw, lambda values: np.char.decode(np.char.strip(values), 'latin-1'))
+
+
+def _parse_iso_fixed(raw: np.ndarray) -> Optional[np.ndarray]:
+    """
+    'AAAA-MM-DDTHH:MM:SS[.fff][Z]' alinhado à esquerda, convertido por
+    aritmética sobre a matriz de bytes (sem parse de texto linha a linha).
+    Retorna None se algum valor fugir desse formato.
+    """
+    width = raw.dtype.itemsize
+    if width < 19 or not len(raw):
+        return None
+    chars = _char_matrix(raw)
+    blank = (chars[:, 0] == 0) | (chars[:, 0] == 32)
+    rows = chars[~blank]
+    separators = {4: b'-', 7: b'-', 10: b'T', 13: b':', 16: b':'}
+    if not all(np.all(rows[:, pos] == ord(sep)) for pos, sep in separators.items()):
+        return None
+    digit_positions = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+    digits = chars[:, digit_positions].astype(np.int64) - 48
+    if np.any((digits[~blank] < 0) | (digits[~blank] > 9)):
+        return None
+    tail = chars[:, 19] if width > 19 else np.zeros(len(chars), dtype=np.uint8)
+    if not np.all(np.isin(tail[~blank], [0, 32, ord('.'), ord('Z')])):
+        return None
+
+    digits[blank] = [1, 9, 7, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0]
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    seconds = ((digits[:, 8] * 10 + digits[:, 9]) * 3600 + (digits[:, 10] * 10 + digits[:, 11]) * 60
+               + digits[:, 12] * 10 + digits[:, 13])
+    millis = np.zeros(len(chars), dtype=np.int64)
+    if width > 20:
+        fraction = chars[:, 20:min(width, 23)].astype(np.int64) - 48
+        valid = np.cumprod((fraction >= 0) & (fraction <= 9), axis=1).astype(bool) & (tail == ord('.'))[:, None]
+        scale = np.array([100, 10, 1][:fraction.shape[1]])
+        millis = (np.where(valid, fraction, 0) * scale).sum(axis=1)
+
+    months = (year - 1970) * 12 + month - 1
+    dates = months.astype('datetime64[M]').astype('datetime64[D]') + (day - 1)
+    times = dates.astype('datetime64[ms]') + (seconds * 1000 + millis).astype('timedelta64[ms]')
+    times[blank] = np.datetime64('NaT')
+    return times
+
+
+def _to_time(raw: np.ndarray) -> np.ndarray:
+    """
+    Texto ISO-8601 → datetime64[ms] (UTC); se não for data, mantém o texto
+    """
+    parsed = _parse_iso_fixed(raw)
+    if parsed is not None:
+        return parsed
+
+    def convert(values):
+        text = np.char.rstrip(np.char.strip(values), b'Z')
+        text = np.where(text == b'', b'NaT', text)
+        return text.astype('U').astype('datetime64[ms]')
+
+    try:
+        return _by_unique(raw, convert)
+    except ValueError:
+        return _to_text(raw)
+
+
+def _convert(name: str, raw: np.ndarray, field_type: Optional[str] = None) -> np.ndarray:
+    """
+    Converte uma coluna bruta (bytes de largura fixa) para o tipo do atributo
+    """
+    if name in TIME_ATTRIBUTES:
+        if field_type in ('N', 'F'):
+            return _to_float(raw)
+        return _to_time(raw)
+    if name in INTEGER_ATTRIBUTES:
+        return _to_int(raw)
+    if name in TEXT_ATTRIBUTES or field_type in ('C', 'D', 'L'):
+        return _to_text(raw)
+    return _to_float(raw)
+
+
+def _assemble(columns: Dict[str, np.ndarray], length: int) -> np.ndarray:
+    points = np.empty(length, dtype=[(name, values.dtype) for name, values in columns.items()])
+    for name, values in columns.items():
+        points[name] = values
+    return points
+
+
+def read_dbf_columns(data: bytes) -> Dict[str, Any]:
+    """
+    Lê a tabela .dbf (dBase III) de uma vez: os registros têm largura fixa, então
+    viram um array estruturado de campos bytes sem laço por linha.
+    Retorna {'records': array (campos S<n> + '_deleted'), 'types': {campo: tipo}}.
+    """
+    record_count, header_size, record_size = struct.unpack('<IHH', data[4:12])
+    fields = []
+    offset = 32
+    while offset + 32 <= header_size and data[offset] != 0x0D:
+        descriptor = data[offset:offset + 32]
+        name = descriptor[:11].split(b'\x00', 1)[0].decode('latin-1').strip()
+        fields.append((name, chr(descriptor[11]), descriptor[16]))
+        offset += 32
+
+    dtype = [('_deleted', 'S1')] + [(name, f"S{width}") for name, _, width in fields]
+    used = 1 + sum(width for _, _, width in fields)
+    if record_size > used:
+        dtype.append(('_padding', f"S{record_size - used}"))
+    available = (len(data) - header_size) // record_size
+    records = np.frombuffer(data, dtype=np.dtype(dtype), count=min(record_count, available),
+                            offset=header_size)
+    return {'records': records, 'types': {name: field_type for name, field_type, _ in fields}}
+
+
+def read_shp_points(data: bytes) -> Optional[np.ndarray]:
+    """
+    Coordenadas dos registros do .shp como array (x, y). Registros Point/PointZ/
+    PointM de tamanho uniforme são lidos com frombuffer; outros tipos, registros
+    nulos ou tamanhos mistos são percorridos registro a registro.
+    """
+    if len(data) < 100:
+        return None
+    shape_type = struct.unpack('<i', data[32:36])[0]
+    body = memoryview(data)[100:]
+    dtype = _SHP_POINT_DTYPES.get(shape_type)
+    if dtype is not None and len(body) % dtype.itemsize == 0:
+        records = np.frombuffer(body, dtype=dtype)
+        if len(records) and np.all(records['length'] == (dtype.itemsize - 8) // 2) \
+                and np.all(records['type'] == shape_type):
+            return np.column_stack((records['x'], records['y']))
+
+    coordinates = []
+    offset = 100
+    while offset + 8 <= len(data):
+        length = struct.unpack('>i', data[offset + 4:offset + 8])[0] * 2
+        content = data[offset + 8:offset + 8 + length]
+        record_type = struct.unpack('<i', content[:4])[0] if len(content) >= 4 else 0
+        if record_type in _SHP_POINT_DTYPES and len(content) >= 20:
+            coordinates.append(struct.unpack('<2d', content[4:20]))
+        else:
+            coordinates.append((np.nan, np.nan))
+        offset += 8 + length
+    return np.array(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+def decode_dbf(metadata: Dict[str, Any], dbf_data: bytes, shp_data: Optional[bytes] = None,
+               source: Optional[str] = None) -> OperationData:
+    """
+    Decodifica os pontos de um shapefile (.dbf + .shp opcional) pelo esquema
+    de DataAttributes dos metadados
+    """
+    table = read_dbf_columns(dbf_data)
+    records, types = table['records'], table['types']
+    live = records['_deleted'] != b'*'
+    all_live = bool(live.all())
+    available = [name for name in types]
+
+    columns: Dict[str, np.ndarray] = {}
+    for attribute in metadata.get('DataAttributes', []):
+        name = attribute.get('Name')
+        column = _match_column(name, available) if name else None
+        if column is None:
+            continue
+        columns[name] = _convert(name, records[column] if all_live else records[column][live], types[column])
+
+    if shp_data is not None:
+        coordinates = read_shp_points(shp_data)
+        if coordinates is not None and len(coordinates) == len(records):
+            columns['Longitude'] = coordinates[:, 0] if all_live else coordinates[live, 0]
+            columns['Latitude'] = coordinates[:, 1] if all_live else coordinates[live, 1]
+        elif coordinates is not None:
+            print(f"⚠️ {source or 'shapefile'}: {len(coordinates)} geometrias para {len(records)} registros; "
+                  f"coordenadas ignoradas")
+    return OperationData(metadata, _assemble(columns, int(live.sum())), source=source)
+
+
+def decode_csv(metadata: Dict[str, Any], csv_data: bytes, source: Optional[str] = None) -> OperationData:
+    """
+    Decodifica os pontos de um CSV com cabeçalho pelo esquema de DataAttributes
+    """
+    text = csv_data.decode('utf-8-sig')
+    sample = text[:4096]
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+    except csv.Error:
+        delimiter = ','
+    rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    header, body = rows[0], rows[1:]
+    width = len(header)
+    body = [row + [''] * (width - len(row)) if len(row) < width else row[:width] for row in body if row]
+    table = np.array(body, dtype=str).reshape(-1, width) if body else np.empty((0, width), dtype=str)
+
+    columns: Dict[str, np.ndarray] = {}
+    for attribute in metadata.get('DataAttributes', []):
+        name = attribute.get('Name')
+        column = _match_column(name, header) if name else None
+        if column is None:
+            continue
+        raw = np.char.encode(table[:, header.index(column)], 'utf-8')
+        columns[name] = _convert(name, raw)
+    for name in ('Longitude', 'Latitude'):
+        column = _match_column(name, header)
+        if column is not None and name not in columns:
+            columns[name] = _to_float(np.char.encode(table[:, header.index(column)], 'utf-8'))
+    return OperationData(metadata, _assemble(columns, len(table)), source=source)
+
+
+def decode_operation(metadata_path: str, points_path: Optional[str] = None) -> OperationData:
+    """
+    Decodifica uma operação a partir do -Deere-Metadata.json em disco
+
+    Args:
+        metadata_path: Caminho do <nome>-Deere-Metadata.json
+        points_path: Arquivo de pontos (.dbf ou .csv). Se None, procura
+                     <nome>.dbf / <nome>.csv ao lado dos metadados.
+    """
+    metadata = _load_json(metadata_path)
+    base = metadata_path[:-len(METADATA_SUFFIX)] if metadata_path.endswith(METADATA_SUFFIX) \
+        else os.path.splitext(metadata_path)[0]
+    if points_path is None:
+        points_path = next((base + ext for ext in POINT_EXTENSIONS if os.path.exists(base + ext)), None)
+        if points_path is None:
+            raise FileNotFoundError(f"Nenhum arquivo de pontos (.dbf/.csv) para {metadata_path}")
+
+    with open(points_path, 'rb') as f:
+        data = f.read()
+    if points_path.lower().endswith('.csv'):
+        return decode_csv(metadata, data, source=points_path)
+    shp_path = os.path.splitext(points_path)[0] + '.shp'
+    shp_data = None
+    if os.path.exists(shp_path):
+        with open(shp_path, 'rb') as f:
+            shp_data = f.read()
+    return decode_dbf(metadata, data, shp_data, source=points_path)
+
+
+def decode_zip(archive: Union[str, zipfile.ZipFile, Any]) -> List[OperationData]:
+    """
+    Decodifica todas as operações de um ZIP exportado (caminho, ZipFile ou
+    zip_inspect.RemoteZip): para cada -Deere-Metadata.json, lê só os membros
+    de pontos correspondentes
+    """
+    if isinstance(archive, str):
+        with zipfile.ZipFile(archive) as zf:
+            return decode_zip(zf)
+    zf = getattr(archive, 'zip', archive)
+
+    names = zf.namelist()
+    by_lower = {name.lower(): name for name in names}
+    operations = []
+    for metadata_name in [n for n in names if fnmatch.fnmatch(os.path.basename(n), '*' + METADATA_SUFFIX)]:
+        base = metadata_name[:-len(METADATA_SUFFIX)]
+        metadata = _load_json(zf.read(metadata_name))
+        dbf_name = by_lower.get((base + '.dbf').lower())
+        csv_name = by_lower.get((base + '.csv').lower())
+        if dbf_name:
+            shp_name = by_lower.get((base + '.shp').lower())
+            operations.append(decode_dbf(metadata, zf.read(dbf_name),
+                                         zf.read(shp_name) if shp_name else None, source=dbf_name))
+        elif csv_name:
+            operations.append(decode_csv(metadata, zf.read(csv_name), source=csv_name))
+        else:
+            print(f"⚠️ {metadata_name}: nenhum arquivo de pontos (.dbf/.csv) correspondente no ZIP")
+    return operations
+
+
+def main():
+    """
+    Decodifica os -Deere-Metadata.json do diretório atual (ou os passados na
+    linha de comando) e mostra as colunas, unidades e máquinas de cada operação
+    """
+    paths = sys.argv[1:] or [name for name in sorted(os.listdir('.')) if name.endswith(METADATA_SUFFIX)
+                             or name.lower().endswith('.zip')]
+    for path in paths:
+        try:
+            operations = decode_zip(path) if path.lower().endswith('.zip') else [decode_operation(path)]
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"❌ {path}: {e}")
+            continue
+        for operation in operations:
+            print(f"📊 {operation.source}: {len(operation)} pontos "
+                  f"(operação {operation.field_operation_id}, {operation.metadata.get('Operation')})")
+            for name in operation.columns:
+                print(f"   • {name} [{operation.unit(name) or '-'}]: {operation.column(name).dtype}")
+            serials = np.unique(operation.machines()['MachineSerial'])
+            print(f"   • Máquinas: {', '.join(s for s in serials if s) or 'N/A'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Cache colunar dos pontos de operação decodificados, mapeado em memória
+Os pontos de cada operação (decodificados por operation_decoder segundo o
+DataAttributes do -Deere-Metadata.json) são gravados uma vez em
+.operation_points/<FieldOperationId>/<versão>/, um arquivo .npy por coluna, e
+indexados em manifest.json pela chave FieldOperationId + modifiedTime do
+arquivo exportado (+ id do arquivo, pois uma operação pode vir em vários
+arquivos). Quando um arquivo é baixado de novo com outro modifiedTime, as
+colunas da versão anterior são descartadas. Nas análises seguintes as colunas são abertas com
+np.load(mmap_mode='r'): nada é lido até ser usado e processos diferentes
+compartilham as mesmas páginas do cache do sistema operacional. A atualização do
+manifesto (e a remoção das versões antigas) é feita sob um lock de arquivo
+(manifest.json.lock), de modo que vários processos podem gravar no mesmo cache.
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from operation_decoder import OperationData, decode_zip
+
+POINT_CACHE_DIR = '.operation_points'
+
+
+def operation_key(field_operation_id: str, modified_time, file_id=None) -> str:
+    """
+    Chave do manifesto: FieldOperationId + modifiedTime (+ id) do arquivo exportado
+    """
+    return f"{field_operation_id}|{modified_time or ''}|{file_id or ''}"
+
+
+def local_file_info(path: str) -> Dict[str, Any]:
+    """
+    Identificação de um ZIP local sem metadados de /files: nome, mtime e tamanho
+    """
+    stat = os.stat(path)
+    return {'id': os.path.basename(path), 'modifiedTime': str(stat.st_mtime_ns), 'nativeSize': stat.st_size}
+
+
+def _file_key(file_info: Dict[str, Any]) -> str:
+    return f"{file_info.get('id')}|{file_info.get('modifiedTime', '')}|{file_info.get('nativeSize', '')}"
+
+
+def _column_file(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', name) + '.npy'
+
+
+def _fill_value(dtype: np.dtype):
+    if np.issubdtype(dtype, np.datetime64):
+        return np.datetime64('NaT')
+    if np.issubdtype(dtype, np.floating):
+        return np.nan
+    if dtype.kind in ('U', 'S'):
+        return ''
+    return 0
+
+
+class OperationPointCache:
+    """
+    Colunas .npy por operação e manifesto com chave, colunas, unidades e metadados
+
+    Args:
+        cache_dir: Diretório do cache (manifesto em manifest.json)
+    """
+
+    def __init__(self, cache_dir: str = POINT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.manifest_file = os.path.join(cache_dir, 'manifest.json')
+        self.lock_file = f"{self.manifest_file}.lock"
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Exclusão mútua entre threads (threading.Lock) e entre processos (lock de arquivo)
+        """
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.lock_file, 'a+b') as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                else:
+                    f.seek(0)
+                    while True:
+                        try:
+                            # LK_LOCK desiste após ~10 s; tenta de novo até conseguir
+                            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    else:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️ Manifesto {self.manifest_file} ilegível; o cache de pontos começa vazio")
+        return {'operations': {}, 'files': {}}
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _open(self, entry: Dict[str, Any]) -> Optional[OperationData]:
+        directory = os.path.join(self.cache_dir, entry['path'])
+        columns = {}
+        try:
+            for name, column in entry['columns'].items():
+                columns[name] = np.load(os.path.join(directory, column['file']), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if any(len(values) != entry['points'] for values in columns.values()):
+            return None
+        return OperationData(entry['metadata'], columns, source=', '.join(entry.get('sources', [])))
+
+    def lookup_file(self, file_info: Dict[str, Any]) -> Optional[List[OperationData]]:
+        """
+        Operações de um arquivo exportado já em cache, ou None se alguma faltar
+        """
+        manifest = self._load_manifest()
+        cached_file = manifest['files'].get(_file_key(file_info))
+        if cached_file is None:
+            return None
+        operations = []
+        for key in cached_file['operations']:
+            entry = manifest['operations'].get(key)
+            operation = self._open(entry) if entry else None
+            if operation is None:
+                return None
+            operations.append(operation)
+        return operations
+
+    def _write_columns(self, directory: str, exports: List[OperationData]) -> Dict[str, Dict[str, Any]]:
+        """
+        Grava cada coluna em um .npy, juntando as exportações da mesma operação;
+        exportações sem a coluna recebem o valor nulo do tipo
+        """
+        names: List[str] = []
+        for export in exports:
+            names.extend(name for name in export.columns if name not in names)
+        total = sum(len(export) for export in exports)
+        columns = {}
+        for name in names:
+            dtype = np.result_type(*[export.column(name).dtype for export in exports if name in export.columns])
+            file_name = _column_file(name)
+            target = np.lib.format.open_memmap(os.path.join(directory, file_name), mode='w+',
+                                               dtype=dtype, shape=(total,))
+            offset = 0
+            for export in exports:
+                size = len(export)
+                if name in export.columns:
+                    target[offset:offset + size] = export.column(name)
+                else:
+                    target[offset:offset + size] = _fill_value(dtype)
+                offset += size
+            target.flush()
+            del target
+            columns[name] = {'file': file_name, 'dtype': dtype.str, 'unit': exports[0].unit(name)}
+        return columns
+
+    def store(self, operations: List[OperationData], file_info: Dict[str, Any]) -> List[OperationData]:
+        """
+        Grava as operações decodificadas de um arquivo exportado e devolve-as
+        abertas do cache. Versões anteriores da mesma operação (outro
+        modifiedTime) são removidas.
+
+        Args:
+            operations: Resultado de decode_zip para o arquivo
+            file_info: Metadados do arquivo (/files ou local_file_info): id, modifiedTime, nativeSize
+        """
+        modified_time = file_info.get('modifiedTime')
+        file_id = file_info.get('id')
+        groups: Dict[str, List[OperationData]] = {}
+        for operation in operations:
+            groups.setdefault(operation.field_operation_id or operation.source or '', []).append(operation)
+
+        written = {}
+        for field_operation_id, exports in groups.items():
+            key = operation_key(field_operation_id, modified_time, file_id)
+            version = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+            relative = os.path.join(_column_file(field_operation_id)[:-4], version)
+            directory = os.path.join(self.cache_dir, relative)
+            tmp_directory = f"{directory}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            os.makedirs(tmp_directory)
+            columns = self._write_columns(tmp_directory, exports)
+            with self._locked():
+                # Outro processo pode estar trocando a mesma versão
+                shutil.rmtree(directory, ignore_errors=True)
+                os.replace(tmp_directory, directory)
+            written[key] = {
+                'field_operation_id': field_operation_id,
+                'modified_time': modified_time,
+                'path': relative,
+                'points': sum(len(export) for export in exports),
+                'columns': columns,
+                'metadata': exports[0].metadata,
+                'sources': [export.source for export in exports if export.source],
+            }
+
+        with self._locked():
+            # Relê o manifesto sob o lock: outro processo pode ter gravado entradas
+            manifest = self._load_manifest()
+            manifest['operations'].update(written)
+            # Versões anteriores do mesmo arquivo deixam de valer
+            manifest['files'] = {file_key: cached_file for file_key, cached_file in manifest['files'].items()
+                                 if cached_file['file_id'] != file_id}
+            manifest['files'][_file_key(file_info)] = {'file_id': file_id, 'operations': list(written)}
+            referenced = {key for cached_file in manifest['files'].values() for key in cached_file['operations']}
+            for key in [key for key in manifest['operations'] if key not in referenced]:
+                shutil.rmtree(os.path.join(self.cache_dir, manifest['operations'].pop(key)['path']),
+                              ignore_errors=True)
+            self._save_manifest(manifest)
+        return [self._open(entry) for entry in written.values()]
+
+    def operations_for_zip(self, zip_path: str, file_info: Optional[Dict[str, Any]] = None) -> List[OperationData]:
+        """
+        Operações de um ZIP exportado: do cache, se o arquivo (id + modifiedTime
+        + tamanho) já foi decodificado; senão decodifica e grava no cache
+
+        Args:
+            zip_path: Caminho do ZIP
+            file_info: Metadados do arquivo em /files (padrão: nome, mtime e tamanho locais)
+        """
+        file_info = file_info or local_file_info(zip_path)
+        cached = self.lookup_file(file_info)
+        if cached is not None:
+            return cached
+        operations = decode_zip(zip_path)
+        if not operations:
+            return []
+        print(f"💾 Gravando {sum(len(op) for op in operations):,} pontos de {os.path.basename(zip_path)} "
+              f"no cache de pontos")
+        return self.store(operations, file_info)
+
+    def clear(self) -> None:
+        with self._locked():
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if path == self.lock_file:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Operações, arquivos e pontos no cache
+        """
+        manifest = self._load_manifest()
+        return {
+            'operations': len(manifest['operations']),
+            'files': len(manifest['files']),
+            'points': sum(entry['points'] for entry in manifest['operations'].values()),
+        }
+
+
+_cache: Optional[OperationPointCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_point_cache() -> OperationPointCache:
+    """
+    Retorna o cache de pontos compartilhado do processo
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OperationPointCache()
+    return _cache
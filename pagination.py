@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Paginação das coleções da API John Deere
+Percorre qualquer coleção (/files, /fileTransfers, /fields, /farms, ...) seguindo
+o link nextPage e entrega os registros um a um, sem manter as páginas em memória.
+No modo paralelo, usa o `total` da primeira página para buscar as demais páginas
+(pageOffset conhecidos) de forma concorrente, mantendo a ordem dos registros.
+"""
+
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterator
+
+from deere_client import get_client
+
+ITEM_LIMIT = 100  # Máximo permitido pela API
+PREFETCH_WORKERS = 8  # Páginas buscadas simultaneamente no modo paralelo
+
+
+def get_link(data: Dict[str, Any], rel: str) -> Optional[str]:
+    """
+    Retorna a URI do link com o rel informado, ou None
+    """
+    for link in data.get('links', []):
+        if link.get('rel') == rel:
+            return link.get('uri')
+    return None
+
+
+def fetch_page(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Busca uma página da coleção. Lança requests.exceptions.HTTPError se a
+    resposta não for 2xx.
+    """
+    response = get_client().get(url, headers=headers, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def iter_pages(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    item_limit: int = ITEM_LIMIT,
+    headers: Optional[Dict[str, str]] = None,
+    parallel: bool = False,
+    max_workers: int = PREFETCH_WORKERS
+) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre as páginas de uma coleção seguindo o link nextPage
+
+    Args:
+        url: URL da coleção
+        params: Parâmetros de query da primeira página (o nextPage já os inclui)
+        item_limit: Quantidade de registros por página
+        headers: Headers extras (ex: x-deere-signature)
+        parallel: Se True, busca as páginas restantes concorrentemente (ver iter_pages_parallel)
+        max_workers: Máximo de páginas em voo no modo paralelo
+    """
+    if parallel:
+        yield from iter_pages_parallel(url, params=params, item_limit=item_limit,
+                                       headers=headers, max_workers=max_workers)
+        return
+
+    first_params = dict(params or {})
+    if item_limit:
+        first_params['itemLimit'] = item_limit
+
+    page = fetch_page(url, params=first_params, headers=headers)
+    while True:
+        yield page
+        next_url = get_link(page, 'nextPage')
+        if not next_url:
+            return
+        page = fetch_page(next_url, headers=headers)
+
+
+def iter_pages_parallel(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    item_limit: int = ITEM_LIMIT,
+    headers: Optional[Dict[str, str]] = None,
+    max_workers: int = PREFETCH_WORKERS
+) -> Iterator[Dict[str, Any]]:
+    """
+    Busca a primeira página e, a partir do `total`, as demais páginas em paralelo
+
+    Os pageOffset restantes são conhecidos de antemão, então até max_workers
+    páginas ficam em voo ao mesmo tempo. As páginas são entregues na ordem de
+    offset; no máximo max_workers páginas ficam retidas em memória.
+    """
+    base_params = dict(params or {})
+    first_params = dict(base_params)
+    if item_limit:
+        first_params['itemLimit'] = item_limit
+
+    first_page = fetch_page(url, params=first_params, headers=headers)
+    yield first_page
+
+    total = first_page.get('total')
+    page_size = len(first_page.get('values', []))
+    if total is None or page_size == 0 or not get_link(first_page, 'nextPage'):
+        # Sem total ou sem próxima página: segue pelo caminho sequencial
+        next_url = get_link(first_page, 'nextPage')
+        while next_url:
+            page = fetch_page(next_url, headers=headers)
+            yield page
+            next_url = get_link(page, 'nextPage')
+        return
+
+    # O servidor pode limitar itemLimit abaixo do solicitado; usa o tamanho real
+    offsets = iter(range(page_size, int(total), page_size))
+
+    def submit(executor, offset):
+        page_params = dict(base_params)
+        page_params['pageOffset'] = offset
+        page_params['itemLimit'] = page_size
+        return executor.submit(fetch_page, url, page_params, headers)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for offset in offsets:
+            pending.append(submit(executor, offset))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            page = pending.popleft().result()
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(submit(executor, offset))
+            yield page
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def iter_collection(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    item_limit: int = ITEM_LIMIT,
+    headers: Optional[Dict[str, str]] = None,
+    parallel: bool = False,
+    max_workers: int = PREFETCH_WORKERS
+) -> Iterator[Dict[str, Any]]:
+    """
+    Entrega os registros ('values') de todas as páginas de uma coleção, sob demanda
+
+    Args:
+        url: URL da coleção
+        params: Parâmetros de query (filtros, embed, ...)
+        item_limit: Quantidade de registros por página
+        headers: Headers extras (ex: x-deere-signature)
+        parallel: Se True, busca as páginas concorrentemente a partir do `total`
+        max_workers: Máximo de páginas em voo no modo paralelo
+    """
+    pages = iter_pages(url, params=params, item_limit=item_limit, headers=headers,
+                       parallel=parallel, max_workers=max_workers)
+    for page in pages:
+        yield from page.get('values', [])
+
+
+def write_collection_json(records: Iterator[Dict[str, Any]], output_file: str) -> int:
+    """
+    Grava os registros em output_file no formato {"values": [...], "total": N}
+    à medida que chegam, sem acumular a coleção em memória. Retorna N.
+    """
+    total = 0
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('{"values": [\n')
+        for record in records:
+            if total:
+                f.write(',\n')
+            json.dump(record, f, ensure_ascii=False)
+            total += 1
+        f.write(f'\n], "total": {total}}}\n')
+    return total
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Pipeline de download por URLs pré-assinadas
+Enquanto os downloads atuais rodam, as URLs pré-assinadas dos próximos arquivos
+da fila já são buscadas (/files/{fileId}/presignedDownload). Cada URL fica em
+cache até pouco antes de expirar e é buscada de novo, de forma transparente,
+se o storage responder 403. Os downloads no storage rodam concorrentemente,
+pois não consomem a cota da API Deere.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+from deere_client import get_client
+from download_cache import replace_file
+from fanout import iter_concurrently
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+DOWNLOAD_DIR = "downloads"
+API_WORKERS = 4  # Buscas de URL pré-assinada simultâneas (consomem cota da API)
+STORAGE_WORKERS = 8  # Downloads simultâneos no storage
+PREFETCH_AHEAD = 16  # Quantos arquivos à frente ter a URL já buscada
+DEFAULT_URL_TTL = 300  # Validade assumida quando nem a resposta nem a URL informam
+EXPIRY_MARGIN = 30  # Segundos antes da expiração em que a URL deixa de ser usada
+DOWNLOAD_ATTEMPTS = 2  # Tentativas por arquivo (a segunda com URL nova)
+READ_SIZE = 64 * 1024
+
+
+def _parse_time(value) -> Optional[float]:
+    """
+    Converte ISO-8601, data HTTP ou epoch em timestamp
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) / 1000 if value > 1e12 else float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def url_expires_at(presigned_data: Dict[str, Any], url: str) -> float:
+    """
+    Momento de expiração da URL: campo de expiração da resposta, parâmetros de
+    assinatura na URL (X-Amz-Date + X-Amz-Expires, Expires) ou DEFAULT_URL_TTL
+    """
+    for key in ('expiration', 'expirationDate', 'expiresAt', 'expires'):
+        expires_at = _parse_time(presigned_data.get(key))
+        if expires_at:
+            return expires_at
+
+    query = {k.lower(): v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    if 'x-amz-date' in query and 'x-amz-expires' in query:
+        try:
+            signed_at = datetime.strptime(query['x-amz-date'], '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+            return signed_at.timestamp() + int(query['x-amz-expires'])
+        except ValueError:
+            pass
+    if 'expires' in query and query['expires'].isdigit():
+        return float(query['expires'])
+    return time.time() + DEFAULT_URL_TTL
+
+
+class PresignedUrlCache:
+    """
+    Cache de URLs pré-assinadas com busca antecipada
+
+    Args:
+        max_workers: Buscas simultâneas de URL
+        expiry_margin: Segundos antes da expiração em que a URL é considerada vencida
+    """
+
+    def __init__(self, max_workers: int = API_WORKERS, expiry_margin: float = EXPIRY_MARGIN):
+        self.expiry_margin = expiry_margin
+        self._urls: Dict[str, Tuple[str, float]] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _fetch(self, file_id: str) -> str:
+        try:
+            response = get_client().get(f"{API_BASE_URL}/files/{file_id}/presignedDownload", use_cache=False)
+            response.raise_for_status()
+            presigned_data = response.json()
+            url = presigned_data.get('uri') or presigned_data.get('url')
+            if not url:
+                raise ValueError(f"URL de download não encontrada na resposta de {file_id}")
+            with self._lock:
+                self._urls[file_id] = (url, url_expires_at(presigned_data, url))
+            return url
+        finally:
+            with self._lock:
+                self._pending.pop(file_id, None)
+
+    def _valid_url(self, file_id: str) -> Optional[str]:
+        entry = self._urls.get(file_id)
+        if entry and entry[1] - self.expiry_margin > time.time():
+            return entry[0]
+        return None
+
+    def prefetch(self, file_id: str) -> None:
+        """
+        Agenda a busca da URL em background, se ainda não houver uma válida
+        """
+        with self._lock:
+            if self._valid_url(file_id) or file_id in self._pending:
+                return
+            self._pending[file_id] = self._executor.submit(self._fetch, file_id)
+
+    def get(self, file_id: str) -> str:
+        """
+        URL válida do arquivo (do cache, da busca antecipada ou buscada agora)
+        """
+        with self._lock:
+            url = self._valid_url(file_id)
+            if url:
+                return url
+            future = self._pending.get(file_id)
+            if future is None:
+                future = self._executor.submit(self._fetch, file_id)
+                self._pending[file_id] = future
+        return future.result()
+
+    def invalidate(self, file_id: str) -> None:
+        with self._lock:
+            self._urls.pop(file_id, None)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def _safe_filename(file_name: str) -> str:
+    return "".join(c for c in file_name if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
+
+
+def download_presigned_file(
+    cache: PresignedUrlCache,
+    file_id: str,
+    file_path: str
+) -> Dict[str, Any]:
+    """
+    Baixa um arquivo pela URL pré-assinada; em 403 (URL expirada) busca uma URL nova
+    """
+    client = get_client()
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        try:
+            url = cache.get(file_id)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return {'success': False, 'error': f"URL pré-assinada: {e}"}
+
+        try:
+            response = client.get(url, stream=True)
+        except requests.exceptions.RequestException as e:
+            return {'success': False, 'error': str(e)}
+
+        if response.status_code == 403 and attempt < DOWNLOAD_ATTEMPTS:
+            response.close()
+            print(f"🔁 URL pré-assinada de {file_id} recusada (403); buscando uma nova")
+            cache.invalidate(file_id)
+            continue
+        if response.status_code != 200:
+            response.close()
+            return {'success': False, 'error': response.status_code}
+
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        tmp_path = f"{file_path}.part"
+        try:
+            with open(tmp_path, 'wb') as f:
+                for block in response.iter_content(chunk_size=READ_SIZE):
+                    if block:
+                        f.write(block)
+        except requests.exceptions.RequestException as e:
+            return {'success': False, 'error': str(e)}
+        replace_file(tmp_path, file_path)
+        return {
+            'success': True,
+            'file_path': file_path,
+            'file_size': os.path.getsize(file_path),
+            'content_type': response.headers.get('Content-Type')
+        }
+    return {'success': False, 'error': 403}
+
+
+def download_presigned_files(
+    files: List[Tuple[str, str]],
+    download_dir: str = DOWNLOAD_DIR,
+    storage_workers: int = STORAGE_WORKERS,
+    api_workers: int = API_WORKERS,
+    prefetch_ahead: int = PREFETCH_AHEAD
+) -> List[Dict[str, Any]]:
+    """
+    Baixa vários arquivos por URL pré-assinada, com as URLs dos próximos da fila
+    buscadas enquanto os downloads atuais rodam
+
+    Args:
+        files: Lista de (file_id, file_name)
+        download_dir: Diretório de destino
+        storage_workers: Downloads simultâneos no storage
+        api_workers: Buscas simultâneas de URL pré-assinada
+        prefetch_ahead: Quantos arquivos à frente buscar a URL
+
+    Returns:
+        Um resultado por arquivo, na ordem de entrada
+    """
+    cache = PresignedUrlCache(max_workers=api_workers)
+    file_ids = [file_id for file_id, _ in files]
+    for file_id in file_ids[:prefetch_ahead]:
+        cache.prefetch(file_id)
+
+    def download(indexed_file):
+        index, (file_id, file_name) = indexed_file
+        if index + prefetch_ahead < len(file_ids):
+            cache.prefetch(file_ids[index + prefetch_ahead])
+        file_path = os.path.join(download_dir, f"{file_id}_presigned_{_safe_filename(file_name)}")
+        return download_presigned_file(cache, file_id, file_path)
+
+    def on_error(indexed_file, error):
+        return {'success': False, 'error': str(error)}
+
+    try:
+        return list(iter_concurrently(download, enumerate(files), max_workers=storage_workers, on_error=on_error))
+    finally:
+        cache.close()
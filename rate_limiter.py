@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Limitador de taxa adaptativo (token bucket) para a API John Deere
+Começa em uma taxa configurada, reduz a taxa pela metade ao receber 429/503
+(respeitando Retry-After, no máximo uma redução por janela) e volta a
+acelerar aos poucos enquanto as respostas estão saudáveis. Substitui os
+time.sleep fixos entre requisições.
+"""
+
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Status que indicam que a API está pedindo para desacelerar
+THROTTLE_STATUS = {429, 503}
+
+# Janela mínima entre reduções (segundos): os vários 429 de uma mesma rajada,
+# vindos das requisições já em andamento, contam como uma redução só
+DECREASE_WINDOW = 1.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Converte o header Retry-After (segundos ou data HTTP) em segundos de espera
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket com ajuste AIMD (aumento aditivo, redução multiplicativa)
+
+    Args:
+        rate: Requisições por segundo iniciais
+        burst: Tamanho máximo do balde (rajada permitida); padrão = rate
+        min_rate: Taxa mínima após reduções
+        max_rate: Taxa máxima após aumentos
+        decrease_factor: Fator aplicado à taxa ao receber 429/503
+        increase_step: Aumento da taxa (req/s) por segundo de respostas saudáveis
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: Optional[float] = None,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        decrease_factor: float = 0.5,
+        increase_step: float = 1.0
+    ):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(self.rate, 1.0)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = float('-inf')
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def _try_acquire(self) -> float:
+        """
+        Tenta consumir um token. Retorna 0 se conseguiu, ou quantos segundos
+        esperar antes de tentar de novo.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._refill(now)
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """
+        Bloqueia até que a requisição possa ser enviada
+        """
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """
+        Versão asyncio de acquire: aguarda sem bloquear o event loop
+        """
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def on_response(self, status_code: int, retry_after: Optional[str] = None) -> None:
+        """
+        Ajusta a taxa de acordo com a resposta recebida
+        """
+        with self._lock:
+            if status_code in THROTTLE_STATUS:
+                now = time.monotonic()
+                window = max(DECREASE_WINDOW, 1.0 / self.rate)
+                if now - self._last_decrease >= window and now >= self._blocked_until:
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    self._last_decrease = now
+                self._tokens = min(self._tokens, 0.0)
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            elif status_code < 500:
+                # Cerca de +increase_step req/s a cada segundo de respostas saudáveis
+                self.rate = min(self.max_rate, self.rate + self.increase_step / self.rate)
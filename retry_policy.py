@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Política de retentativa para requisições idempotentes
+Backoff exponencial com jitter, limite de tentativas por requisição e prazo
+total. Classifica os erros em retentáveis (conexão resetada, timeout, 5xx, 429)
+e fatais (401/403/404 e demais 4xx).
+"""
+
+import random
+import time
+from typing import Optional
+
+import requests
+
+from rate_limiter import parse_retry_after
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+FATAL_STATUS = {400, 401, 403, 404, 405, 410, 422}
+
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+RETRYABLE = 'retryable'
+FATAL = 'fatal'
+SUCCESS = 'success'
+
+
+def classify_status(status_code: int) -> str:
+    """
+    Classifica um status HTTP em SUCCESS, RETRYABLE ou FATAL
+    """
+    if status_code in RETRYABLE_STATUS or status_code >= 500:
+        return RETRYABLE
+    if status_code >= 400:
+        return FATAL
+    return SUCCESS
+
+
+def classify_exception(error: Exception) -> str:
+    """
+    Classifica uma exceção da requisição em RETRYABLE ou FATAL
+    """
+    if isinstance(error, RETRYABLE_EXCEPTIONS):
+        return RETRYABLE
+    return FATAL
+
+
+class RetryPolicy:
+    """
+    Configuração de retentativas
+
+    Args:
+        max_attempts: Número máximo de tentativas por requisição (inclui a primeira)
+        base_delay: Espera base em segundos (dobra a cada tentativa)
+        max_delay: Espera máxima entre tentativas
+        deadline: Tempo total máximo (segundos) gasto com uma requisição e suas retentativas
+        methods: Métodos HTTP que podem ser repetidos
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        deadline: Optional[float] = 120.0,
+        methods=IDEMPOTENT_METHODS
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.methods = set(methods)
+
+    def applies_to(self, method: str) -> bool:
+        return method.upper() in self.methods
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Espera antes da tentativa seguinte a `attempt` (1 = primeira), com
+        "full jitter": aleatória entre 0 e base_delay * 2^(attempt-1)
+        """
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def next_delay(
+        self,
+        attempt: int,
+        started_at: float,
+        response: Optional[requests.Response] = None
+    ) -> Optional[float]:
+        """
+        Retorna quantos segundos esperar antes da próxima tentativa, ou None se
+        o limite de tentativas ou o prazo total já não permitem tentar de novo
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+        if self.deadline is not None and time.monotonic() - started_at + delay > self.deadline:
+            return None
+        return delay
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
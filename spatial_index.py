@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Índice espacial dos limites (boundaries) dos campos
+Responde, para milhões de pontos de uma vez, em qual campo cada ponto está.
+Os limites vêm da cópia local da coleção /organizations/{orgId}/boundaries
+(incremental_sync). O índice é uma grade regular sobre a extensão da
+organização. Cada célula guarda os campos cujo retângulo envolvente a toca,
+marcados como "célula inteira dentro do campo" ou "célula cortada pelo limite".
+Pontos em células inteiras são resolvidos só pela grade. Apenas os pontos em
+células de limite passam pelo teste de ponto no polígono (par-ímpar). O teste
+usa só as arestas do campo na mesma faixa horizontal do ponto (faixas mais
+finas que as células), pois o raio horizontal não cruza outras, e é vetorizado
+sobre todos os pares (ponto, aresta) de uma vez.
+"""
+
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from as_applied_stats import load_exports
+from collection_planner import record_field_id
+from incremental_sync import SYNC_DIR, boundaries_sync
+from token_provider import get_valid_tokens
+
+MAX_GRID_CELLS = 4 * 1024 * 1024
+CELLS_PER_FIELD = 64  # Células por campo na escolha do tamanho da célula
+PAIR_BLOCK = 4 * 1024 * 1024  # Máximo de elementos ponto × aresta por bloco
+BANDS_PER_CELL = 8  # Faixas horizontais de arestas por linha da grade
+
+OUTSIDE = 0
+INSIDE = 1
+BOUNDARY = 2
+
+
+def _ring_coordinates(points: List[Any]) -> Optional[np.ndarray]:
+    """
+    Pontos de um anel ({'lat', 'lon'} da API ou [lon, lat]) como array (n, 2) lon/lat
+    """
+    coordinates = []
+    for point in points:
+        if isinstance(point, dict):
+            lon, lat = point.get('lon', point.get('longitude')), point.get('lat', point.get('latitude'))
+        else:
+            lon, lat = point[0], point[1]
+        if lon is not None and lat is not None:
+            coordinates.append((float(lon), float(lat)))
+    if len(coordinates) < 3:
+        return None
+    return np.array(coordinates, dtype=np.float64)
+
+
+def boundary_polygons(boundary: Dict[str, Any]) -> List[List[np.ndarray]]:
+    """
+    Polígonos de um boundary: [[anel exterior, buracos...], ...], cada anel um
+    array (n, 2) lon/lat. Aceita multipolygons/rings/points da API ou uma
+    lista simples em 'coordinates'.
+    """
+    polygons = []
+    for multipolygon in boundary.get('multipolygons') or []:
+        rings = multipolygon.get('rings') or []
+        exterior = [r for r in rings if str(r.get('type', 'exterior')).lower() == 'exterior']
+        interior = [r for r in rings if str(r.get('type', 'exterior')).lower() != 'exterior']
+        for index, ring in enumerate(exterior):
+            shell = _ring_coordinates(ring.get('points') or [])
+            if shell is None:
+                continue
+            # Buracos ficam com o primeiro exterior do multipolygon (a API os agrupa assim)
+            holes = [_ring_coordinates(r.get('points') or []) for r in interior] if index == 0 else []
+            polygons.append([shell] + [hole for hole in holes if hole is not None])
+    if not polygons and boundary.get('coordinates'):
+        shell = _ring_coordinates(boundary['coordinates'])
+        if shell is not None:
+            polygons.append([shell])
+    return polygons
+
+
+def select_active_boundaries(boundaries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Boundaries que valem para o campo: os marcados como ativos ou, se nenhum
+    estiver marcado, todos os não arquivados
+    """
+    current = [b for b in boundaries if not b.get('archived')]
+    active = [b for b in current if b.get('active')]
+    return active or current
+
+
+def _edges(rings: List[np.ndarray]) -> np.ndarray:
+    """
+    Arestas (x1, y1, x2, y2) de todos os anéis, fechando cada anel
+    """
+    parts = []
+    for ring in rings:
+        closed = ring if np.array_equal(ring[0], ring[-1]) else np.vstack([ring, ring[:1]])
+        parts.append(np.hstack([closed[:-1], closed[1:]]))
+    return np.vstack(parts) if parts else np.empty((0, 4))
+
+
+def points_in_rings(x: np.ndarray, y: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Teste par-ímpar de vários pontos contra as arestas de um campo (todos os
+    anéis, buracos inclusive), em blocos de até PAIR_BLOCK elementos
+    """
+    inside = np.zeros(len(x), dtype=bool)
+    if not len(edges) or not len(x):
+        return inside
+    x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+    dy = np.where(y2 == y1, 1.0, y2 - y1)
+    step = max(1, PAIR_BLOCK // len(edges))
+    for start in range(0, len(x), step):
+        px = x[start:start + step, None]
+        py = y[start:start + step, None]
+        spans = (y1 > py) != (y2 > py)
+        crossing = spans & (px < x1 + (py - y1) * (x2 - x1) / dy)
+        inside[start:start + step] = (np.count_nonzero(crossing, axis=1) % 2) == 1
+    return inside
+
+
+def expand_ranges(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (índice do intervalo, valor) para todos os valores de intervalos [start, start + count)
+    """
+    owner = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(starts, counts) + offsets
+
+
+class FieldIndex:
+    """
+    Grade de células → campos sobre os limites de uma organização
+
+    Args:
+        polygons_by_field: {field_id: [[anel exterior, buracos...], ...]} (lon/lat)
+        cell_size: Lado da célula em graus (padrão: escolhido pelo tamanho médio dos campos)
+    """
+
+    def __init__(self, polygons_by_field: Dict[str, List[List[np.ndarray]]], cell_size: Optional[float] = None):
+        self.field_ids = [field_id for field_id, polygons in polygons_by_field.items() if polygons]
+        edges = [_edges([ring for polygon in polygons_by_field[f] for ring in polygon]) for f in self.field_ids]
+        counts = np.array([len(e) for e in edges], dtype=np.int64)
+        self.edge_start = np.concatenate([[0], np.cumsum(counts)])
+        self.edges = np.vstack(edges) if edges else np.empty((0, 4))
+        self.bounds = np.array([[e[:, [0, 2]].min(), e[:, [1, 3]].min(), e[:, [0, 2]].max(), e[:, [1, 3]].max()]
+                                for e in edges]).reshape(-1, 4)
+        self._build_grid(cell_size)
+
+    @classmethod
+    def from_boundaries(cls, boundaries_by_field: Dict[str, List[Dict[str, Any]]], **kwargs) -> 'FieldIndex':
+        """
+        Índice a partir de {field_id: [boundaries da API]} (usa os boundaries ativos)
+        """
+        polygons = {}
+        for field_id, boundaries in boundaries_by_field.items():
+            polygons[field_id] = [polygon for boundary in select_active_boundaries(boundaries)
+                                  for polygon in boundary_polygons(boundary)]
+        return cls(polygons, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.field_ids)
+
+    def field_edges(self, index: int) -> np.ndarray:
+        return self.edges[self.edge_start[index]:self.edge_start[index + 1]]
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ix = np.floor((x - self.origin[0]) / self.cell_size).astype(np.int64)
+        iy = np.floor((y - self.origin[1]) / self.cell_size).astype(np.int64)
+        return np.clip(ix, 0, self.shape[0] - 1), np.clip(iy, 0, self.shape[1] - 1)
+
+    def _bands(self, y: np.ndarray) -> np.ndarray:
+        band = np.floor((y - self.origin[1]) / self.cell_size * BANDS_PER_CELL).astype(np.int64)
+        return np.clip(band, 0, self.bands - 1)
+
+    def _build_grid(self, cell_size: Optional[float]) -> None:
+        if not len(self.field_ids):
+            self.origin, self.cell_size, self.shape = np.zeros(2), 1.0, (1, 1)
+            self.cell_start = np.zeros(2, dtype=np.int64)
+            self.cell_field = np.empty(0, dtype=np.int32)
+            self.cell_state = np.empty(0, dtype=np.uint8)
+            self.bands = 1
+            self.band_keys = np.empty(0, dtype=np.int64)
+            self.band_start = np.zeros(1, dtype=np.int64)
+            self.band_edges = np.empty(0, dtype=np.int64)
+            return
+        minx, miny = self.bounds[:, 0].min(), self.bounds[:, 1].min()
+        maxx, maxy = self.bounds[:, 2].max(), self.bounds[:, 3].max()
+        if cell_size is None:
+            sizes = np.maximum(self.bounds[:, 2] - self.bounds[:, 0], self.bounds[:, 3] - self.bounds[:, 1])
+            cell_size = float(np.median(sizes)) / np.sqrt(CELLS_PER_FIELD) or 1e-4
+        width, height = max(maxx - minx, cell_size), max(maxy - miny, cell_size)
+        cell_size = max(cell_size, np.sqrt(width * height / MAX_GRID_CELLS))
+        self.origin = np.array([minx, miny])
+        self.cell_size = cell_size
+        self.shape = (int(np.ceil(width / cell_size)) + 1, int(np.ceil(height / cell_size)) + 1)
+        nx = self.shape[0]
+
+        # Pares (célula, campo) para todas as células tocadas pelo retângulo do campo
+        ix0, iy0 = self._cells(self.bounds[:, 0], self.bounds[:, 1])
+        ix1, iy1 = self._cells(self.bounds[:, 2], self.bounds[:, 3])
+        spans_x, spans_y = ix1 - ix0 + 1, iy1 - iy0 + 1
+        field, offset = expand_ranges(np.zeros(len(self.field_ids), dtype=np.int64), spans_x * spans_y)
+        cell = (iy0[field] + offset // spans_x[field]) * nx + ix0[field] + offset % spans_x[field]
+
+        # Células cortadas por alguma aresta do campo (pelo retângulo da aresta)
+        edge_field = np.repeat(np.arange(len(self.field_ids)), np.diff(self.edge_start))
+        ex0, ey0 = self._cells(np.minimum(self.edges[:, 0], self.edges[:, 2]),
+                               np.minimum(self.edges[:, 1], self.edges[:, 3]))
+        ex1, ey1 = self._cells(np.maximum(self.edges[:, 0], self.edges[:, 2]),
+                               np.maximum(self.edges[:, 1], self.edges[:, 3]))
+        edge_spans_x = ex1 - ex0 + 1
+        edge, edge_offset = expand_ranges(np.zeros(len(edge_field), dtype=np.int64),
+                                           edge_spans_x * (ey1 - ey0 + 1))
+        edge_cell = (ey0[edge] + edge_offset // edge_spans_x[edge]) * nx + ex0[edge] + edge_offset % edge_spans_x[edge]
+        cut = np.unique(edge_cell * len(self.field_ids) + edge_field[edge])
+
+        # Arestas de cada (campo, faixa horizontal) para o teste exato
+        self.bands = self.shape[1] * BANDS_PER_CELL
+        band_low = self._bands(np.minimum(self.edges[:, 1], self.edges[:, 3]))
+        band_high = self._bands(np.maximum(self.edges[:, 1], self.edges[:, 3]))
+        band_edge, band = expand_ranges(band_low, band_high - band_low + 1)
+        band_key = edge_field[band_edge] * self.bands + band
+        order = np.argsort(band_key, kind='stable')
+        self.band_keys, self.band_start = np.unique(band_key[order], return_index=True)
+        self.band_start = np.append(self.band_start, len(order))
+        self.band_edges = band_edge[order]
+
+        pair_key = cell * len(self.field_ids) + field
+        state = np.where(np.isin(pair_key, cut), BOUNDARY, OUTSIDE).astype(np.uint8)
+
+        # Células sem aresta estão inteiras dentro ou fora: decide pelo centro
+        whole = np.flatnonzero(state == OUTSIDE)
+        centers_x = self.origin[0] + (cell[whole] % nx + 0.5) * cell_size
+        centers_y = self.origin[1] + (cell[whole] // nx + 0.5) * cell_size
+        inside = self._test_pairs(centers_x, centers_y, field[whole])
+        state[whole[inside]] = INSIDE
+
+        keep = state != OUTSIDE
+        cell, field, state = cell[keep], field[keep], state[keep]
+        order = np.lexsort((field, cell))
+        self.cell_field = field[order].astype(np.int32)
+        self.cell_state = state[order]
+        self.cell_start = np.searchsorted(cell[order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def _test_pairs(self, x: np.ndarray, y: np.ndarray, fields: np.ndarray) -> np.ndarray:
+        """
+        Teste exato de pares (ponto, campo): conta os cruzamentos do raio
+        horizontal com as arestas do campo na faixa do ponto
+        """
+        result = np.zeros(len(x), dtype=bool)
+        if not len(x) or not len(self.band_keys):
+            return result
+        key = fields.astype(np.int64) * self.bands + self._bands(y)
+        slot = np.minimum(np.searchsorted(self.band_keys, key), len(self.band_keys) - 1)
+        found = self.band_keys[slot] == key
+        starts = self.band_start[slot]
+        counts = np.where(found, self.band_start[slot + 1] - starts, 0)
+
+        # Blocos de pares com até PAIR_BLOCK elementos (ponto, aresta)
+        totals = np.cumsum(counts)
+        block_ends = np.searchsorted(totals, np.arange(PAIR_BLOCK, totals[-1] + PAIR_BLOCK, PAIR_BLOCK), side='right')
+        begin = 0
+        for end in np.unique(np.append(np.maximum(block_ends, 1), len(x))):
+            if end <= begin:
+                continue
+            owner, position = expand_ranges(starts[begin:end], counts[begin:end])
+            edges = self.edges[self.band_edges[position]]
+            px, py = x[begin:end][owner], y[begin:end][owner]
+            x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+            spans = (y1 > py) != (y2 > py)
+            dy = np.where(spans, y2 - y1, 1.0)
+            crossing = spans & (px < x1 + (py - y1) * (x2 - x1) / dy)
+            parity = np.bincount(owner, weights=crossing, minlength=end - begin)
+            result[begin:end] = (parity % 2) == 1
+            begin = end
+        return result
+
+    def locate(self, lon, lat) -> np.ndarray:
+        """
+        Índice (em field_ids) do campo que contém cada ponto, ou -1. Com campos
+        sobrepostos, vale o primeiro na ordem de field_ids.
+        """
+        x = np.asarray(lon, dtype=np.float64).ravel()
+        y = np.asarray(lat, dtype=np.float64).ravel()
+        result = np.full(len(x), -1, dtype=np.int32)
+        if not len(self.field_ids) or not len(x):
+            return result
+        valid = np.isfinite(x) & np.isfinite(y)
+        valid &= (x >= self.bounds[:, 0].min()) & (x <= self.bounds[:, 2].max())
+        valid &= (y >= self.bounds[:, 1].min()) & (y <= self.bounds[:, 3].max())
+        points = np.flatnonzero(valid)
+        ix, iy = self._cells(x[points], y[points])
+        cell = iy * self.shape[0] + ix
+        starts = self.cell_start[cell]
+        counts = self.cell_start[cell + 1] - starts
+        owner, slot = expand_ranges(starts, counts)
+        point = points[owner]
+        field = self.cell_field[slot]
+        hit = self.cell_state[slot] == INSIDE
+        tested = np.flatnonzero(~hit)
+        hit[tested] = self._test_pairs(x[point[tested]], y[point[tested]], field[tested])
+
+        # Primeiro campo encontrado por ponto (pares já ordenados por ponto e campo)
+        point, field = point[hit], field[hit]
+        first = np.ones(len(point), dtype=bool)
+        first[1:] = point[1:] != point[:-1]
+        result[point[first]] = field[first]
+        return result
+
+    def field_ids_at(self, lon, lat) -> np.ndarray:
+        """
+        FieldId de cada ponto ('' fora de todos os campos)
+        """
+        index = self.locate(lon, lat)
+        lookup = np.array(self.field_ids + [''], dtype=str)
+        return lookup[np.where(index < 0, len(self.field_ids), index)]
+
+    def contains(self, field_id: str, lon, lat) -> np.ndarray:
+        """
+        Quais pontos estão dentro de um campo específico
+        """
+        x = np.asarray(lon, dtype=np.float64).ravel()
+        y = np.asarray(lat, dtype=np.float64).ravel()
+        if field_id not in self.field_ids:
+            return np.zeros(len(x), dtype=bool)
+        index = self.field_ids.index(field_id)
+        minx, miny, maxx, maxy = self.bounds[index]
+        result = np.zeros(len(x), dtype=bool)
+        near = np.flatnonzero((x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy))
+        result[near] = points_in_rings(x[near], y[near], self.field_edges(index))
+        return result
+
+
+def load_cached_boundaries(org_id, refresh: bool = False,
+                           state_dir: str = SYNC_DIR) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Boundaries da organização por campo, a partir da cópia local sincronizada
+    em state_dir (sincroniza se ainda não houver cópia ou se refresh=True)
+    """
+    sync = boundaries_sync(org_id, state_dir)
+    if refresh or sync.synced_at is None:
+        sync.sync()
+    return group_by_field(sync.values())
+
+
+def group_by_field(boundaries: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {field_id: [boundaries]} para boundaries da coleção da organização
+    """
+    by_field: Dict[str, List[Dict[str, Any]]] = {}
+    for boundary in boundaries:
+        field_id = record_field_id(boundary)
+        if field_id:
+            by_field.setdefault(field_id, []).append(boundary)
+    return by_field
+
+
+def check_operation_field(index: FieldIndex, operation) -> Dict[str, Any]:
+    """
+    Confere o FieldId dos metadados de uma operação exportada com a posição
+    dos pontos (colunas Longitude/Latitude do operation_decoder)
+
+    Returns:
+        {'field_id': dos metadados, 'inside_pct': % dos pontos dentro dele,
+         'dominant_field_id': campo com mais pontos, 'outside_pct': % fora de todos}
+    """
+    if 'Longitude' not in operation.columns or 'Latitude' not in operation.columns:
+        return {'field_id': operation.metadata.get('FieldId'), 'error': 'sem coordenadas'}
+    located = index.locate(operation.column('Longitude'), operation.column('Latitude'))
+    total = max(len(located), 1)
+    expected = operation.metadata.get('FieldId')
+    expected_index = index.field_ids.index(expected) if expected in index.field_ids else -2
+    counts = np.bincount(located[located >= 0], minlength=len(index)) if len(index) else np.zeros(0)
+    dominant = int(np.argmax(counts)) if counts.any() else None
+    return {
+        'field_id': expected,
+        'inside_pct': float(np.count_nonzero(located == expected_index)) / total * 100,
+        'dominant_field_id': index.field_ids[dominant] if dominant is not None else None,
+        'outside_pct': float(np.count_nonzero(located < 0)) / total * 100,
+    }
+
+
+def main():
+    """
+    Monta o índice da organização e confere o FieldId das exportações em ./downloads
+    """
+    org_id = 5881930  # Substitua pelo seu orgId
+    if not get_valid_tokens():
+        return
+    started = time.time()
+    index = FieldIndex.from_boundaries(load_cached_boundaries(org_id))
+    print(f"🗺️ Índice com {len(index)} campos ({len(index.edges):,} arestas, grade {index.shape[0]}×{index.shape[1]}) "
+          f"em {time.time() - started:.1f}s")
+
+    for operation in load_exports():
+        check = check_operation_field(index, operation)
+        if 'error' in check:
+            print(f"⚠️ {operation.source}: {check['error']}")
+            continue
+        status = "✅" if check['dominant_field_id'] == check['field_id'] else "⚠️"
+        print(f"{status} {operation.source}: {check['inside_pct']:.1f}% dos pontos no campo {check['field_id']} "
+              f"(predominante: {check['dominant_field_id']}, fora de todos: {check['outside_pct']:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
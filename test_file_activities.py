@@ -6,85 +6,11 @@ Endpoint: /files/{fileId}/fileActivities
 
 import os
 import json
-import requests
-import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data, verify=False)  # 'verify=True' para garantir que a conexão é segura
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
 
 def test_file_activities(file_id: str):
     """
@@ -94,19 +20,14 @@ def test_file_activities(file_id: str):
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     
     url = f"{API_BASE_URL}/files/{file_id}/fileActivities"
     
     print(f"📡 Testando endpoint: {url}")
-    print(f"📋 Headers: {headers}")
     
     try:
-        response = requests.get(url, headers=headers, verify=False)  # 'verify=True' para garantir que a conexão é segura
+        response = client.get(url, verify=False)  # 'verify=True' para garantir que a conexão é segura
         print(f"📊 Status: {response.status_code}")
         print(f"📋 Response Headers: {dict(response.headers)}")
         
@@ -132,18 +53,14 @@ def test_file_details(file_id: str):
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     
     url = f"{API_BASE_URL}/files/{file_id}"
     
     print(f"📡 Testando detalhes do arquivo: {url}")
     
     try:
-        response = requests.get(url, headers=headers, verify=False)  # 'verify=True' para garantir que a conexão é segura
+        response = client.get(url, verify=False)  # 'verify=True' para garantir que a conexão é segura
         print(f"📊 Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -168,18 +85,14 @@ def test_file_partnerships(file_id: str):
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
     
     url = f"{API_BASE_URL}/files/{file_id}/partnerships"
     
     print(f"📡 Testando parcerias do arquivo: {url}")
     
     try:
-        response = requests.get(url, headers=headers, verify=False)  # 'verify=True' para garantir que a conexão é segura   
+        response = client.get(url, verify=False)  # 'verify=True' para garantir que a conexão é segura   
         print(f"📊 Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -276,9 +189,6 @@ def main():
         print(f"\n💾 Salvando análise em {output_file}...")
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
-        
-        # Pequena pausa entre requisições
-        time.sleep(1)
     
     print(f"\n✅ Testes concluídos!")
 
@@ -6,85 +6,13 @@ Usando os headers Accept corretos para download do arquivo real
 
 import os
 import json
-import requests
-import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens
+from zip_inspect import inspect_file
+from download_cache import replace_file
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"
-
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
-    
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
-    
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
-    
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
-    
-    return tokens
 
 def test_file_download_with_headers(file_id: str, file_name: str, accept_header: str, test_name: str):
     """
@@ -94,9 +22,8 @@ def test_file_download_with_headers(file_id: str, file_name: str, accept_header:
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
+    client = get_client()
     headers = {
-        'Authorization': f'Bearer {access_token}',
         'Accept': accept_header
     }
     
@@ -106,7 +33,7 @@ def test_file_download_with_headers(file_id: str, file_name: str, accept_header:
     print(f"📋 Accept Header: {accept_header}")
     
     try:
-        response = requests.get(url, headers=headers, stream=True)
+        response = client.get(url, headers=headers, stream=True)
         print(f"📊 Status: {response.status_code}")
         print(f"📋 Content-Type: {response.headers.get('Content-Type', 'N/A')}")
         print(f"📋 Content-Length: {response.headers.get('Content-Length', 'N/A')}")
@@ -122,10 +49,13 @@ def test_file_download_with_headers(file_id: str, file_name: str, accept_header:
             safe_filename = "".join(c for c in file_name if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
             file_path = os.path.join(download_dir, f"{file_id}_{test_name}_{safe_filename}")
             
-            with open(file_path, 'wb') as f:
+            # Temporário + replace_file: o destino pode ser um link para o cache de downloads
+            tmp_path = f"{file_path}.part"
+            with open(tmp_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     if chunk:
                         f.write(chunk)
+            replace_file(tmp_path, file_path)
             
             file_size = os.path.getsize(file_path)
             print(f"✅ Arquivo baixado: {file_path} ({file_size} bytes)")
@@ -173,9 +103,8 @@ def test_file_download_with_parameters(file_id: str, file_name: str, offset: int
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
+    client = get_client()
     headers = {
-        'Authorization': f'Bearer {access_token}',
         'Accept': 'application/octet-stream'
     }
     
@@ -190,7 +119,7 @@ def test_file_download_with_parameters(file_id: str, file_name: str, offset: int
     print(f"📋 Parâmetros: offset={offset}, size={size}")
     
     try:
-        response = requests.get(url, headers=headers, params=params, stream=True)
+        response = client.get(url, headers=headers, params=params, stream=True)
         print(f"📊 Status: {response.status_code}")
         print(f"📋 Content-Type: {response.headers.get('Content-Type', 'N/A')}")
         print(f"📋 Content-Length: {response.headers.get('Content-Length', 'N/A')}")
@@ -205,10 +134,13 @@ def test_file_download_with_parameters(file_id: str, file_name: str, offset: int
             safe_filename = "".join(c for c in file_name if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
             file_path = os.path.join(download_dir, f"{file_id}_params_offset{offset}_size{size}_{safe_filename}")
             
-            with open(file_path, 'wb') as f:
+            # Temporário + replace_file: o destino pode ser um link para o cache de downloads
+            tmp_path = f"{file_path}.part"
+            with open(tmp_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     if chunk:
                         f.write(chunk)
+            replace_file(tmp_path, file_path)
             
             file_size = os.path.getsize(file_path)
             print(f"✅ Arquivo baixado: {file_path} ({file_size} bytes)")
@@ -311,7 +243,6 @@ def main():
             print(f"\n--- Teste {test_name} ---")
             result = test_file_download_with_headers(file_id, file_name, accept_header, test_name)
             file_results['download_tests'][test_name] = result
-            time.sleep(1)  # Pausa entre requisições
         
         # Teste 2: Download com parâmetros
         print(f"\n📋 2. Testando download com parâmetros:")
@@ -319,10 +250,15 @@ def main():
         result_params = test_file_download_with_parameters(file_id, file_name, -1, -1)
         file_results['download_tests']['PARAMS_COMPLETE'] = result_params
         
-        results.append(file_results)
+        # Teste 3: Inspeção do ZIP sem baixar o arquivo inteiro
+        print(f"\n📋 3. Inspecionando o ZIP remotamente (diretório central + metadados):")
+        result_inspect = inspect_file(file_id, file_size or None, dest_dir="downloads")
+        if result_inspect.get('success'):
+            print(f"📦 {len(result_inspect['members'])} membros, extraídos: {result_inspect['extracted']}")
+            print(f"📊 {result_inspect['bytes_fetched']} de {result_inspect['native_size']} bytes lidos ({result_inspect['mode']})")
+        file_results['download_tests']['ZIP_INSPECT'] = result_inspect
         
-        # Pausa entre arquivos
-        time.sleep(2)
+        results.append(file_results)
     
     # Salvar resumo dos resultados
     summary_file = "download_correct_results.json"
@@ -4,87 +4,30 @@ Script para testar o endpoint /files da API John Deere
 Endpoint: /files
 """
 
-import os
 import json
-import requests
-import time
 from typing import Optional, Dict, Any, List
+from deere_client import get_client
+from token_provider import get_valid_tokens, SCOPES
+from pagination import iter_collection, write_collection_json
 
 API_BASE_URL = "https://sandboxapi.deere.com/platform"
-TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
-CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
-CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
-REDIRECT_URI = "http://localhost:9090/callback"
-SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"  # Adicionando ag3 e files
 
-def load_tokens():
-    if os.path.exists('tokens.json'):
-        with open('tokens.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
-
-def save_tokens(tokens):
-    with open('tokens.json', 'w', encoding='utf-8') as f:
-        json.dump(tokens, f)
-
-def is_token_expired_or_expiring(tokens, grace_period=60):
-    access_token = tokens.get('access_token')
-    expires_in = tokens.get('expires_in')
-    token_acquired_time = tokens.get('token_acquired_time')
-    if not access_token or not expires_in or not token_acquired_time:
-        return True
-    time_elapsed = time.time() - float(token_acquired_time)
-    time_remaining = float(expires_in) - time_elapsed
-    return time_remaining <= grace_period
-
-def refresh_access_token(tokens):
-    refresh_token = tokens.get('refresh_token')
-    if not refresh_token:
-        print("❌ Refresh Token não disponível.")
-        return None
+def build_files_params(filter_type="ALL", file_type=None, transferable=None):
+    """
+    Monta os parâmetros de query do endpoint /files
+    """
+    params = {}
     
-    print("🔄 Renovando access token...")
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI,
-        'scope': SCOPES,
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET
-    }
+    if filter_type:
+        params['filter'] = filter_type
     
-    try:
-        response = requests.post(TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
-        tokens['access_token'] = token_data.get('access_token')
-        tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
-        tokens['expires_in'] = token_data.get('expires_in')
-        tokens['token_acquired_time'] = time.time()
-        save_tokens(tokens)
-        print("✅ Access token renovado!")
-        return tokens
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erro ao renovar token: {e}")
-        return None
-
-def get_valid_tokens():
-    tokens = load_tokens()
-    if not tokens:
-        print("❌ Tokens não encontrados. Execute jd.py primeiro.")
-        return None
+    if file_type is not None:
+        params['fileType'] = file_type
     
-    if is_token_expired_or_expiring(tokens):
-        tokens = refresh_access_token(tokens)
-        if not tokens:
-            print("❌ Falha ao renovar token.")
-            return None
+    if transferable is not None:
+        params['transferable'] = str(transferable).lower()
     
-    return tokens
+    return params
 
 def test_files_endpoint(filter_type="ALL", file_type=None, transferable=None, x_deere_signature=None):
     """
@@ -94,11 +37,8 @@ def test_files_endpoint(filter_type="ALL", file_type=None, transferable=None, x_
     if not tokens:
         return None
     
-    access_token = tokens.get('access_token')
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/vnd.deere.axiom.v3+json'
-    }
+    client = get_client()
+    headers = {}
     
     # Adicionar x-deere-signature se fornecido
     if x_deere_signature:
@@ -106,23 +46,14 @@ def test_files_endpoint(filter_type="ALL", file_type=None, transferable=None, x_
     
     # Construir URL com parâmetros
     url = f"{API_BASE_URL}/files"
-    params = {}
-    
-    if filter_type:
-        params['filter'] = filter_type
-    
-    if file_type is not None:
-        params['fileType'] = file_type
-    
-    if transferable is not None:
-        params['transferable'] = str(transferable).lower()
+    params = build_files_params(filter_type, file_type, transferable)
     
     print(f"📡 Testando endpoint: {url}")
     print(f"🔧 Parâmetros: {params}")
     print(f"📋 Headers: {headers}")
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = client.get(url, headers=headers, params=params)
         print(f"📊 Status: {response.status_code}")
         print(f"📋 Response Headers: {dict(response.headers)}")
         
@@ -140,6 +71,33 @@ def test_files_endpoint(filter_type="ALL", file_type=None, transferable=None, x_
         print(f"❌ Erro na requisição: {e}")
         return None
 
+def iter_files(filter_type="ALL", file_type=None, transferable=None, item_limit=100, parallel=True):
+    """
+    Percorre TODOS os arquivos do endpoint /files (todas as páginas), sob demanda.
+    Com parallel=True as páginas são buscadas concorrentemente a partir do `total`.
+    """
+    url = f"{API_BASE_URL}/files"
+    params = build_files_params(filter_type, file_type, transferable)
+    return iter_collection(url, params=params, item_limit=item_limit, parallel=parallel)
+
+def save_all_files(output_file="files_data_all.json", filter_type="ALL", item_limit=100):
+    """
+    Grava todos os arquivos de /files em output_file página a página (fora do
+    files_data.json versionado, que guarda só a primeira página)
+    """
+    tokens = get_valid_tokens()
+    if not tokens:
+        return None
+    
+    print(f"📡 Baixando todas as páginas de {API_BASE_URL}/files (filter={filter_type})...")
+    try:
+        total = write_collection_json(iter_files(filter_type, item_limit=item_limit), output_file)
+        print(f"💾 {total} arquivos salvos em {output_file}")
+        return total
+    except Exception as e:
+        print(f"❌ Erro na requisição: {e}")
+        return None
+
 def analyze_files_data(files_data):
     """
     Analisa os dados de arquivos recebidos
@@ -244,6 +202,12 @@ def main():
     # Testar diferentes filtros
     test_different_filters()
     
+    # Salvar a lista completa (todas as páginas)
+    print("\n" + "="*60)
+    print("📥 Salvando TODOS os arquivos (todas as páginas)")
+    print("="*60)
+    save_all_files()
+    
     print("\n✅ Testes concluídos!")
 
 if __name__ == "__main__":
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Provedor de tokens OAuth em memória
+Carrega tokens.json uma única vez, renova o access token em background antes
+de expirar e garante que chamadas concorrentes compartilhem a mesma renovação.
+O arquivo tokens.json só é reescrito quando o token é de fato rotacionado.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Optional, Dict, Any
+
+import requests
+
+from deere_client import get_client
+
+TOKEN_URL = "https://signin.johndeere.com/oauth2/aus78tnlaysMraFhC1t7/v1/token"
+CLIENT_ID = "0oap8bfnk7ViKFk7M5d7"
+CLIENT_SECRET = "usklX-2OR8SHRY9pziQ-uMS3qzxkwYR_ZpFatiuQtFPaWVi6NrmhZW9RQvFjVYlL"
+REDIRECT_URI = "http://localhost:9090/callback"
+SCOPES = "ag1 ag2 ag3 org1 eq1 files offline_access"
+
+TOKENS_FILE = 'tokens.json'
+
+
+class TokenProvider:
+    """
+    Mantém o token em memória e o renova antes do vencimento
+
+    Args:
+        tokens_file: Caminho do arquivo de tokens gerado pelo jd.py
+        grace_period: Segundos antes da expiração em que o token já é considerado inválido
+        refresh_margin: Segundos antes da expiração em que a renovação em background dispara
+        background_refresh: Se True, agenda a renovação automática em uma thread daemon
+    """
+
+    def __init__(
+        self,
+        tokens_file: str = TOKENS_FILE,
+        grace_period: int = 60,
+        refresh_margin: int = 300,
+        background_refresh: bool = True
+    ):
+        self.tokens_file = tokens_file
+        self.grace_period = grace_period
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+
+        self._tokens: Optional[Dict[str, Any]] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._refresh_done: Optional[threading.Event] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            if os.path.exists(self.tokens_file):
+                with open(self.tokens_file, 'r', encoding='utf-8') as f:
+                    self._tokens = json.load(f)
+            self._loaded = True
+        self._schedule_refresh()
+
+    def _save(self, tokens: Dict[str, Any]) -> None:
+        tmp_file = f"{self.tokens_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(tokens, f)
+        os.replace(tmp_file, self.tokens_file)
+
+    def _seconds_remaining(self, tokens: Optional[Dict[str, Any]]) -> float:
+        if not tokens:
+            return 0.0
+        expires_in = tokens.get('expires_in')
+        token_acquired_time = tokens.get('token_acquired_time')
+        if not tokens.get('access_token') or not expires_in or not token_acquired_time:
+            return 0.0
+        return float(expires_in) - (time.time() - float(token_acquired_time))
+
+    def is_expired_or_expiring(self) -> bool:
+        return self._seconds_remaining(self._tokens) <= self.grace_period
+
+    def _schedule_refresh(self) -> None:
+        """
+        Agenda a próxima renovação em background para refresh_margin segundos
+        antes da expiração do token atual
+        """
+        if not self.background_refresh or not self._tokens:
+            return
+        delay = max(self._seconds_remaining(self._tokens) - self.refresh_margin, 0.0)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self.refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _request_new_tokens(self, tokens: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        refresh_token = tokens.get('refresh_token')
+        if not refresh_token:
+            print("❌ Refresh Token não disponível.")
+            return None
+
+        print("🔄 Renovando access token...")
+        headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        data = {
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+            'redirect_uri': REDIRECT_URI,
+            'scope': SCOPES,
+            'client_id': CLIENT_ID,
+            'client_secret': CLIENT_SECRET
+        }
+
+        try:
+            response = get_client().post(TOKEN_URL, headers=headers, data=data)
+            response.raise_for_status()
+            token_data = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Erro ao renovar token: {e}")
+            return None
+
+        new_tokens = dict(tokens)
+        new_tokens['access_token'] = token_data.get('access_token')
+        new_tokens['refresh_token'] = token_data.get('refresh_token', refresh_token)
+        new_tokens['expires_in'] = token_data.get('expires_in')
+        new_tokens['token_acquired_time'] = time.time()
+        print("✅ Access token renovado!")
+        return new_tokens
+
+    def refresh(self) -> Optional[Dict[str, Any]]:
+        """
+        Renova o access token. Se já houver uma renovação em andamento, aguarda
+        por ela e devolve o resultado em vez de disparar outra.
+        """
+        self._load()
+        with self._lock:
+            in_flight = self._refresh_done
+            if in_flight is None:
+                self._refresh_done = threading.Event()
+                current = self._tokens
+
+        if in_flight is not None:
+            in_flight.wait()
+            return None if self.is_expired_or_expiring() else self._tokens
+
+        new_tokens = None
+        try:
+            if current:
+                new_tokens = self._request_new_tokens(current)
+            if new_tokens:
+                rotated = (
+                    new_tokens.get('access_token') != current.get('access_token') or
+                    new_tokens.get('refresh_token') != current.get('refresh_token')
+                )
+                if rotated:
+                    self._save(new_tokens)
+                self._tokens = new_tokens
+        finally:
+            with self._lock:
+                done = self._refresh_done
+                self._refresh_done = None
+            done.set()
+
+        if new_tokens:
+            self._schedule_refresh()
+        return new_tokens
+
+    def get_tokens(self) -> Optional[Dict[str, Any]]:
+        """
+        Retorna os tokens válidos em memória, renovando-os se estiverem expirando
+        """
+        self._load()
+        if not self._tokens:
+            return None
+        if self.is_expired_or_expiring():
+            return self.refresh()
+        return self._tokens
+
+    def get_access_token(self) -> Optional[str]:
+        tokens = self.get_tokens()
+        return tokens.get('access_token') if tokens else None
+
+    def stop(self) -> None:
+        """
+        Cancela a renovação agendada em background
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+_provider: Optional[TokenProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_token_provider() -> TokenProvider:
+    """
+    Retorna o provedor de tokens compartilhado do processo e o registra no
+    cliente HTTP, que passa a obter o access token diretamente dele
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = TokenProvider()
+            get_client().set_token_provider(_provider)
+    return _provider
+
+
+def get_valid_tokens() -> Optional[Dict[str, Any]]:
+    """
+    Retorna tokens válidos (em memória), ou None se não houver tokens.json
+    ou se a renovação falhar
+    """
+    tokens = get_token_provider().get_tokens()
+    if not tokens:
+        print("❌ Tokens não encontrados ou inválidos. Execute jd.py primeiro.")
+        return None
+    return tokens
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Inspeção de arquivos ZIP da API sem baixar o arquivo inteiro
+O ZIP remoto é aberto com zipfile sobre um leitor que busca apenas as faixas
+de bytes necessárias (offset/size de /files/{fileId} ou header Range em URLs
+pré-assinadas): o diretório central no fim do arquivo para listar os membros e
+só os membros escolhidos (ex: *-Deere-Metadata.json) para extraí-los. Se o
+servidor não aceitar faixas, o arquivo é lido para um buffer em memória
+(SpooledTemporaryFile) em vez de ser gravado em ./downloads.
+"""
+
+import io
+import os
+import fnmatch
+import tempfile
+import zipfile
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Callable, Iterable
+
+import requests
+
+from deere_client import get_client
+from download_cache import replace_file
+from chunked_download import PROBE_SIZE, RangeNotSupported, check_content_range, get_native_size
+
+API_BASE_URL = "https://sandboxapi.deere.com/platform"
+BLOCK_SIZE = 64 * 1024  # Menor faixa buscada por requisição
+MAX_CACHED_BLOCKS = 64
+SPOOL_MAX_SIZE = 32 * 1024 * 1024  # Acima disso o buffer vai para um arquivo temporário
+METADATA_PATTERNS = ('*-Deere-Metadata.json',)
+
+
+def deere_file_range_fetcher(file_id: str, accept: str = 'application/octet-stream',
+                             native_size: Optional[int] = None) -> Callable[[int, int], bytes]:
+    """
+    Função (offset, size) -> bytes sobre /files/{fileId}?offset=&size=
+
+    Cada resposta é conferida como em chunked_download: pelo Content-Range ou,
+    sem ele, comparando o início da faixa com o início do arquivo (um servidor
+    que ignora o offset devolve os primeiros bytes para qualquer faixa).
+    """
+    url = f"{API_BASE_URL}/files/{file_id}"
+    file_head: List[bytes] = []
+
+    def get_range(offset: int, size: int) -> bytes:
+        response = get_client().get(url, headers={'Accept': accept},
+                                    params={'offset': offset, 'size': size}, use_cache=False)
+        response.raise_for_status()
+        if len(response.content) > size:
+            raise RangeNotSupported(f"arquivo {file_id}: recebidos {len(response.content)} bytes para size={size}")
+        if offset and not check_content_range(response, offset, size, native_size):
+            if not file_head:
+                file_head.append(get_range(0, min(PROBE_SIZE, native_size or PROBE_SIZE)))
+            head = file_head[0][:len(response.content)]
+            if head and response.content.startswith(head):
+                raise RangeNotSupported(f"arquivo {file_id}: faixa em {offset} igual ao início do arquivo")
+        return response.content
+
+    return get_range
+
+
+def http_range_fetcher(url: str) -> Callable[[int, int], bytes]:
+    """
+    Função (offset, size) -> bytes usando o header Range (URLs pré-assinadas de storage)
+    """
+    def fetch(offset: int, size: int) -> bytes:
+        response = get_client().get(url, headers={'Range': f"bytes={offset}-{offset + size - 1}"})
+        if response.status_code == 200 and len(response.content) > size:
+            raise RangeNotSupported(f"{url}: Range ignorado")
+        response.raise_for_status()
+        return response.content
+
+    return fetch
+
+
+class RangeReader(io.RawIOBase):
+    """
+    Arquivo somente leitura e posicionável sobre uma função de busca por faixa
+
+    Lê em blocos de block_size e mantém os últimos blocos em memória, de modo
+    que as leituras pequenas do zipfile não viram uma requisição cada.
+
+    Args:
+        fetch_range: Função (offset, size) -> bytes
+        size: Tamanho total do arquivo remoto
+        block_size: Tamanho mínimo de cada faixa buscada
+    """
+
+    def __init__(self, fetch_range: Callable[[int, int], bytes], size: int, block_size: int = BLOCK_SIZE):
+        super().__init__()
+        self.fetch_range = fetch_range
+        self.size = size
+        self.block_size = block_size
+        self.position = 0
+        self.bytes_fetched = 0
+        self.requests = 0
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def _block(self, index: int) -> bytes:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        offset = index * self.block_size
+        block = self.fetch_range(offset, min(self.block_size, self.size - offset))
+        self.requests += 1
+        self.bytes_fetched += len(block)
+        self._blocks[index] = block
+        if len(self._blocks) > MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+
+    def _prefetch(self, start: int, end: int) -> None:
+        """
+        Busca de uma vez os blocos ausentes de uma leitura grande
+        """
+        first, last = start // self.block_size, (end - 1) // self.block_size
+        missing = [i for i in range(first, last + 1) if i not in self._blocks]
+        if len(missing) < 2 or missing != list(range(missing[0], missing[-1] + 1)):
+            return
+        offset = missing[0] * self.block_size
+        data = self.fetch_range(offset, min(len(missing) * self.block_size, self.size - offset))
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        for n, index in enumerate(missing):
+            self._blocks[index] = data[n * self.block_size:(n + 1) * self.block_size]
+        while len(self._blocks) > max(MAX_CACHED_BLOCKS, len(missing)):
+            self._blocks.popitem(last=False)
+
+    def readinto(self, buffer) -> int:
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+        self._prefetch(self.position, end)
+        written = 0
+        while self.position < end:
+            index, within = divmod(self.position, self.block_size)
+            chunk = self._block(index)[within:within + end - self.position]
+            if not chunk:
+                break
+            buffer[written:written + len(chunk)] = chunk
+            written += len(chunk)
+            self.position += len(chunk)
+        return written
+
+
+def _spooled_copy(file_id: str, accept: str = 'application/octet-stream'):
+    """
+    Lê o arquivo inteiro para um SpooledTemporaryFile (memória até SPOOL_MAX_SIZE)
+    """
+    response = get_client().get(f"{API_BASE_URL}/files/{file_id}", headers={'Accept': accept}, stream=True)
+    try:
+        response.raise_for_status()
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        for block in response.iter_content(chunk_size=BLOCK_SIZE):
+            if block:
+                spool.write(block)
+    finally:
+        response.close()
+    spool.seek(0)
+    return spool
+
+
+class RemoteZip:
+    """
+    ZIP remoto de /files/{fileId}, aberto sem materializar o arquivo em disco
+
+    Use como context manager:
+
+        with RemoteZip(file_id, native_size) as remote:
+            names = remote.namelist()
+            metadata = remote.extract(METADATA_PATTERNS)
+
+    Args:
+        file_id: ID do arquivo
+        native_size: Tamanho do arquivo (se None, busca nos metadados)
+        fetch_range: Função de busca por faixa (padrão: offset/size de /files/{fileId})
+    """
+
+    def __init__(
+        self,
+        file_id: str,
+        native_size: Optional[int] = None,
+        fetch_range: Optional[Callable[[int, int], bytes]] = None
+    ):
+        self.file_id = file_id
+        self.native_size = native_size if native_size else get_native_size(file_id)
+        self.mode = 'range'
+        self.reader = None
+        self.zip = None
+        try:
+            if not self.native_size:
+                raise RangeNotSupported("tamanho desconhecido")
+            self.reader = RangeReader(fetch_range or deere_file_range_fetcher(file_id, native_size=self.native_size),
+                                      self.native_size)
+            self.zip = zipfile.ZipFile(self.reader)
+        except RangeNotSupported as e:
+            print(f"⚠️ {e}; lendo o arquivo {file_id} para um buffer temporário")
+            self.mode = 'spooled'
+            self.reader = _spooled_copy(file_id)
+            self.zip = zipfile.ZipFile(self.reader)
+
+    def __enter__(self) -> 'RemoteZip':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.zip is not None:
+            self.zip.close()
+        if self.reader is not None:
+            self.reader.close()
+
+    @property
+    def bytes_fetched(self) -> int:
+        if self.mode == 'range':
+            return self.reader.bytes_fetched
+        return self.native_size or 0
+
+    def namelist(self) -> List[str]:
+        return self.zip.namelist()
+
+    def members(self) -> List[Dict[str, Any]]:
+        """
+        Membros do ZIP com tamanho comprimido e original
+        """
+        return [{'name': info.filename, 'size': info.file_size, 'compressed_size': info.compress_size}
+                for info in self.zip.infolist()]
+
+    def extract(self, patterns: Iterable[str] = METADATA_PATTERNS, dest_dir: Optional[str] = None) -> Dict[str, bytes]:
+        """
+        Lê só os membros cujo nome casa com algum padrão (fnmatch, no nome base)
+        e, se dest_dir for informado, grava-os lá. Retorna {nome: conteúdo}.
+        """
+        patterns = list(patterns)
+        extracted = {}
+        for name in self.zip.namelist():
+            base_name = os.path.basename(name)
+            if not any(fnmatch.fnmatch(base_name, pattern) for pattern in patterns):
+                continue
+            data = self.zip.read(name)
+            extracted[name] = data
+            if dest_dir:
+                path = os.path.join(dest_dir, base_name)
+                os.makedirs(dest_dir, exist_ok=True)
+                # Temporário + replace_file: o destino pode ser um link para o cache de downloads
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                replace_file(tmp_path, path)
+        return extracted
+
+
+def inspect_file(
+    file_id: str,
+    native_size: Optional[int] = None,
+    patterns: Iterable[str] = METADATA_PATTERNS,
+    dest_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Lista os membros de um ZIP remoto e extrai os que casam com os padrões,
+    sem gravar o arquivo inteiro. Retorna um resumo no formato dos scripts de teste.
+    """
+    try:
+        with RemoteZip(file_id, native_size) as remote:
+            members = remote.members()
+            extracted = remote.extract(patterns, dest_dir=dest_dir)
+            return {
+                'success': True,
+                'mode': remote.mode,
+                'members': members,
+                'extracted': sorted(extracted),
+                'bytes_fetched': remote.bytes_fetched,
+                'native_size': remote.native_size,
+            }
+    except (requests.exceptions.RequestException, zipfile.BadZipFile) as e:
+        print(f"❌ Erro ao inspecionar o arquivo {file_id}: {e}")
+        return {'success': False, 'error': str(e)}